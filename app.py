@@ -1,12 +1,23 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import joblib
-from datetime import datetime
 import base64
+import datetime
+import os
+import tempfile
+import threading
+import time
+
+import audit_log
+import drift
+import explain
+import history_store
+import metrics
+import model_manager
+import prediction_cache
+import rules
+import scoring
+
+# Library berat (pandas, plotly, xgboost/sklearn lewat pickle) diimpor di dalam halaman
+# yang membutuhkannya, lalu dipanaskan di background setelah halaman pertama tampil
 
 # Konfigurasi halaman
 st.set_page_config(
@@ -74,42 +85,80 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Fungsi untuk memuat model XGBoost dan scaler
+# Model manager memantau file model dan menukar versi baru tanpa restart aplikasi
 @st.cache_resource
-def load_model_and_scaler():
+def load_model_manager():
     try:
-        # Memuat model XGBoost yang sudah dilatih
-        model = joblib.load('xgb_model.pkl')
-        # Memuat scaler yang digunakan saat training
-        scaler = joblib.load('scaler.pkl')
-        return model, scaler, True
+        # Memuat model XGBoost yang sudah dilatih dan scaler yang digunakan saat training
+        # Rerun Streamlit dan transaksi yang sama tidak di-score ulang selama model tidak berganti
+        # Aturan pre-filter memutuskan jenis transaksi tanpa riwayat fraud tanpa memanggil model
+        # Setiap keputusan dicatat ke log audit (ditulis thread background, tanpa menunda prediksi)
+        # dan ke riwayat Parquet yang menjadi sumber statistik dashboard
+        manager = model_manager.ModelManager('xgb_model.pkl', 'scaler.pkl',
+                                             cache=prediction_cache.PredictionCache(),
+                                             rules=rules.RuleEngine()).start()
+        manager.on_scored.extend([
+            load_audit_log().record,
+            load_history_store().record,
+            load_drift_monitor(manager.active['scaler']).record,
+        ])
+        return manager, True
     except FileNotFoundError as e:
         st.error(f"❌ File model tidak ditemukan: {e}")
         st.error("Pastikan file 'xgb_model.pkl' dan 'scaler.pkl' tersedia di direktori yang sama")
         
         # Fallback ke mock model untuk demo
-        class MockModel:
-            def predict(self, X):
-                # Simulasi prediksi berdasarkan jumlah transaksi dan jenis
-                if X[0][2] > 200000 and X[0][1] in [2, 3]:  # amount > 200k dan CASH-OUT/TRANSFER
-                    return np.array([1])
-                return np.array([0])
-            
-            def predict_proba(self, X):
-                if X[0][2] > 200000 and X[0][1] in [2, 3]:
-                    return np.array([[0.2, 0.8]])
-                return np.array([[0.85, 0.15]])
-        
-        class MockScaler:
-            def transform(self, X):
-                return X
-        
-        return MockModel(), MockScaler(), False
+        return model_manager.ModelManager.from_models(scoring.MockModel(), scoring.MockScaler(), "demo",
+                                                      rules=rules.RuleEngine()), False
     except Exception as e:
         st.error(f"❌ Error memuat model: {e}")
-        return None, None, False
+        return None, False
+
+# Log audit keputusan, satu writer per proses
+@st.cache_resource
+def load_audit_log():
+    return audit_log.AuditLog().start()
+
+# Riwayat transaksi yang sudah di-score (Parquet per hari), satu writer per proses.
+# Scoring file besar menunggu writer jika antrean penuh, sehingga riwayatnya tidak terbuang.
+@st.cache_resource
+def load_history_store():
+    return history_store.HistoryStore(overflow='block').start()
+
+# Monitor drift memakai median/IQR training dari scaler; histogram referensi opsional.
+# Scaler tidak ikut kunci cache: satu monitor per proses, dibuat dari scaler model pertama.
+@st.cache_resource
+def load_drift_monitor(_scaler):
+    reference = (drift.load_reference(drift.DEFAULT_REFERENCE_PATH)
+                 if os.path.exists(drift.DEFAULT_REFERENCE_PATH) else None)
+    return drift.DriftMonitor(_scaler, reference).start()
+
+# Ringkasan harian dibaca dari rollup saja, dan di-cache sebentar antar rerun
+@st.cache_data(ttl=30)
+def load_history_summary(start):
+    return load_history_store().daily(start=start)
+
+# Fungsi untuk memanaskan library berat dan model di background
+def prewarm():
+    import pandas
+    import plotly.express
+    import plotly.graph_objects
+    import plotly.subplots
+    import bulk_scoring
+    
+    load_model_manager()
+
+# Thread prewarm hanya dijalankan sekali per proses
+@st.cache_resource
+def start_prewarm():
+    thread = threading.Thread(target=prewarm, name="safepay-prewarm", daemon=True)
+    thread.start()
+    return thread
 
 # Fungsi untuk data chart penipuan (simulasi)
 def get_fraud_data():
+    import pandas as pd
+    
     years = [2019, 2020, 2021, 2022, 2023]
     fraud_cases = [1250, 2340, 3890, 4560, 5200]
     losses = [45.2, 89.7, 156.8, 203.4, 267.9]  # dalam miliar rupiah
@@ -154,9 +203,6 @@ def main():
         </div>
         """, unsafe_allow_html=True)
     
-    # Load model dan scaler
-    model, scaler, model_loaded = load_model_and_scaler()
-    
     # # Status model
     # if model_loaded:
     #     st.sidebar.success("✅ Model XGBoost berhasil dimuat")
@@ -245,13 +291,22 @@ def main():
     if st.sidebar.button("🔮 Prediksi Penipuan", key="prediction"):
         st.session_state.active_menu = "🔮 Prediksi Penipuan"
 
+    if st.sidebar.button("🛠️ Panel Admin", key="admin"):
+        st.session_state.active_menu = "🛠️ Panel Admin"
+
     # Menampilkan konten sesuai dengan menu yang dipilih
     if st.session_state.active_menu == "🏠 Dashboard":
         show_dashboard()
     elif st.session_state.active_menu == "📊 Analisis Variabel":
-        show_variable_analysis()
+        # Importance dihitung dari booster model aktif (sekali per versi model)
+        manager, _ = load_model_manager()
+        show_variable_analysis(manager)
     elif st.session_state.active_menu == "🔮 Prediksi Penipuan":
-        show_prediction(model, scaler, model_loaded)
+        # Load model dan scaler hanya saat halaman prediksi dibuka
+        manager, model_loaded = load_model_manager()
+        show_prediction(manager, model_loaded)
+    elif st.session_state.active_menu == "🛠️ Panel Admin":
+        show_admin_panel()
 
     st.markdown("""
         <style>
@@ -298,6 +353,9 @@ def main():
             }
         </style>
     """, unsafe_allow_html=True)
+    
+    # Setelah halaman pertama tampil, panaskan library dan model untuk interaksi berikutnya
+    start_prewarm()
 
 # Fungsi untuk menunjukkan Dashboard, Analisis Variabel, dan Prediksi Penipuan
 def show_dashboard():
@@ -322,18 +380,34 @@ def show_dashboard():
         
         </div>
         """, unsafe_allow_html=True)
+    
+    # Statistik dari riwayat scoring 30 hari terakhir (rollup per hari, bukan baris transaksi)
+    today = datetime.date.today()
+    history = load_history_summary((today - datetime.timedelta(days=29)).isoformat())
+    today_stats = None
+    if not history.empty and history['date'].iloc[-1] == today.isoformat():
+        today_stats = history.iloc[-1]
+    
     with col2:
-        st.markdown("""
+        analyzed = int(today_stats['transactions']) if today_stats is not None else 0
+        detected = int(today_stats['fraud']) if today_stats is not None else 0
+        # Akurasi hanya bisa dihitung dari transaksi berlabel (kolom isFraud); selain itu tingkat fraud
+        if today_stats is not None and today_stats['labeled'] > 0:
+            third_value, third_label = f"{today_stats['accuracy']:.1%}", "Akurasi Model"
+        else:
+            rate = today_stats['fraud_rate'] if today_stats is not None else 0.0
+            third_value, third_label = f"{rate:.1%}", "Tingkat Penipuan"
+        st.markdown(f"""
         <div class="metric-card">
             <h3>📈 Statistik Hari Ini</h3>
-            <h2 style="color: #667eea;">1,247</h2>
+            <h2 style="color: #667eea;">{analyzed:,}</h2>
             <p>Transaksi Dianalisis</p>
             <hr>
-            <h2 style="color: #e74c3c;">23</h2>
+            <h2 style="color: #e74c3c;">{detected:,}</h2>
             <p>Penipuan Terdeteksi</p>
             <hr>
-            <h2 style="color: #27ae60;">99.7%</h2>
-            <p>Akurasi Model</p>
+            <h2 style="color: #27ae60;">{third_value}</h2>
+            <p>{third_label}</p>
         </div>
         """, unsafe_allow_html=True)
 
@@ -348,7 +422,10 @@ def show_dashboard():
         'Kasus_Penipuan': [1409, 1000, 1200, 1247, 5111, 14496],
         'Kerugian_Miliar_Rp': [75, 100, 120, 150, 500, 2600]
     }
-    fraud_data = pd.DataFrame(fraud_data)
+
+    # Plotly diimpor setelah kartu di atas terkirim ke browser
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
 
     # Membuat subplot
     fig = make_subplots(
@@ -413,7 +490,71 @@ def show_dashboard():
             delta="Tahun 2023"
         )
 
-def show_variable_analysis():
+    st.markdown("---")
+    st.markdown("## 🧾 Aktivitas Scoring SafePay.AI (30 Hari Terakhir)")
+    
+    if history.empty:
+        st.info("Belum ada riwayat scoring. Statistik akan muncul setelah transaksi diprediksi.")
+        return
+    
+    activity = make_subplots(
+        rows=1, cols=2,
+        subplot_titles=('Transaksi Dianalisis per Hari', 'Penipuan Terdeteksi per Hari'),
+    )
+    activity.add_trace(
+        go.Scatter(
+            x=history['date'],
+            y=history['transactions'],
+            mode='lines+markers',
+            name='Transaksi',
+            line=dict(color='#667eea', width=3),
+            marker=dict(size=8)
+        ),
+        row=1, col=1
+    )
+    activity.add_trace(
+        go.Bar(
+            x=history['date'],
+            y=history['fraud'],
+            name='Penipuan',
+            marker_color='#e74c3c'
+        ),
+        row=1, col=2
+    )
+    activity.update_layout(height=400, showlegend=False)
+    st.plotly_chart(activity, use_container_width=True)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("🧮 Total Transaksi (30 Hari)", f"{int(history['transactions'].sum()):,}")
+    with col2:
+        st.metric("🚨 Total Penipuan Terdeteksi", f"{int(history['fraud'].sum()):,}")
+    with col3:
+        st.metric("💰 Nominal Terindikasi Penipuan", f"Rp {history['fraud_amount'].sum():,.0f}")
+
+# Feature Importance hasil analisis training, dipakai jika model XGBoost tidak dimuat (mode demo)
+FALLBACK_IMPORTANCE = {
+    'newbalanceOrig': 0.44, 'oldbalanceOrg': 0.19, 'type': 0.18, 'amount': 0.15,
+    'newbalanceDest': 0.04, 'step': 0.003, 'oldbalanceDest': 0.002,
+}
+
+
+# Fungsi untuk memberi label tingkat importance berdasarkan skornya
+def importance_label(score):
+    if score >= 0.40:
+        return "Sangat Tinggi"
+    if score >= 0.15:
+        return "Tinggi"
+    if score >= 0.10:
+        return "Sedang"
+    if score >= 0.01:
+        return "Rendah"
+    return "Sangat Rendah"
+
+
+def show_variable_analysis(manager):
+    import plotly.express as px
+    
     st.markdown("## 📊 Analisis Variabel Deteksi Penipuan")
     
     st.markdown("""
@@ -427,56 +568,62 @@ def show_variable_analysis():
     # Definisi variabel berdasarkan gambar Feature Importance XGBoost
     variables = {
         "NewbalanceOrig": {
+            "column": "newbalanceOrig",
             "icon": "📊",
             "description": "Saldo akun pengirim (original) setelah transaksi selesai",
-            "importance": "Sangat Tinggi",
-            "importance_score": 0.44,
             "fraud_pattern": "Perubahan saldo yang tidak konsisten dengan amount transaksi atau pola manipulasi saldo bisa mengindikasikan penipuan"
         },
         "OldbalanceOrg": {
+            "column": "oldbalanceOrg",
             "icon": "🏦",
             "description": "Saldo akun pengirim (original) sebelum transaksi dilakukan",
-            "importance": "Tinggi", 
-            "importance_score": 0.19,
             "fraud_pattern": "Ketidaksesuaian antara saldo awal dengan kemampuan melakukan transaksi besar bisa mencurigakan"
         },
         "Type": {
+            "column": "type",
             "icon": "💳",
             "description": "Jenis transaksi online yang dilakukan (PAYMENT, TRANSFER, CASH-IN, CASH-OUT, DEBIT)",
-            "importance": "Tinggi",
-            "importance_score": 0.18,
             "fraud_pattern": "CASH-OUT dan TRANSFER memiliki risiko penipuan lebih tinggi dibandingkan jenis transaksi lainnya"
         },
         "Amount": {
+            "column": "amount",
             "icon": "💰",
             "description": "Jumlah nominal uang yang terlibat pada transaksi",
-            "importance": "Sedang",
-            "importance_score": 0.15,
             "fraud_pattern": "Transaksi dengan jumlah sangat besar atau pola jumlah yang tidak wajar bisa mengindikasikan penipuan"
         },
         "NewbalanceDest": {
+            "column": "newbalanceDest",
             "icon": "📈",
             "description": "Saldo penerima (destination) setelah transaksi diterima",
-            "importance": "Rendah",
-            "importance_score": 0.04,
             "fraud_pattern": "Pola akumulasi dana yang tidak wajar dalam waktu singkat pada rekening penerima"
         },
         "Step": {
+            "column": "step",
             "icon": "⏰",
             "description": "Merepresentasikan satuan waktu transaksi, di mana 1 step setara dengan 1 jam sejak awal pencatatan data",
-            "importance": "Sangat Rendah",
-            "importance_score": 0.003,
             "fraud_pattern": "Pola waktu transaksi mencurigakan pada jam-jam tertentu atau dalam rentang waktu yang tidak biasa"
         },
         "OldbalanceDest": {
+            "column": "oldbalanceDest",
             "icon": "🎯",
             "description": "Saldo penerima (destination) sebelum transaksi diterima",
-            "importance": "Sangat Rendah",
-            "importance_score": 0.002,
             "fraud_pattern": "Rekening penerima dengan saldo 0 yang tiba-tiba menerima transfer besar perlu diwaspadai"
         }
     }
     
+    # Importance dihitung dari booster model yang sedang dilayani (gain, dinormalisasi total 1);
+    # nilai hasil analisis training dipakai sebagai cadangan saat model demo aktif
+    explainer = manager.explainer()
+    importance = explainer.importance if explainer is not None else None
+    if importance is None:
+        importance = FALLBACK_IMPORTANCE
+        st.caption("ℹ️ Model XGBoost tidak dimuat - menampilkan Feature Importance dari analisis training")
+    else:
+        st.caption(f"Feature Importance dihitung dari model aktif (versi `{manager.version}`)")
+    for var_info in variables.values():
+        var_info['importance_score'] = importance.get(var_info['column'], 0.0)
+        var_info['importance'] = importance_label(var_info['importance_score'])
+
     # Display variabel dalam bentuk card dengan urutan berdasarkan importance score
     sorted_variables = dict(sorted(variables.items(), key=lambda x: x[1]['importance_score'], reverse=True))
     
@@ -491,7 +638,7 @@ def show_variable_analysis():
             with col2:
                 # Progress bar untuk importance score
                 st.metric("Feature Importance", f"{var_info['importance_score']:.3f}")
-                st.progress(var_info['importance_score'])
+                st.progress(min(var_info['importance_score'], 1.0))
                 
                 # Color coding berdasarkan importance
                 if var_info['importance_score'] >= 0.40:
@@ -503,12 +650,11 @@ def show_variable_analysis():
                 else:
                     st.error("📉 Kontribusi Minimal")
     
-    # Visualisasi importance berdasarkan data aktual dari XGBoost
+    # Visualisasi importance berdasarkan model aktif
     st.markdown("### 📊 Feature Importance dari Model XGBoost")
     
-    # Data sesuai dengan gambar yang diberikan
-    var_names = ['newbalanceOrig', 'oldbalanceOrg', 'type', 'amount', 'newbalanceDest', 'step', 'oldbalanceDest']
-    importance_values = [0.44, 0.19, 0.18, 0.15, 0.04, 0.003, 0.002]
+    var_names = [var_info['column'] for var_info in sorted_variables.values()]
+    importance_values = [var_info['importance_score'] for var_info in sorted_variables.values()]
     
     fig = px.bar(
         x=importance_values,
@@ -533,29 +679,20 @@ def show_variable_analysis():
     
     st.plotly_chart(fig, use_container_width=True)
     
-    # Insight tambahan berdasarkan data XGBoost
+    # Insight tambahan berdasarkan urutan importance
     st.markdown("### 💡 Insights dari Feature Importance XGBoost:")
     
+    ranking = [
+        f"{rank}. **{var_name}** ({var_info['importance_score']:.3f})"
+        for rank, (var_name, var_info) in enumerate(sorted_variables.items(), start=1)
+    ]
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.info("""
-        **🏆 Top 4 Features:**
-        1. **NewbalanceOrig** (0.440) - Saldo pengirim akhir
-        2. **OldbalanceOrg** (0.190) - Saldo pengirim awal  
-        3. **Type** (0.180) - Jenis transaksi
-        4. **Amount** (0.150) - Nominal transaksi
-        """)
+        st.info("**🏆 Top 4 Features:**\n\n" + "\n".join(ranking[:4]))
     
     with col2:
-        st.warning("""
-        **⚖️ Features Minor:**
-        5. **NewbalanceDest** (0.040)
-        6. **Step** (0.003)
-        7. **OldbalanceDest** (0.002)
-        
-        Kontribusi minimal dalam prediksi
-        """)
+        st.warning("**⚖️ Features Minor:**\n\n" + "\n".join(ranking[4:]) + "\n\nKontribusi minimal dalam prediksi")
     
     with col3:
         st.success("""
@@ -565,7 +702,9 @@ def show_variable_analysis():
         - **Pattern saldo** lebih penting dari timing
         """)
 
-def show_prediction(model, scaler, model_loaded):
+def show_prediction(manager, model_loaded):
+    import plotly.graph_objects as go
+    
     st.markdown("## 🔮 Prediksi Penipuan Online")
     
     st.markdown("""
@@ -579,10 +718,21 @@ def show_prediction(model, scaler, model_loaded):
     
     # Status model
     if model_loaded:
-        st.success("🚀 **Model XGBoost Aktif** - Menggunakan model yang telah dilatih")
+        st.success(f"🚀 **Model XGBoost Aktif** - Menggunakan model yang telah dilatih (versi `{manager.version}`)")
     else:
         st.warning("⚠️ **Mode Demo** - Menggunakan simulasi model untuk demonstrasi")
     
+    # Pilihan mode: satu transaksi atau file berisi banyak transaksi
+    mode = st.radio(
+        "Mode Prediksi",
+        ["📝 Transaksi Tunggal", "📁 Scoring File (CSV/Parquet)"],
+        horizontal=True
+    )
+    
+    if mode == "📁 Scoring File (CSV/Parquet)":
+        show_bulk_prediction(manager)
+        return
+    
     # Form input dalam kolom
     col1, col2 = st.columns(2)
     
@@ -661,25 +811,26 @@ def show_prediction(model, scaler, model_loaded):
         )
     
     # Validasi logika saldo
-    balance_check_orig = abs((oldbalanceOrg - amount) - newbalanceOrig)
-    balance_check_dest = abs((oldbalanceDest + amount) - newbalanceDest)
-    
-    if balance_check_orig > 1:  # Toleransi untuk pembulatan
-        st.warning("⚠️ Peringatan: Saldo pengirim tidak konsisten dengan jumlah transaksi!")
-    
-    if balance_check_dest > 1:
-        st.warning("⚠️ Peringatan: Saldo penerima tidak konsisten dengan jumlah transaksi!")
-    
-    # Membuat dataframe untuk input
-    input_data = pd.DataFrame({
-        'step': [step],
-        'type': [type_],
-        'amount': [amount],
-        'oldbalanceOrg': [oldbalanceOrg],
-        'newbalanceOrig': [newbalanceOrig],
-        'oldbalanceDest': [oldbalanceDest],
-        'newbalanceDest': [newbalanceDest]
-    })
+    with metrics.REGISTRY.timer('validate'):
+        balance_check_orig = abs((oldbalanceOrg - amount) - newbalanceOrig)
+        balance_check_dest = abs((oldbalanceDest + amount) - newbalanceDest)
+        
+        if balance_check_orig > 1:  # Toleransi untuk pembulatan
+            st.warning("⚠️ Peringatan: Saldo pengirim tidak konsisten dengan jumlah transaksi!")
+        
+        if balance_check_dest > 1:
+            st.warning("⚠️ Peringatan: Saldo penerima tidak konsisten dengan jumlah transaksi!")
+    
+    # Data transaksi untuk input
+    transaction = {
+        'step': step,
+        'type': type_,
+        'amount': amount,
+        'oldbalanceOrg': oldbalanceOrg,
+        'newbalanceOrig': newbalanceOrig,
+        'oldbalanceDest': oldbalanceDest,
+        'newbalanceDest': newbalanceDest
+    }
     
     # Tombol prediksi dengan styling
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -697,38 +848,20 @@ def show_prediction(model, scaler, model_loaded):
             return
             
         # Cek apakah model tersedia
-        if model is None or scaler is None:
+        if manager is None:
             st.error("❌ Model tidak dapat dimuat. Pastikan file 'xgb_model.pkl' dan 'scaler.pkl' tersedia.")
             return
         
         # Loading animation
         with st.spinner('🔄 Menganalisis data transaksi dengan XGBoost...'):
             try:
-                # Simulasi loading
-                import time
-                time.sleep(1.5)
-                
-                # Encoding type sesuai dengan mapping yang digunakan saat training
-                type_mapping = {
-                    'PAYMENT': 0, 'TRANSFER': 3, 'CASH-IN': 4, 'CASH-OUT': 2, 'DEBIT': 1
-                }
-                
-                # Membuat copy data untuk preprocessing
-                input_data_processed = input_data.copy()
-                
-                # Encoding kolom 'type'
-                input_data_processed['type'] = input_data_processed['type'].map(type_mapping)
-                
-                # Scaling data menggunakan scaler yang sudah dilatih
-                input_data_scaled = scaler.transform(input_data_processed)
-
-                # Melakukan prediksi
-                prediction = model.predict(input_data_scaled)
-                prediction_proba = model.predict_proba(input_data_scaled)
+                # Encoding, scaling dan predict_proba dalam satu panggilan batch
+                result = manager.score([transaction])
+                prediction = result['prediction']
                 
                 # Probabilitas untuk setiap kelas
-                safe_prob = prediction_proba[0][0]  # Probabilitas kelas 0 (tidak fraud)
-                fraud_prob = prediction_proba[0][1]  # Probabilitas kelas 1 (fraud)
+                safe_prob = result['safe_prob'][0]  # Probabilitas kelas 0 (tidak fraud)
+                fraud_prob = result['fraud_prob'][0]  # Probabilitas kelas 1 (fraud)
                 
                 # Results
                 st.markdown("---")
@@ -762,31 +895,32 @@ def show_prediction(model, scaler, model_loaded):
                 
                 with col2:
                     # Probability gauge
-                    fig = go.Figure(go.Indicator(
-                        mode = "gauge+number+delta",
-                        value = fraud_prob * 100,
-                        domain = {'x': [0, 1], 'y': [0, 1]},
-                        title = {'text': "Tingkat Risiko Penipuan (%)"},
-                        delta = {'reference': 50},
-                        gauge = {
-                            'axis': {'range': [None, 100]},
-                            'bar': {'color': "darkblue"},
-                            'steps': [
-                                {'range': [0, 25], 'color': "lightgreen"},
-                                {'range': [25, 50], 'color': "yellow"},
-                                {'range': [50, 75], 'color': "orange"},
-                                {'range': [75, 100], 'color': "red"}
-                            ],
-                            'threshold': {
-                                'line': {'color': "red", 'width': 4},
-                                'thickness': 0.75,
-                                'value': 90
+                    with metrics.REGISTRY.timer('render_chart'):
+                        fig = go.Figure(go.Indicator(
+                            mode = "gauge+number+delta",
+                            value = fraud_prob * 100,
+                            domain = {'x': [0, 1], 'y': [0, 1]},
+                            title = {'text': "Tingkat Risiko Penipuan (%)"},
+                            delta = {'reference': 50},
+                            gauge = {
+                                'axis': {'range': [None, 100]},
+                                'bar': {'color': "darkblue"},
+                                'steps': [
+                                    {'range': [0, 25], 'color': "lightgreen"},
+                                    {'range': [25, 50], 'color': "yellow"},
+                                    {'range': [50, 75], 'color': "orange"},
+                                    {'range': [75, 100], 'color': "red"}
+                                ],
+                                'threshold': {
+                                    'line': {'color': "red", 'width': 4},
+                                    'thickness': 0.75,
+                                    'value': 90
+                                }
                             }
-                        }
-                    ))
+                        ))
                     
-                    fig.update_layout(height=300)
-                    st.plotly_chart(fig, use_container_width=True)
+                        fig.update_layout(height=300)
+                        st.plotly_chart(fig, use_container_width=True)
                     
                     # Detailed probabilities
                     st.metric("🔒 Probabilitas Aman", f"{safe_prob:.4f} ({safe_prob:.2%})")
@@ -799,33 +933,10 @@ def show_prediction(model, scaler, model_loaded):
                 # Risk factors analysis
                 st.markdown("### 🔍 Analisis Faktor Risiko")
                 
-                risk_factors = []
-                
-                # Analyze risk factors berdasarkan pola yang umum dalam fraud detection
-                if amount > 1000000:
-                    risk_factors.append("💰 Jumlah transaksi sangat besar (> 1 juta)")
-                
-                if type_ in ['CASH-OUT', 'TRANSFER']:
-                    risk_factors.append("💳 Jenis transaksi berisiko tinggi (CASH-OUT/TRANSFER)")
-                
-                if oldbalanceOrg == 0:
-                    risk_factors.append("🏦 Saldo pengirim kosong")
-                
-                if newbalanceDest == oldbalanceDest + amount and oldbalanceDest == 0:
-                    risk_factors.append("🎯 Penerima rekening baru/kosong")
-                
-                if amount > oldbalanceOrg:
-                    risk_factors.append("⚠️ Jumlah transaksi melebihi saldo pengirim")
-                
-                # Analisis waktu transaksi berdasarkan jam
-                if transaction_hour >= 0 and transaction_hour <= 5:  # Dini hari
-                    risk_factors.append("🌙 Transaksi pada dini hari (00:00-05:59)")
-                elif transaction_hour >= 22:  # Malam hari
-                    risk_factors.append("🌃 Transaksi pada malam hari (22:00-23:59)")
-                
-                # Analisis berdasarkan step yang tinggi (akhir bulan)
-                if step > 600:  # Mendekati akhir dataset (hari ke-25+)
-                    risk_factors.append("📅 Transaksi pada akhir periode (hari 25+)")
+                # Faktor risiko dari mesin aturan yang sama dengan pre-filter scoring
+                rule_engine = manager.rules if manager.rules is not None else rules.RuleEngine()
+                risk_factors = rule_engine.explain([transaction])[0]
+                decided_by = result.get('decided_by', [''])[0]
                 
                 # Tampilkan hasil analisis
                 col1, col2 = st.columns(2)
@@ -841,15 +952,311 @@ def show_prediction(model, scaler, model_loaded):
                 with col2:
                     # Summary statistics
                     st.info("**📊 Ringkasan Prediksi:**")
-                    st.write(f"• **Model:** XGBoost Classifier")
+                    if decided_by:
+                        st.write(f"• **Diputuskan oleh aturan:** {rule_engine.labels[rule_engine.names.index(decided_by)]}")
+                    else:
+                        st.write(f"• **Model:** XGBoost Classifier (versi `{result['model_version']}`)")
                     st.write(f"• **Waktu:** Hari {transaction_day}, Jam {transaction_hour:02d}:00")
                     st.write(f"• **Prediksi:** {'Fraud' if prediction[0] == 1 else 'Bukan Fraud'}")
                     st.write(f"• **Confidence:** {confidence:.1%}")
                     st.write(f"• **Risk Level:** {len(risk_factors)} faktor risiko")
                 
+                # Alasan model: kontribusi tiap fitur (log-odds) terhadap skor transaksi ini
+                explainer = manager.explainer()
+                if explainer is not None and not decided_by:
+                    st.markdown("### 🧠 Alasan Model")
+                    explanation = explainer.contributions([transaction])
+                    contributions = explanation['contributions'][0]
+                    reasons = explain.top_reasons(explanation['contributions'])[0]
+                    
+                    col1, col2 = st.columns([1, 2])
+                    
+                    with col1:
+                        if reasons:
+                            st.warning("**📌 Faktor yang Menaikkan Risiko:**")
+                            for feature, value in reasons:
+                                st.write(f"• {explain.FEATURE_LABELS[feature]} (+{value:.2f})")
+                        else:
+                            st.success("✅ Tidak ada fitur yang menaikkan skor risiko")
+                        st.caption(f"Nilai dasar model: {explanation['bias'][0]:.2f} log-odds")
+                    
+                    with col2:
+                        labels = [explain.FEATURE_LABELS[feature] for feature in scoring.FEATURE_COLUMNS]
+                        fig = go.Figure(go.Bar(
+                            x=contributions.tolist(),
+                            y=labels,
+                            orientation='h',
+                            marker_color=['crimson' if value > 0 else 'seagreen' for value in contributions],
+                            text=[f"{value:+.2f}" for value in contributions],
+                        ))
+                        fig.update_layout(
+                            title="Kontribusi Fitur terhadap Skor (log-odds)",
+                            xaxis_title="Kontribusi",
+                            height=350,
+                            yaxis={'categoryorder': 'array', 'categoryarray': [
+                                label for _, label in sorted(zip(abs(contributions), labels))
+                            ]},
+                            plot_bgcolor='rgba(0,0,0,0)',
+                            paper_bgcolor='rgba(0,0,0,0)',
+                        )
+                        st.plotly_chart(fig, use_container_width=True)
+                
             except Exception as e:
                 st.error(f"❌ Error dalam prediksi: {str(e)}")
                 st.error("Pastikan format data input sesuai dengan model yang dilatih")
 
+# Direktori server yang file-nya boleh di-score lewat path (env SAFEPAY_BULK_DIR); tanpa
+# konfigurasi, file hanya bisa diunggah
+BULK_SERVER_DIR = os.environ.get('SAFEPAY_BULK_DIR')
+
+# Hasil scoring file ditulis ke direktori ini dan dihapus setelah BULK_OUTPUT_MAX_AGE detik
+BULK_OUTPUT_DIR = os.path.join(tempfile.gettempdir(), 'safepay-bulk')
+BULK_OUTPUT_MAX_AGE = 6 * 3600
+
+# download_button membaca seluruh file ke memori; hasil yang lebih besar tidak ditawarkan lewat browser
+BULK_DOWNLOAD_MAX_BYTES = 200 * 1024 * 1024
+
+
+# Fungsi untuk menghapus hasil scoring file yang sudah kedaluwarsa (sesi yang ditinggalkan
+# tidak pernah menghapus hasilnya sendiri)
+def prune_bulk_outputs(max_age=BULK_OUTPUT_MAX_AGE):
+    cutoff = time.time() - max_age
+    for entry in os.scandir(BULK_OUTPUT_DIR):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+# Fungsi untuk menghapus file hasil scoring; file yang sudah tidak ada diabaikan
+def remove_bulk_output(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# Fungsi untuk memvalidasi path file di server: harus berada di dalam BULK_SERVER_DIR
+def resolve_server_path(path):
+    root = os.path.realpath(BULK_SERVER_DIR)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"Path harus berada di dalam direktori {root}")
+    if not os.path.isfile(resolved):
+        raise ValueError(f"File tidak ditemukan: {path}")
+    return resolved
+
+
+def show_bulk_prediction(manager):
+    import bulk_scoring
+    
+    st.markdown("""
+    <div class="feature-card">
+        <h3>📁 Scoring File Transaksi</h3>
+        <p>Unggah file berformat PaySim (CSV atau Parquet) dengan kolom step, type, amount, 
+        oldbalanceOrg, newbalanceOrig, oldbalanceDest dan newbalanceDest. File diproses per chunk 
+        sehingga pemakaian memori tetap terbatas, lalu hasilnya dapat diunduh.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    uploaded_file = st.file_uploader("📤 Unggah File Transaksi", type=["csv", "parquet"])
+    
+    # File sangat besar bisa dibaca langsung dari disk server tanpa diunggah, terbatas pada
+    # direktori yang dikonfigurasi
+    server_path = None
+    if BULK_SERVER_DIR:
+        server_path = st.text_input(
+            "🗂️ Atau Path File di Server",
+            help=f"Path file CSV/Parquet di dalam {BULK_SERVER_DIR} (untuk file berukuran sangat besar)"
+        )
+    
+    chunksize = st.number_input(
+        "📦 Jumlah Baris per Chunk",
+        min_value=10_000, max_value=2_000_000, value=bulk_scoring.DEFAULT_CHUNKSIZE, step=50_000
+    )
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        score_button = st.button(
+            "🚀 Proses File",
+            type="primary",
+            use_container_width=True
+        )
+    
+    if score_button:
+        if manager is None:
+            st.error("❌ Model tidak dapat dimuat. Pastikan file 'xgb_model.pkl' dan 'scaler.pkl' tersedia.")
+            return
+        
+        if uploaded_file is not None:
+            source, name = uploaded_file, uploaded_file.name
+        elif server_path:
+            try:
+                source = resolve_server_path(server_path)
+            except ValueError as e:
+                st.error(f"❌ {e}")
+                return
+            name = source
+        else:
+            st.error("❌ Unggah file atau isi path file di server terlebih dahulu")
+            return
+        
+        # Hasil sebelumnya di sesi ini diganti, dan hasil sesi lain yang kedaluwarsa dihapus
+        previous = st.session_state.pop('bulk_result', None)
+        if previous:
+            remove_bulk_output(previous['path'])
+        os.makedirs(BULK_OUTPUT_DIR, exist_ok=True)
+        prune_bulk_outputs()
+        
+        output = None
+        try:
+            file_format = bulk_scoring.detect_format(name)
+            
+            # Hasil scoring ditulis ke file sementara, bukan ditampung di memori
+            output = tempfile.NamedTemporaryFile(suffix=f".{file_format}", dir=BULK_OUTPUT_DIR, delete=False)
+            output.close()
+            
+            progress_bar = st.progress(0.0, text="🔄 Memproses file...")
+            
+            def update_progress(progress, summary):
+                progress_bar.progress(
+                    progress,
+                    text=f"🔄 {summary['rows']:,} transaksi diproses, {summary['fraud']:,} terindikasi penipuan"
+                )
+            
+            # Satu snapshot model untuk seluruh file; keputusan ikut tercatat lewat on_scored
+            summary = bulk_scoring.score_file(
+                manager, source, output.name, file_format,
+                chunksize=int(chunksize), progress_callback=update_progress
+            )
+            progress_bar.progress(1.0, text="✅ Selesai")
+            
+            st.session_state.bulk_result = {
+                'path': output.name,
+                'file_name': f"scored_{os.path.basename(name)}",
+                'summary': summary
+            }
+        except Exception as e:
+            if output is not None:
+                remove_bulk_output(output.name)
+            st.error(f"❌ Error dalam scoring file: {str(e)}")
+            st.error("Pastikan file berformat PaySim dan berisi kolom yang dibutuhkan model")
+            return
+    
+    # Hasil disimpan di session state agar tetap ada setelah rerun (misalnya saat unduh)
+    bulk_result = st.session_state.get('bulk_result')
+    if bulk_result and os.path.exists(bulk_result['path']):
+        summary = bulk_result['summary']
+        
+        st.markdown("---")
+        st.markdown("## 🎯 Hasil Scoring File")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("📄 Transaksi Diproses", f"{summary['rows']:,}")
+        with col2:
+            st.metric("🚨 Terindikasi Penipuan", f"{summary['fraud']:,}")
+        with col3:
+            fraud_rate = summary['fraud'] / summary['rows'] if summary['rows'] else 0.0
+            st.metric("📊 Persentase Penipuan", f"{fraud_rate:.2%}")
+        st.caption(f"Versi model: {summary['model_version']}")
+        
+        size = os.path.getsize(bulk_result['path'])
+        if size > BULK_DOWNLOAD_MAX_BYTES:
+            st.warning(
+                f"⚠️ Hasil scoring berukuran {size / 1024 ** 2:,.0f} MB, terlalu besar untuk diunduh lewat "
+                f"browser. File tersedia di server: {bulk_result['path']} (dihapus otomatis setelah "
+                f"{BULK_OUTPUT_MAX_AGE // 3600} jam). Untuk dataset sebesar ini gunakan rescore.py."
+            )
+        else:
+            with open(bulk_result['path'], "rb") as scored_file:
+                st.download_button(
+                    "📥 Unduh Hasil Scoring",
+                    data=scored_file,
+                    file_name=bulk_result['file_name'],
+                    use_container_width=True
+                )
+
+def show_admin_panel():
+    st.markdown("""
+    <div class="feature-card">
+        <h3>🛠️ Panel Admin: Latensi dan Throughput</h3>
+        <p>Waktu per tahap scoring di proses aplikasi ini (validasi input, encoding, scaling, 
+        predict_proba, render grafik). Kuantil dan laju dihitung dari jendela bergulir 
+        60 detik terakhir; jumlah dihitung sejak aplikasi berjalan.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    snapshot = metrics.REGISTRY.snapshot()
+    
+    def ms(value):
+        return f"{value * 1000:.3f}" if value is not None else "-"
+    
+    st.markdown("### ⏱️ Latensi per Tahap (ms)")
+    if snapshot['stages']:
+        rows = {
+            'Tahap': [], 'Jumlah': [], 'Rata-rata': [], 'p50': [], 'p95': [], 'p99': [], 'Per detik': []
+        }
+        for stage, summary in snapshot['stages'].items():
+            rows['Tahap'].append(stage)
+            rows['Jumlah'].append(summary['count'])
+            rows['Rata-rata'].append(ms(summary['mean']))
+            rows['p50'].append(ms(summary['p50']))
+            rows['p95'].append(ms(summary['p95']))
+            rows['p99'].append(ms(summary['p99']))
+            rows['Per detik'].append(f"{summary['rate']:.2f}")
+        st.table(rows)
+    else:
+        st.info("Belum ada data latensi. Lakukan prediksi terlebih dahulu.")
+    
+    st.markdown("### 📈 Throughput")
+    counters = snapshot['counters']
+    col1, col2 = st.columns(2)
+    with col1:
+        transactions = counters.get('transactions', {'total': 0, 'rate': 0.0})
+        st.metric("Transaksi Di-score", f"{transactions['total']:,}", f"{transactions['rate']:.2f}/detik")
+    with col2:
+        calls = counters.get('scoring_calls', {'total': 0, 'rate': 0.0})
+        st.metric("Panggilan Scoring", f"{calls['total']:,}", f"{calls['rate']:.2f}/detik")
+    
+    # Manager biasanya sudah dimuat oleh thread prewarm, jadi pemanggilan ini murah
+    manager, model_loaded = load_model_manager()
+    if manager is not None:
+        st.markdown("### 🧠 Model")
+        st.write(f"• **Versi aktif:** `{manager.version}`")
+        st.write(f"• **Reload berhasil:** {manager.reloads} · **Ditolak:** {manager.rejected}")
+        if manager.cache is not None:
+            st.write("• **Cache prediksi:**", manager.cache.stats())
+        if manager.rules is not None:
+            st.write("• **Pre-filter aturan:**", manager.rules.stats())
+        if model_loaded:
+            st.write("• **Log audit keputusan:**", load_audit_log().stats())
+            st.write("• **Riwayat scoring:**", load_history_store().stats())
+        
+        if model_loaded:
+            report = load_drift_monitor(manager.active['scaler']).report()
+            st.markdown("### 📉 Drift Fitur dan Skor")
+            st.caption(
+                f"{report['rows']:,} transaksi dipantau · jendela terakhir {report['window_rows']:,} transaksi · "
+                f"referensi PSI/KS: {report['reference'] or 'belum tersedia (menunggu baseline)'}"
+            )
+            
+            def fmt(value, pattern="{:.3f}"):
+                return pattern.format(value) if value is not None else "-"
+            
+            rows = {'Fitur': [], 'Status': [], 'PSI': [], 'KS': [], 'Geser Median (IQR)': [], 'Rasio IQR': []}
+            for name, entry in list(report['features'].items()) + [('fraud_prob', report['score'])]:
+                rows['Fitur'].append(name)
+                rows['Status'].append(entry['status'])
+                rows['PSI'].append(fmt(entry.get('psi')))
+                rows['KS'].append(fmt(entry.get('ks')))
+                rows['Geser Median (IQR)'].append(fmt(entry.get('median_shift'), "{:+.2f}"))
+                rows['Rasio IQR'].append(fmt(entry.get('iqr_ratio'), "{:.2f}"))
+            st.table(rows)
+    
+    with st.expander("📄 Format Prometheus (/metrics)"):
+        st.code(metrics.REGISTRY.render_prometheus(), language="text")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,95 @@
+import numpy as np
+
+import metrics
+import scoring
+
+# Jumlah baris per record batch saat membaca Parquet
+DEFAULT_BATCH_SIZE = 250_000
+
+# Kode type sebagai int8 (nilai sama dengan scoring.TYPE_MAPPING)
+TYPE_DTYPE = np.int8
+
+
+# Fungsi untuk mengecek apakah objek adalah RecordBatch/Table Arrow tanpa mengimpor pyarrow
+def is_arrow(data):
+    return type(data).__module__.startswith('pyarrow') and hasattr(data, 'schema')
+
+
+# Fungsi untuk mengubah kolom type (string, dictionary atau kode numerik) menjadi kode int8.
+# Mapping dilakukan pada dictionary (paling banyak beberapa nilai unik), bukan per baris.
+def type_codes(column):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if isinstance(column, pa.ChunkedArray):
+        column = column.combine_chunks()
+    if column.null_count:
+        raise ValueError("Jenis transaksi kosong ditemukan")
+    if pa.types.is_integer(column.type) or pa.types.is_floating(column.type):
+        return column.to_numpy(zero_copy_only=False).astype(TYPE_DTYPE)
+    if not pa.types.is_dictionary(column.type):
+        column = pc.dictionary_encode(column)
+
+    names = column.dictionary.to_pylist()
+    lookup = np.empty(len(names), dtype=TYPE_DTYPE)
+    for i, name in enumerate(names):
+        if name not in scoring.TYPE_MAPPING:
+            raise ValueError(f"Jenis transaksi tidak dikenal: {name!r}")
+        lookup[i] = scoring.TYPE_MAPPING[name]
+    return lookup[column.indices.to_numpy(zero_copy_only=False)]
+
+
+# Fungsi untuk membangun matriks fitur (N x 7) C-contiguous langsung dari kolom Arrow, tanpa
+# DataFrame perantara
+def encode_batch(batch, dtype=np.float64):
+    names = batch.schema.names
+    missing = [column for column in scoring.FEATURE_COLUMNS if column not in names]
+    if missing:
+        raise ValueError(f"Kolom wajib tidak ditemukan: {', '.join(missing)}")
+
+    X = np.empty((batch.num_rows, len(scoring.FEATURE_COLUMNS)), dtype=dtype)
+    for j, column in enumerate(scoring.FEATURE_COLUMNS):
+        values = batch.column(column)
+        if j == scoring.TYPE_INDEX:
+            X[:, j] = type_codes(values)
+        else:
+            # Kolom numerik tanpa null dibaca zero-copy dari buffer Arrow, lalu ditulis ke matriks
+            X[:, j] = values.to_numpy(zero_copy_only=False)
+    return X
+
+
+# Fungsi untuk probabilitas penipuan; booster XGBoost menerima matriks float32 tanpa DMatrix
+def predict_proba(model, X):
+    if hasattr(model, 'get_booster'):
+        return model.get_booster().inplace_predict(X)
+    return np.asarray(model.predict_proba(X))[:, 1]
+
+
+# Fungsi untuk scoring satu RecordBatch/Table Arrow; hasil identik dengan scoring.score_batch.
+# Encoding dan scaling dikerjakan dalam float64 seperti jalur interaktif; hanya matriks akhir yang
+# diturunkan ke float32 (tipe internal XGBoost), sehingga keputusan di sekitar threshold sama.
+def score_batch(model, scaler, batch, threshold=scoring.DEFAULT_THRESHOLD):
+    with metrics.REGISTRY.timer('encode'):
+        X = encode_batch(batch)
+    with metrics.REGISTRY.timer('scale'):
+        X = scoring.scale_features(scaler, X, copy=False).astype(np.float32)
+    with metrics.REGISTRY.timer('predict_proba'):
+        fraud_prob = predict_proba(model, X)
+    return {
+        'fraud_prob': fraud_prob,
+        'safe_prob': 1.0 - fraud_prob,
+        'prediction': (fraud_prob > threshold).astype(np.int64),
+    }
+
+
+# Fungsi untuk membaca file Parquet per record batch, menghasilkan (RecordBatch, progres 0-1).
+# Kolom type dibaca sebagai dictionary sehingga string per baris tidak pernah dibuat.
+def iter_parquet(source, batch_size=DEFAULT_BATCH_SIZE, columns=None):
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(source, read_dictionary=['type'])
+    total_rows = parquet_file.metadata.num_rows
+    rows_read = 0
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        rows_read += batch.num_rows
+        yield batch, rows_read / max(total_rows, 1)
@@ -0,0 +1,291 @@
+import atexit
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+import numpy as np
+
+import bounded_queue
+import scoring
+
+DEFAULT_DIRECTORY = 'audit'
+
+# Segmen dirotasi jika melewati ukuran atau umur ini, lalu dikompresi (gzip)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_AGE = 3600.0
+
+# Level gzip segmen tertutup; level rendah cukup untuk JSONL dan jauh lebih murah daripada level 9
+DEFAULT_COMPRESS_LEVEL = 3
+
+# Writer menulis dan melakukan fsync setiap interval ini (detik)
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# Jumlah keputusan (baris) maksimum yang menunggu di antrean; memori tetap terbatas saat lonjakan
+DEFAULT_QUEUE_ROWS = 500_000
+
+# Perilaku saat antrean penuh: 'block' (default; scoring menunggu writer, tidak ada keputusan
+# yang hilang) atau 'drop' (jalur scoring tidak pernah menunggu, batch dihitung sebagai dropped)
+OVERFLOW_POLICIES = ('block', 'drop')
+
+# Kolom hasil scoring yang ikut dicatat per transaksi (jika ada)
+RESULT_COLUMNS = ('fraud_prob', 'prediction', 'decided_by', 'stage', 'rounds')
+
+
+# Fungsi untuk mengubah transaksi (dict, list of dict, DataFrame, matriks) menjadi list of dict
+def _transaction_records(transactions):
+    if isinstance(transactions, dict):
+        return [transactions]
+    if isinstance(transactions, (list, tuple)):
+        return transactions
+    if isinstance(transactions, np.ndarray) and transactions.dtype.names is None:
+        return [dict(zip(scoring.FEATURE_COLUMNS, row)) for row in transactions.tolist()]
+    if hasattr(transactions, 'to_pylist'):
+        # RecordBatch/Table Arrow
+        return transactions.to_pylist()
+    if hasattr(transactions, 'to_dict'):
+        return transactions.to_dict('records')
+    names = transactions.dtype.names
+    return [dict(zip(names, row)) for row in transactions.tolist()]
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Tipe {type(value).__name__} tidak dapat ditulis ke log audit")
+
+
+# Nilai yang tidak dikenal JSON ditulis sebagai teks agar keputusannya tetap tercatat
+def _lenient_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+# Satu encoder dipakai ulang (json.dumps dengan argumen default membuat encoder baru per panggilan)
+_ENCODER = json.JSONEncoder(default=_json_default)
+_LENIENT_ENCODER = json.JSONEncoder(default=_lenient_default)
+
+
+# Fungsi untuk mengubah satu batch keputusan menjadi baris-baris JSONL
+def _encode_lines(item, encoder):
+    timestamp, transactions, result, model_version = item
+    rows = _transaction_records(transactions)
+    columns = [(name, result[name].tolist()) for name in RESULT_COLUMNS if name in result]
+    lines = []
+    for i, row in enumerate(rows):
+        entry = {'ts': timestamp, 'model_version': model_version, 'transaction': row}
+        for name, values in columns:
+            entry[name] = values[i]
+        lines.append(encoder.encode(entry))
+    return lines
+
+
+# Log audit keputusan append-only (JSONL). Jalur scoring hanya memasukkan referensi hasil ke
+# antrean yang dibatasi jumlah baris; serialisasi, penulisan, fsync per batch dan rotasi
+# dikerjakan oleh satu thread writer di background, sedangkan kompresi segmen yang sudah ditutup
+# dikerjakan thread tersendiri agar writer tidak tertahan. Secara default tidak ada keputusan
+# yang dibuang: saat antrean penuh, scoring menunggu writer.
+class AuditLog:
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, queue_rows=DEFAULT_QUEUE_ROWS, overflow='block',
+                 compress_level=DEFAULT_COMPRESS_LEVEL):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Kebijakan overflow tidak dikenal: {overflow!r} (pilih {', '.join(OVERFLOW_POLICIES)})")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.compress_level = compress_level
+
+        self.records = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self.fsyncs = 0
+        self.segments = 0
+        self.compressed = 0
+        self.errors = 0
+        self.last_error = None
+
+        self._queue = bounded_queue.RowQueue(queue_rows)
+        # Data yang sudah diserialisasi tetapi gagal ditulis, dicoba lagi pada siklus berikutnya.
+        # Selama isinya mencapai batas antrean, antrean tidak dikosongkan (kebijakan overflow berlaku).
+        self._unwritten = []
+        self._unwritten_records = 0
+        self._segment = None
+        self._segment_path = None
+        self._segment_opened = None
+        self._segment_bytes = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        # Path segmen tertutup yang menunggu dikompresi; None menghentikan thread kompresi
+        self._closed_segments = queue.Queue()
+        self._compressor = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._closed = False
+
+    def start(self):
+        if self._thread is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, name='audit-log', daemon=True)
+            self._thread.start()
+            self._compressor = threading.Thread(target=self._compress_segments, name='audit-log-gzip', daemon=True)
+            self._compressor.start()
+            # Segmen terakhir tetap ditutup dan dikompresi saat proses berhenti normal
+            atexit.register(self.close)
+        return self
+
+    # Fungsi untuk mencatat keputusan satu batch; tidak melakukan I/O di thread pemanggil
+    def record(self, transactions, result, model_version=None):
+        if self._closed:
+            return False
+        n_rows = len(result['fraud_prob'])
+        # Writer dibangunkan lebih awal jika antrean hampir penuh
+        if self._queue.rows + n_rows >= self._queue.max_rows // 2:
+            self._wake.set()
+        if self._queue.put((time.time(), transactions, result, model_version), n_rows,
+                           block=self.overflow == 'block'):
+            return True
+        with self._lock:
+            self.dropped += n_rows
+        return False
+
+    # Writer bangun sekali per flush_interval dan mengambil semua yang mengantre, sehingga satu
+    # fsync mencakup banyak batch dan thread scoring jarang berebut GIL dengan writer
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            stop = self._stop.is_set()
+            # Jika penulisan terus gagal, data tertunda tidak bertambah melebihi batas antrean
+            items = self._queue.drain() if stop or self._unwritten_records < self._queue.max_rows else []
+
+            try:
+                self._write(items)
+                if self._segment is not None and (
+                    stop or self._segment_bytes >= self.max_bytes
+                    or time.time() - self._segment_opened >= self.max_age
+                ):
+                    self._rotate()
+            except Exception as e:
+                self._error(e)
+                # Segmen yang gagal ditulis tidak dipakai lagi; percobaan berikutnya membuka segmen baru
+                if self._segment is not None:
+                    try:
+                        self._segment.close()
+                    except OSError:
+                        pass
+                    self._segment = None
+            if stop:
+                return
+
+    def _error(self, error):
+        with self._lock:
+            self.errors += 1
+            self.last_error = str(error)
+
+    # Setiap batch diserialisasi terpisah: satu nilai yang bermasalah tidak menghilangkan batch lain
+    def _serialize(self, items):
+        lines = []
+        for item in items:
+            try:
+                lines.extend(_encode_lines(item, _ENCODER))
+            except Exception as e:
+                self._error(e)
+                try:
+                    lines.extend(_encode_lines(item, _LENIENT_ENCODER))
+                except Exception as e:
+                    self._error(e)
+                    with self._lock:
+                        self.dropped += len(item[2]['fraud_prob'])
+        return lines
+
+    def _write(self, items):
+        lines = self._serialize(items)
+        if lines:
+            self._unwritten.append(('\n'.join(lines) + '\n').encode())
+            self._unwritten_records += len(lines)
+        if not self._unwritten:
+            return
+        data = b''.join(self._unwritten)
+
+        if self._segment is None:
+            self._open_segment()
+        self._segment.write(data)
+        self._segment.flush()
+        os.fsync(self._segment.fileno())
+        self._segment_bytes += len(data)
+        with self._lock:
+            self.records += self._unwritten_records
+            self.bytes_written += len(data)
+            self.fsyncs += 1
+        self._unwritten, self._unwritten_records = [], 0
+
+    def _open_segment(self):
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        self._segment_path = os.path.join(self.directory, f"decisions-{stamp}-{os.getpid()}-{self.segments}.jsonl")
+        self._segment = open(self._segment_path, 'ab')
+        self._segment_opened = time.time()
+        self._segment_bytes = 0
+
+    # Fungsi untuk menutup segmen aktif dan menyerahkannya ke thread kompresi
+    def _rotate(self):
+        if self._segment is None:
+            return
+        self._segment.close()
+        self._closed_segments.put(self._segment_path)
+        self._segment = None
+        with self._lock:
+            self.segments += 1
+
+    # Segmen tertutup dikompresi menjadi .jsonl.gz; jika gagal, segmen mentah tetap disimpan
+    def _compress_segments(self):
+        while True:
+            path = self._closed_segments.get()
+            if path is None:
+                return
+            try:
+                with open(path, 'rb') as source, \
+                        gzip.open(path + '.gz.tmp', 'wb', compresslevel=self.compress_level) as target:
+                    shutil.copyfileobj(source, target)
+                os.replace(path + '.gz.tmp', path + '.gz')
+                os.remove(path)
+                with self._lock:
+                    self.compressed += 1
+            except Exception as e:
+                self._error(e)
+
+    # Fungsi untuk mengosongkan antrean, menulis sisa keputusan dan menghentikan writer
+    def close(self):
+        if self._closed or self._thread is None:
+            return
+        self._closed = True
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        self._closed_segments.put(None)
+        self._compressor.join()
+        self._compressor = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'records': self.records,
+                'dropped': self.dropped,
+                'queued_batches': len(self._queue),
+                'queued_rows': self._queue.rows,
+                'unwritten_records': self._unwritten_records,
+                'bytes_written': self.bytes_written,
+                'fsyncs': self.fsyncs,
+                'segments': self.segments,
+                'compressed_segments': self.compressed,
+                'pending_compression': self._closed_segments.qsize(),
+                'errors': self.errors,
+                'last_error': self.last_error,
+            }
@@ -0,0 +1,157 @@
+import asyncio
+import functools
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+# Batas ukuran micro-batch dan waktu tunggu maksimum sebelum batch dikirim ke model
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_WAIT_MS = 2.0
+
+
+# Micro-batcher: mengumpulkan request yang datang bersamaan menjadi satu panggilan scoring.
+# score_fn menerima list transaksi dan mengembalikan dict berisi array hasil per baris.
+# Request dengan deadline di-score terpisah dari request tanpa deadline, dikelompokkan per rentang
+# budget; score_fn kelompok tersebut menerima budget_ms: sisa waktu deadline paling awal di
+# kelompok saat scoring dimulai (waktu antre sudah terpotong). Budget yang ketat satu request
+# tidak memotong model untuk request lain di batch yang sama.
+# concurrency menentukan berapa batch yang boleh di-score bersamaan (misalnya satu per worker pool).
+class MicroBatcher:
+    def __init__(self, score_fn, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 concurrency=1):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.concurrency = concurrency
+        self.batches = 0
+        self.items = 0
+
+        self._queue = None
+        self._task = None
+        self._last_batch_size = 0
+        self._slots = None
+        self._inflight = set()
+        # Satu thread scoring per batch yang berjalan: request baru tetap terkumpul selama
+        # semua slot sedang memproses batch sebelumnya
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='scoring')
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._inflight):
+            task.cancel()
+        self._executor.shutdown(wait=False)
+
+    # Fungsi untuk scoring satu transaksi; hasilnya dict nilai skalar per kolom hasil.
+    # deadline (opsional) dalam satuan loop.time()
+    async def submit(self, transaction, deadline=None):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((transaction, future, deadline))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+
+        # Ambil semua request yang sudah mengantre tanpa menunggu
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+        # Adaptif: hanya menunggu deadline jika batch sebelumnya menunjukkan ada beban bersamaan,
+        # sehingga request tunggal saat trafik sepi tidak dikenai latensi tambahan
+        if self._last_batch_size > 1:
+            deadline = asyncio.get_running_loop().time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+        self._last_batch_size = len(batch)
+        return batch
+
+    async def _run(self):
+        while True:
+            # Batch berikutnya baru dikumpulkan setelah ada slot scoring yang kosong
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.create_task(self._score(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _score(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            for group in _budget_groups(batch, loop.time()):
+                score_fn = self.score_fn
+                deadlines = [deadline for _, _, deadline in group if deadline is not None]
+                if deadlines:
+                    budget_ms = max(0.0, (min(deadlines) - loop.time()) * 1000.0)
+                    score_fn = functools.partial(self.score_fn, budget_ms=budget_ms)
+                await self._score_group(loop, score_fn, group)
+        finally:
+            self._slots.release()
+        self.batches += 1
+        self.items += len(batch)
+
+    async def _score_group(self, loop, score_fn, group):
+        transactions = [transaction for transaction, _, _ in group]
+        futures = [future for _, future, _ in group]
+        try:
+            result = await loop.run_in_executor(self._executor, score_fn, transactions)
+        except Exception:
+            # Satu transaksi yang tidak valid tidak boleh menggagalkan seluruh batch
+            await self._score_individually(loop, score_fn, transactions, futures)
+            return
+        for i, future in enumerate(futures):
+            if not future.done():
+                future.set_result(_row(result, i))
+
+    async def _score_individually(self, loop, score_fn, transactions, futures):
+        for transaction, future in zip(transactions, futures):
+            try:
+                result = await loop.run_in_executor(self._executor, score_fn, [transaction])
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(_row(result, 0))
+
+
+# Fungsi untuk membagi batch menurut budget: request dengan deadline dikelompokkan per rentang
+# sisa waktu berbasis pangkat dua (1, 2, 4, 8, ... milidetik) dan di-score lebih dulu, deadline terdekat di depan;
+# request tanpa deadline di-score bersama dengan model penuh
+def _budget_groups(batch, now):
+    groups = {}
+    for item in sorted((item for item in batch if item[2] is not None), key=lambda item: item[2]):
+        remaining_ms = max((item[2] - now) * 1000.0, 1e-3)
+        groups.setdefault(math.floor(math.log2(remaining_ms)), []).append(item)
+    ordered = [groups[key] for key in sorted(groups)]
+    unbounded = [item for item in batch if item[2] is None]
+    return ordered + [unbounded] if unbounded else ordered
+
+
+# Nilai per baris diambil dari array hasil; nilai skalar (misalnya versi model) disalin apa adanya
+def _row(result, i):
+    row = {}
+    for key, value in result.items():
+        if getattr(value, 'ndim', 0) > 0:
+            value = value[i]
+        row[key] = value.item() if hasattr(value, 'item') else value
+    return row
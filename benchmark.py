@@ -0,0 +1,325 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# Model yang dibenchmark: nama -> deskripsi cara memuat
+MODELS = {
+    'xgb': "XGBoost (xgb_model.pkl) lewat scoring.score_batch",
+    'xgb_compiled': "XGBoost dikompilasi ke tree_engine (scaler dilebur)",
+    'rf': "Random forest (rf_model.pkl) lewat scoring.score_batch",
+    'rf_compiled': "Random forest dikompilasi ke tree_engine",
+    'mock': "MockModel + MockScaler (fallback demo)",
+}
+
+DEFAULT_BATCH_SIZES = [1, 10, 100, 1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_SINGLE_ROW_REPEATS = 500
+DEFAULT_SEED = 42
+
+# Modul yang diukur waktu import-nya, masing-masing di proses Python baru
+IMPORT_TARGETS = ['numpy', 'pandas', 'joblib', 'sklearn.ensemble', 'xgboost', 'scoring', 'tree_engine',
+                  'streamlit']
+
+# Jumlah pengulangan pengukuran import; nilai minimum yang dilaporkan (paling sedikit noise)
+IMPORT_REPEATS = 3
+
+# Batas perubahan relatif sebelum dianggap regresi saat dibandingkan dengan baseline
+DEFAULT_TOLERANCE = 0.15
+
+# Fungsi untuk membuat transaksi sintetis berformat PaySim yang deterministik (seed tetap)
+def synthetic_transactions(n_rows, seed=DEFAULT_SEED):
+    import paysim_generator
+
+    return next(paysim_generator.iter_transactions(n_rows, chunksize=n_rows, seed=seed))
+
+
+def _proc_status_mb(field):
+    try:
+        with open('/proc/self/status') as handle:
+            for line in handle:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+# Fungsi untuk me-reset puncak RSS proses (Linux: VmHWM lewat /proc/self/clear_refs).
+# ru_maxrss tidak bisa di-reset dan ikut mewarisi puncak proses parent lewat fork+exec.
+def _reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as handle:
+            handle.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _current_rss_mb():
+    return _proc_status_mb('VmRSS')
+
+
+def _peak_rss_mb():
+    peak = _proc_status_mb('VmHWM')
+    if peak is not None:
+        return peak
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux melaporkan KB, macOS melaporkan byte
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _percentiles_ms(samples):
+    import numpy as np
+
+    samples = np.asarray(samples) * 1000
+    return {
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'mean_ms': float(samples.mean()),
+    }
+
+
+# Fungsi untuk memuat model sesuai nama; mengembalikan fungsi scoring(transaksi)
+def _load_scorer(name):
+    import scoring
+
+    if name == 'mock':
+        model, scaler = scoring.MockModel(), scoring.MockScaler()
+        return lambda transactions: scoring.score_batch(model, scaler, transactions)
+
+    import joblib
+
+    scaler = joblib.load('scaler.pkl')
+    model = joblib.load('xgb_model.pkl' if name.startswith('xgb') else 'rf_model.pkl')
+    if name.endswith('_compiled'):
+        import tree_engine
+
+        if name.startswith('xgb'):
+            engine = tree_engine.compile_xgboost(model, scaler)
+        else:
+            engine = tree_engine.compile_sklearn_forest(model, scaler)
+        return engine.score
+    return lambda transactions: scoring.score_batch(model, scaler, transactions)
+
+
+# Benchmark satu model di proses ini (dipanggil lewat --worker agar RSS dan waktu muat terisolasi).
+# Memori dilaporkan di atas baseline: interpreter, import dan data sintetis sudah ada sebelum
+# puncak RSS di-reset, sehingga yang terukur hanya model dan scoring-nya.
+def run_worker(name, batch_sizes, repeats, seed):
+    start = time.perf_counter()
+    import numpy  # noqa: F401
+    import scoring  # noqa: F401
+    import_seconds = time.perf_counter() - start
+
+    data = synthetic_transactions(max(batch_sizes + [repeats]), seed)
+    rows = data.head(repeats).to_dict('records')
+
+    baseline_rss = _current_rss_mb()
+    peak_reset = _reset_peak_rss()
+    if baseline_rss is None or not peak_reset:
+        baseline_rss = _peak_rss_mb()
+    start = time.perf_counter()
+    score = _load_scorer(name)
+    load_seconds = time.perf_counter() - start
+    loaded_rss = _current_rss_mb()
+
+    # Satu transaksi berupa dict, sama seperti jalur Streamlit dan endpoint /score
+    first_call_start = time.perf_counter()
+    score([rows[0]])
+    first_call_seconds = time.perf_counter() - first_call_start
+    for row in rows[:20]:
+        score([row])
+    samples = []
+    for row in rows:
+        call_start = time.perf_counter()
+        score([row])
+        samples.append(time.perf_counter() - call_start)
+
+    batches = {}
+    for size in batch_sizes:
+        batch = data.head(size)
+        score(batch)
+        # Batch kecil diulang agar waktu total cukup panjang untuk diukur
+        iterations = max(1, min(1000, 100_000 // size))
+        batch_start = time.perf_counter()
+        for _ in range(iterations):
+            score(batch)
+        elapsed = (time.perf_counter() - batch_start) / iterations
+        batches[str(size)] = {
+            'seconds': elapsed,
+            'rows_per_second': size / elapsed,
+        }
+
+    return {
+        'description': MODELS[name],
+        'import_seconds': import_seconds,
+        'load_seconds': load_seconds,
+        'first_call_seconds': first_call_seconds,
+        'single_row': _percentiles_ms(samples),
+        'batch': batches,
+        'baseline_rss_mb': baseline_rss,
+        'model_rss_mb': loaded_rss - baseline_rss if loaded_rss is not None else None,
+        'peak_rss_mb': _peak_rss_mb(),
+        'peak_rss_above_baseline_mb': _peak_rss_mb() - baseline_rss,
+        'peak_rss_reset': peak_reset,
+    }
+
+
+# Fungsi untuk mengukur waktu import satu modul pada interpreter yang baru (cold)
+def measure_import(module, repeats=IMPORT_REPEATS):
+    code = (
+        "import time, json; start = time.perf_counter(); import {module}; "
+        "print(json.dumps(time.perf_counter() - start))"
+    ).format(module=module)
+    timings = []
+    for _ in range(repeats):
+        process = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                 cwd=os.path.dirname(os.path.abspath(__file__)))
+        if process.returncode != 0:
+            return None
+        timings.append(json.loads(process.stdout.strip().splitlines()[-1]))
+    return min(timings)
+
+
+# Dipanggil lewat --environment di proses terpisah: import pandas/sklearn/xgboost di parent akan
+# ikut terhitung dalam puncak RSS worker yang di-fork darinya
+def _environment():
+    environment = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+    for module in ('numpy', 'pandas', 'sklearn', 'xgboost'):
+        try:
+            environment[module] = __import__(module).__version__
+        except ImportError:
+            environment[module] = None
+    try:
+        environment['git_commit'] = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        environment['git_commit'] = None
+    return environment
+
+
+def _run_environment():
+    process = subprocess.run([sys.executable, os.path.abspath(__file__), '--environment'],
+                             capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if process.returncode != 0:
+        return {'error': process.stderr.strip().splitlines()[-1]}
+    return json.loads(process.stdout)
+
+
+def run_suite(models, batch_sizes, repeats, seed):
+    results = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'seed': seed,
+        'environment': _run_environment(),
+        'imports': {module: measure_import(module) for module in IMPORT_TARGETS},
+        'models': {},
+    }
+    for name in models:
+        print(f"[benchmark] {name} ...", file=sys.stderr)
+        command = [sys.executable, os.path.abspath(__file__), '--worker', name, '--seed', str(seed),
+                   '--repeats', str(repeats), '--batch-sizes', *map(str, batch_sizes)]
+        process = subprocess.run(command, capture_output=True, text=True,
+                                 cwd=os.path.dirname(os.path.abspath(__file__)))
+        if process.returncode != 0:
+            results['models'][name] = {'error': process.stderr.strip().splitlines()[-1]}
+            continue
+        results['models'][name] = json.loads(process.stdout)
+    return results
+
+
+# Metrik yang dibandingkan dengan baseline: nama -> True jika nilai lebih besar lebih baik
+def _comparable_metrics(results):
+    flat = {}
+    for module, seconds in results.get('imports', {}).items():
+        if seconds is not None:
+            flat[f"imports.{module}.seconds"] = (seconds, False)
+    for name, model in results.get('models', {}).items():
+        if 'error' in model:
+            continue
+        flat[f"{name}.load_seconds"] = (model['load_seconds'], False)
+        if 'peak_rss_above_baseline_mb' in model:
+            flat[f"{name}.peak_rss_above_baseline_mb"] = (model['peak_rss_above_baseline_mb'], False)
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            flat[f"{name}.single_row.{key}"] = (model['single_row'][key], False)
+        for size, batch in model['batch'].items():
+            flat[f"{name}.batch.{size}.rows_per_second"] = (batch['rows_per_second'], True)
+    return flat
+
+
+# Fungsi untuk membandingkan hasil dengan baseline; mengembalikan daftar baris perbandingan
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    current = _comparable_metrics(results)
+    previous = _comparable_metrics(baseline)
+    rows = []
+    for key, (value, higher_is_better) in current.items():
+        if key not in previous or not previous[key][0]:
+            continue
+        change = value / previous[key][0] - 1
+        regression = -change > tolerance if higher_is_better else change > tolerance
+        improvement = change > tolerance if higher_is_better else -change > tolerance
+        rows.append({
+            'metric': key,
+            'baseline': previous[key][0],
+            'current': value,
+            'change': change,
+            'status': 'REGRESI' if regression else ('lebih baik' if improvement else 'ok'),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark latensi, throughput dan memori scoring SafePay.AI')
+    parser.add_argument('--models', nargs='+', default=list(MODELS), choices=list(MODELS))
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES)
+    parser.add_argument('--repeats', type=int, default=DEFAULT_SINGLE_ROW_REPEATS,
+                        help='Jumlah pengukuran latensi satu transaksi')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--output', default=None, help='File JSON hasil benchmark (default: stdout)')
+    parser.add_argument('--baseline', default=None, help='File JSON hasil sebelumnya untuk dibandingkan')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Perubahan relatif maksimum sebelum dianggap regresi')
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--environment', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.environment:
+        print(json.dumps(_environment()))
+        return
+
+    if args.worker is not None:
+        print(json.dumps(run_worker(args.worker, args.batch_sizes, args.repeats, args.seed)))
+        return
+
+    results = run_suite(args.models, args.batch_sizes, args.repeats, args.seed)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+        print(f"Hasil benchmark ditulis ke {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        rows = compare(results, baseline, args.tolerance)
+        for row in rows:
+            print(f"{row['metric']:<45} {row['baseline']:>14.6g} -> {row['current']:>14.6g} "
+                  f"({row['change']:+.1%}) {row['status']}", file=sys.stderr)
+        if any(row['status'] == 'REGRESI' for row in rows):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
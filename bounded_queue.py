@@ -0,0 +1,44 @@
+import collections
+import threading
+import time
+
+
+# Antrean antar-thread yang dibatasi jumlah baris, bukan jumlah item: satu item bisa berupa satu
+# transaksi atau chunk 250 ribu baris, sehingga batas per item tidak membatasi memori.
+# Item yang lebih besar dari kapasitas tetap diterima saat antrean kosong agar tidak menunggu selamanya.
+class RowQueue:
+    def __init__(self, max_rows):
+        if max_rows < 1:
+            raise ValueError("Kapasitas antrean minimal 1 baris")
+        self.max_rows = max_rows
+        self.rows = 0
+        self._items = collections.deque()
+        self._condition = threading.Condition()
+
+    # Fungsi untuk memasukkan item berisi n_rows baris; False jika tidak muat (block=False) atau timeout
+    def put(self, item, n_rows, block=True, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self.rows and self.rows + n_rows > self.max_rows:
+                if not block:
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self._items.append(item)
+            self.rows += n_rows
+            return True
+
+    # Fungsi untuk mengambil semua item yang mengantre sekaligus
+    def drain(self):
+        with self._condition:
+            items = list(self._items)
+            self._items.clear()
+            self.rows = 0
+            self._condition.notify_all()
+            return items
+
+    def __len__(self):
+        with self._condition:
+            return len(self._items)
@@ -0,0 +1,152 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import scoring
+
+# Jumlah baris per chunk, menjaga pemakaian memori tetap terbatas
+DEFAULT_CHUNKSIZE = 250_000
+
+SUPPORTED_FORMATS = ('csv', 'parquet')
+
+
+# Fungsi untuk menebak format file dari nama file
+def detect_format(name):
+    extension = os.path.splitext(str(name).lower())[1]
+    if extension in ('.parquet', '.pq'):
+        return 'parquet'
+    if extension == '.csv':
+        return 'csv'
+    raise ValueError(f"Format file tidak didukung: {name} (gunakan CSV atau Parquet)")
+
+
+# Fungsi untuk membaca file per chunk, menghasilkan (DataFrame, progres 0-1)
+def iter_chunks(source, file_format, chunksize=DEFAULT_CHUNKSIZE):
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(source)
+        total_rows = parquet_file.metadata.num_rows
+        rows_read = 0
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            rows_read += batch.num_rows
+            yield batch.to_pandas(), rows_read / max(total_rows, 1)
+        return
+
+    # Untuk CSV progres dihitung dari posisi byte pada file sumber
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as handle:
+            yield from iter_chunks(handle, file_format, chunksize)
+        return
+
+    total_bytes = _source_size(source)
+    with pd.read_csv(source, chunksize=chunksize) as reader:
+        for chunk in reader:
+            progress = source.tell() / total_bytes if total_bytes else 0.0
+            yield chunk, min(progress, 1.0)
+
+
+def _source_size(source):
+    size = getattr(source, 'size', None)
+    if size is None:
+        position = source.tell()
+        size = source.seek(0, os.SEEK_END)
+        source.seek(position)
+    return size
+
+
+# Fungsi untuk memvalidasi kolom PaySim yang dibutuhkan model
+def check_columns(columns):
+    missing = [column for column in scoring.FEATURE_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f"Kolom wajib tidak ditemukan: {', '.join(missing)}")
+
+
+# Fungsi untuk scoring file besar secara streaming dan menulis hasilnya ke file tujuan.
+# Setiap chunk lewat ModelManager.score (aturan pre-filter dan observer on_scored seperti log audit,
+# riwayat dan drift), dengan satu snapshot model untuk seluruh file meskipun model ditukar di tengah
+# proses. Cache prediksi dilewati agar chunk besar tidak mengusir entri scoring interaktif.
+def score_file(manager, source, destination, file_format, chunksize=DEFAULT_CHUNKSIZE,
+               progress_callback=None, threshold=scoring.DEFAULT_THRESHOLD):
+    snapshot = manager.active
+    if file_format == 'parquet':
+        return _score_parquet(manager, snapshot, source, destination, chunksize, progress_callback, threshold)
+
+    summary = {'rows': 0, 'fraud': 0, 'model_version': snapshot['version']}
+    for chunk, progress in iter_chunks(source, file_format, chunksize):
+        check_columns(chunk.columns)
+
+        result = manager.score(chunk, threshold=threshold, snapshot=snapshot, cached=False)
+        chunk['fraud_prob'] = result['fraud_prob']
+        chunk['prediction'] = result['prediction']
+        chunk['model_version'] = snapshot['version']
+
+        # Header hanya ditulis pada chunk pertama
+        chunk.to_csv(destination, mode='w' if summary['rows'] == 0 else 'a',
+                     header=summary['rows'] == 0, index=False)
+
+        summary['rows'] += len(chunk)
+        summary['fraud'] += int(np.count_nonzero(result['prediction']))
+
+        if progress_callback is not None:
+            progress_callback(progress, summary)
+
+    return summary
+
+
+# Kolom yang ditambahkan ke setiap baris hasil scoring file
+RESULT_COLUMNS = ('fraud_prob', 'prediction', 'model_version')
+
+
+# Fungsi untuk menambahkan kolom hasil ke record batch Arrow. Kolom hasil lama (misalnya saat
+# file hasil scoring sebelumnya di-score ulang) diganti.
+def append_result_columns(batch, result, model_version=None):
+    import pyarrow as pa
+
+    # Metadata pandas file sumber tidak lagi sesuai setelah kolom hasil ditambahkan
+    batch = batch.replace_schema_metadata(None)
+    for name in RESULT_COLUMNS:
+        if name in batch.schema.names:
+            batch = batch.remove_column(batch.schema.get_field_index(name))
+    batch = batch.append_column('fraud_prob', pa.array(result['fraud_prob']))
+    batch = batch.append_column('prediction', pa.array(result['prediction']))
+    if model_version is not None:
+        batch = batch.append_column('model_version', pa.DictionaryArray.from_arrays(
+            np.zeros(batch.num_rows, dtype=np.int8), pa.array([model_version])
+        ))
+    return batch
+
+
+# Parquet diproses sepenuhnya dalam Arrow: record batch dibaca (type sebagai dictionary),
+# di-encode langsung dari kolom Arrow, lalu kolom hasil ditambahkan ke batch yang sama
+# dan ditulis kembali tanpa DataFrame pandas di antaranya
+def _score_parquet(manager, snapshot, source, destination, chunksize, progress_callback, threshold):
+    import pyarrow.parquet as pq
+
+    import arrow_ingest
+
+    summary = {'rows': 0, 'fraud': 0, 'model_version': snapshot['version']}
+    writer = None
+
+    try:
+        for batch, progress in arrow_ingest.iter_parquet(source, chunksize):
+            check_columns(batch.schema.names)
+
+            result = manager.score(batch, threshold=threshold, snapshot=snapshot, cached=False)
+            batch = append_result_columns(batch, result, snapshot['version'])
+            if writer is None:
+                # Tanpa skema Arrow tersimpan, kolom dictionary dibaca ulang sebagai string biasa
+                writer = pq.ParquetWriter(destination, batch.schema, store_schema=False)
+            writer.write_batch(batch)
+
+            summary['rows'] += batch.num_rows
+            summary['fraud'] += int(np.count_nonzero(result['prediction']))
+
+            if progress_callback is not None:
+                progress_callback(progress, summary)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return summary
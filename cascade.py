@@ -0,0 +1,150 @@
+import argparse
+import threading
+
+import numpy as np
+
+import scoring
+
+# Jumlah boosting round pada tahap pertama (murah) cascade
+DEFAULT_FIRST_STAGE_ROUNDS = 10
+
+# Rentang skor tahap pertama yang dianggap belum pasti dan diteruskan ke model penuh.
+# Nilai default konservatif; gunakan calibrate_band pada sampel trafik nyata untuk mempersempitnya.
+DEFAULT_BAND = (0.02, 0.98)
+
+
+# Fungsi untuk menghitung probabilitas dari sebagian awal pohon model
+def predict_truncated(model, X_scaled, rounds):
+    if hasattr(model, 'get_booster'):
+        return np.asarray(model.predict_proba(X_scaled, iteration_range=(0, rounds)))[:, 1]
+    # CompiledTreeEnsemble: pohon pertama sebanyak `rounds`
+    return model.predict_proba(X_scaled, n_trees=rounds)[:, 1]
+
+
+# Fungsi untuk menyiapkan matriks input model; scaler None berarti scaler sudah dilebur
+# ke threshold pohon (tree_engine) sehingga fitur mentah langsung dipakai
+def _prepare(scaler, transactions):
+    X = scoring.encode_transactions(transactions)
+    if scaler is None:
+        return np.asarray(X, dtype=np.float64)
+    return scoring.scale_features(scaler, X, copy=X is transactions)
+
+
+# Scoring bertingkat dengan early exit: tahap pertama (XGBoost terpotong) dijalankan untuk
+# semua transaksi, model penuh (dan opsional random forest) hanya untuk transaksi yang skor
+# tahap pertamanya jatuh di band ketidakpastian sekitar threshold.
+# `rf` harus menerima input yang sama dengan `model` (ter-scale, atau mentah jika scaler None).
+class CascadeScorer:
+    def __init__(self, model, scaler, first_stage_rounds=DEFAULT_FIRST_STAGE_ROUNDS, band=DEFAULT_BAND, rf=None):
+        low, high = band
+        if not 0.0 <= low <= high <= 1.0:
+            raise ValueError(f"Band ketidakpastian tidak valid: {band}")
+        self.model = model
+        self.scaler = scaler
+        self.first_stage_rounds = first_stage_rounds
+        self.band = (float(low), float(high))
+        self.rf = rf
+
+        self.rows = 0
+        self.escalated = 0
+        self._lock = threading.Lock()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'first_stage_rounds': self.first_stage_rounds,
+                'band': list(self.band),
+                'rows': self.rows,
+                'escalated': self.escalated,
+                'escalation_rate': self.escalated / self.rows if self.rows else None,
+            }
+
+    def score(self, transactions, threshold=scoring.DEFAULT_THRESHOLD):
+        low, high = self.band
+        if not low <= threshold <= high:
+            # Di luar band, keputusan tahap pertama belum tentu sama dengan model penuh
+            raise ValueError("Band ketidakpastian harus mencakup threshold keputusan")
+        X_scaled = _prepare(self.scaler, transactions)
+
+        fraud_prob = predict_truncated(self.model, X_scaled, self.first_stage_rounds)
+        uncertain = np.flatnonzero((fraud_prob >= low) & (fraud_prob <= high))
+
+        if len(uncertain):
+            subset = X_scaled[uncertain]
+            full_prob = np.asarray(self.model.predict_proba(subset))[:, 1]
+            if self.rf is not None:
+                # Random forest dipakai sebagai pendapat kedua hanya untuk kasus ambigu
+                full_prob = (full_prob + np.asarray(self.rf.predict_proba(subset))[:, 1]) / 2
+            fraud_prob = fraud_prob.astype(np.float64)
+            fraud_prob[uncertain] = full_prob
+
+        with self._lock:
+            self.rows += len(X_scaled)
+            self.escalated += len(uncertain)
+
+        stage = np.ones(len(X_scaled), dtype=np.int8)
+        stage[uncertain] = 2
+        return {
+            'fraud_prob': fraud_prob,
+            'safe_prob': 1.0 - fraud_prob,
+            'prediction': (fraud_prob > threshold).astype(np.int64),
+            'stage': stage,
+        }
+
+
+# Fungsi untuk mencari band tersempit sehingga keputusan di luar band sama dengan model penuh.
+# max_flip_rate > 0 mengizinkan sebagian kecil keputusan berubah demi band yang lebih sempit.
+def calibrate_band(model, scaler, transactions, first_stage_rounds=DEFAULT_FIRST_STAGE_ROUNDS,
+                   threshold=scoring.DEFAULT_THRESHOLD, max_flip_rate=0.0, margin=1e-3):
+    X_scaled = _prepare(scaler, transactions)
+    full_prob = np.asarray(model.predict_proba(X_scaled))[:, 1]
+    stage_prob = predict_truncated(model, X_scaled, first_stage_rounds)
+
+    full_fraud = full_prob > threshold
+    allowed = int(max_flip_rate * len(X_scaled) / 2)
+
+    # Transaksi fraud menurut model penuh tidak boleh jatuh di bawah band
+    fraud_scores = np.sort(stage_prob[full_fraud])
+    low = fraud_scores[min(allowed, len(fraud_scores) - 1)] - margin if len(fraud_scores) else threshold
+    # Transaksi aman menurut model penuh tidak boleh jatuh di atas band
+    safe_scores = np.sort(stage_prob[~full_fraud])[::-1]
+    high = safe_scores[min(allowed, len(safe_scores) - 1)] + margin if len(safe_scores) else threshold
+
+    low, high = float(max(min(low, threshold), 0.0)), float(min(max(high, threshold), 1.0))
+    uncertain = (stage_prob >= low) & (stage_prob <= high)
+    decision = np.where(uncertain, full_fraud, stage_prob > threshold)
+    return {
+        'band': (low, high),
+        'escalation_rate': float(uncertain.mean()),
+        'flip_rate': float((decision != full_fraud).mean()),
+        'first_stage_rounds': first_stage_rounds,
+        'rows': len(X_scaled),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Kalibrasi band ketidakpastian untuk cascade scoring')
+    parser.add_argument('sample', help='File sampel trafik (CSV/Parquet berformat PaySim)')
+    parser.add_argument('--rounds', type=int, nargs='+', default=[5, 10, 20, 30],
+                        help='Jumlah round tahap pertama yang dicoba')
+    parser.add_argument('--max-flip-rate', type=float, default=0.0,
+                        help='Proporsi maksimum keputusan yang boleh berbeda dari model penuh')
+    parser.add_argument('--max-rows', type=int, default=1_000_000)
+    parser.add_argument('--model', default='xgb_model.pkl')
+    parser.add_argument('--scaler', default='scaler.pkl')
+    args = parser.parse_args()
+
+    import bulk_scoring
+
+    model, scaler = scoring.load_model_and_scaler(args.model, args.scaler)
+    chunk, _ = next(bulk_scoring.iter_chunks(args.sample, bulk_scoring.detect_format(args.sample), args.max_rows))
+
+    for rounds in args.rounds:
+        result = calibrate_band(model, scaler, chunk, rounds, max_flip_rate=args.max_flip_rate)
+        low, high = result['band']
+        print(f"rounds={rounds:4d}  band=({low:.4f}, {high:.4f})  "
+              f"eskalasi={result['escalation_rate']:.2%}  keputusan berubah={result['flip_rate']:.4%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,407 @@
+import argparse
+import json
+import threading
+
+import numpy as np
+
+import bounded_queue
+import scoring
+
+# Batas bin histogram fitur dalam satuan skala RobustScaler ((x - median) / IQR): nol ditambah
+# grid geometrik simetris 0,01..1000 (8 bin per dekade). Memori tetap, berapa pun jumlah transaksi.
+_POSITIVE_EDGES = np.logspace(-2, 3, 41)
+FEATURE_EDGES = np.concatenate([-_POSITIVE_EDGES[::-1], [0.0], _POSITIVE_EDGES])
+
+# Batas bin histogram skor fraud (lebih rapat di dekat 0 dan 1)
+SCORE_EDGES = np.concatenate([[0.0], np.logspace(-4, np.log10(0.5), 24), 1 - np.logspace(np.log10(0.5), -4, 24)[1:],
+                              [1.0]])
+
+# Jumlah baris per jendela evaluasi; drift dinilai pada jendela terakhir yang sudah lengkap
+DEFAULT_WINDOW_ROWS = 10_000
+
+# Tanpa file referensi, sekian baris live pertama dibekukan sebagai referensi PSI/KS
+DEFAULT_BASELINE_ROWS = 50_000
+
+# Status drift baru dinilai jika jendela berisi paling sedikit sekian baris
+MIN_WINDOW_ROWS = 500
+
+# Batch kecil (misalnya satu transaksi dari /score) ditampung di buffer berukuran tetap ini
+# lalu diagregasi sekaligus, agar biaya histogram per transaksi tetap kecil
+STAGING_ROWS = 1024
+
+# Batch dari jalur scoring diantrekan lalu di-encode dan diagregasi thread background setiap
+# flush_interval (detik). Jika antrean penuh batch dilewati (dihitung): drift cukup dinilai dari sampel.
+DEFAULT_QUEUE_ROWS = 200_000
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# Fitur waktu: distribusinya pasti bergeser seiring berjalannya waktu, jadi tetap dilaporkan
+# per fitur tetapi tidak ikut menentukan status drift keseluruhan
+TIME_FEATURES = ('step',)
+
+# PSI dihitung atas kelompok bin berdasarkan desil referensi (bin halus terlalu jarang)
+PSI_GROUPS = 10
+
+# Ambang status: PSI > 0,1 waspada, > 0,25 drift (konvensi umum PSI)
+PSI_WARN = 0.1
+PSI_DRIFT = 0.25
+
+# Ambang KS minimum; dipakai bersama nilai kritis dua sampel pada alpha 0,05
+KS_MIN = 0.05
+KS_ALPHA_COEFFICIENT = 1.36
+
+# Pergeseran median live dari median training, dalam satuan IQR training
+MEDIAN_SHIFT_WARN = 0.5
+
+# Rasio IQR live terhadap IQR training di luar rentang ini dianggap drift
+IQR_RATIO_RANGE = (0.5, 2.0)
+
+STATUS_ORDER = ('ok', 'warn', 'drift')
+
+# Lokasi default file histogram referensi (dibuat dengan: python drift.py DATA)
+DEFAULT_REFERENCE_PATH = 'drift_reference.json'
+
+_EPSILON = 1e-4
+
+
+# Fungsi untuk mengestimasi kuantil dari histogram (interpolasi linear di dalam bin)
+def histogram_quantile(counts, edges, q):
+    total = counts.sum()
+    if total == 0:
+        return None
+    cumulative = np.cumsum(counts)
+    index = int(np.searchsorted(cumulative, q * total, side='left'))
+    # Bin pertama/terakhir tidak berbatas; dipakai batas terdekat yang berhingga
+    lower = edges[index - 1] if index > 0 else edges[0]
+    upper = edges[index] if index < len(edges) else edges[-1]
+    previous = cumulative[index - 1] if index > 0 else 0
+    fraction = (q * total - previous) / counts[index] if counts[index] else 0.0
+    return float(lower + (upper - lower) * fraction)
+
+
+# Fungsi untuk menghitung PSI antara histogram live dan referensi (bin dikelompokkan per desil referensi)
+def psi(actual, expected, groups=PSI_GROUPS):
+    if actual.sum() == 0 or expected.sum() == 0:
+        return None
+    cdf = np.cumsum(expected) / expected.sum()
+    group = np.minimum((cdf * groups).astype(np.int64), groups - 1)
+    # Bin setelah kuantil terakhir ikut kelompok terakhir; bin sebelum kuantil pertama kelompok pertama
+    actual_groups = np.bincount(group, weights=actual, minlength=groups)
+    expected_groups = np.bincount(group, weights=expected, minlength=groups)
+    a = np.maximum(actual_groups / actual_groups.sum(), _EPSILON)
+    e = np.maximum(expected_groups / expected_groups.sum(), _EPSILON)
+    return float(((a - e) * np.log(a / e)).sum())
+
+
+# Fungsi untuk statistik KS dua sampel dari histogram dengan bin yang sama
+def ks(actual, expected):
+    if actual.sum() == 0 or expected.sum() == 0:
+        return None
+    return float(np.abs(np.cumsum(actual) / actual.sum() - np.cumsum(expected) / expected.sum()).max())
+
+
+def _ks_threshold(n, m):
+    return max(KS_MIN, KS_ALPHA_COEFFICIENT * np.sqrt((n + m) / (n * m)))
+
+
+def _status(*levels):
+    return STATUS_ORDER[max(STATUS_ORDER.index(level) for level in levels)]
+
+
+def _psi_status(value):
+    if value is None:
+        return 'ok'
+    return 'drift' if value > PSI_DRIFT else ('warn' if value > PSI_WARN else 'ok')
+
+
+# Monitor drift streaming: histogram per fitur dalam ruang skala scaler.pkl, histogram skor fraud
+# dan momen berjalan (mean/varians). Memori tetap; tidak ada riwayat transaksi mentah yang disimpan
+# (hanya buffer penampung berukuran STAGING_ROWS sebelum diagregasi).
+#   - Terhadap statistik training di scaler (median, IQR): pergeseran median, rasio IQR dan
+#     proporsi nilai di bawah median training (seharusnya sekitar 0,5)
+#   - Terhadap histogram referensi (file referensi atau baseline live pertama): PSI dan KS
+class DriftMonitor:
+    def __init__(self, scaler, reference=None, window_rows=DEFAULT_WINDOW_ROWS,
+                 baseline_rows=DEFAULT_BASELINE_ROWS, queue_rows=DEFAULT_QUEUE_ROWS,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL):
+        center, scale = scoring.affine_params(scaler) or (None, None)
+        if center is None or scale is None:
+            raise ValueError("Scaler harus memiliki center_/mean_ dan scale_ (RobustScaler atau StandardScaler)")
+        self.center = np.asarray(center, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.window_rows = window_rows
+        self.baseline_rows = baseline_rows
+        self.flush_interval = flush_interval
+
+        n_features = len(scoring.FEATURE_COLUMNS)
+        self._feature_bins = len(FEATURE_EDGES) + 1
+        self._score_bins = len(SCORE_EDGES) - 1
+        self._offsets = np.arange(n_features) * self._feature_bins
+
+        self.reference_source = 'file' if reference is not None else 'baseline'
+        self.reference = None
+        self.reference_scores = None
+        self.reference_rows = 0
+        if reference is not None:
+            self.reference = np.asarray(reference['features'], dtype=np.float64)
+            self.reference_scores = np.asarray(reference['scores'], dtype=np.float64)
+            self.reference_rows = int(reference['rows'])
+
+        self.rows = 0
+        self.windows = 0
+        self.skipped = 0
+        self._window = self._empty()
+        self._last_window = None
+        self._baseline = self._empty() if reference is None else None
+        # Momen berjalan per fitur dalam ruang skala (bergeser ke median training sehingga jumlah
+        # kuadrat tidak kehilangan presisi), dikonversi ke skala asli saat laporan dibuat
+        self._sum = np.zeros(n_features)
+        self._sum_sq = np.zeros(n_features)
+        self._score_sum = 0.0
+        self._staging = np.empty((STAGING_ROWS, n_features))
+        self._staging_scores = np.empty(STAGING_ROWS)
+        self._staged = 0
+        self._lock = threading.Lock()
+
+        self._queue = bounded_queue.RowQueue(queue_rows)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='drift-monitor', daemon=True)
+            self._thread.start()
+        return self
+
+    # Fungsi untuk mengagregasi sisa antrean dan menghentikan thread background
+    def close(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+        self._drain()
+
+    # Fungsi untuk meng-encode dan mengagregasi batch yang mengantre
+    def _drain(self):
+        for transactions, fraud_prob in self._queue.drain():
+            self.observe(scoring.encode_transactions(transactions), fraud_prob)
+
+    def _empty(self):
+        return {
+            'rows': 0,
+            'features': np.zeros((len(scoring.FEATURE_COLUMNS), self._feature_bins)),
+            'scores': np.zeros(self._score_bins),
+            'below_median': np.zeros(len(scoring.FEATURE_COLUMNS)),
+        }
+
+    @staticmethod
+    def _add(target, batch):
+        target['rows'] += batch['rows']
+        target['features'] += batch['features']
+        target['scores'] += batch['scores']
+        target['below_median'] += batch['below_median']
+
+    # Fungsi untuk mengagregasi satu blok baris (dipanggil dengan lock): satu searchsorted + satu bincount
+    def _aggregate(self, X, fraud_prob):
+        X_scaled = (X - self.center) / self.scale
+        bins = np.searchsorted(FEATURE_EDGES, X_scaled, side='right') + self._offsets
+        features = np.bincount(bins.ravel(), minlength=len(self._offsets) * self._feature_bins)
+        score_bins = np.clip(np.searchsorted(SCORE_EDGES, fraud_prob, side='right') - 1, 0, self._score_bins - 1)
+        batch = {
+            'rows': len(X),
+            'features': features.reshape(len(self._offsets), self._feature_bins),
+            'scores': np.bincount(score_bins, minlength=self._score_bins),
+            'below_median': (X_scaled < 0).sum(axis=0),
+        }
+
+        self._sum += X_scaled.sum(axis=0)
+        self._sum_sq += (X_scaled ** 2).sum(axis=0)
+        self._score_sum += fraud_prob.sum()
+        self.rows += len(X)
+
+        self._add(self._window, batch)
+        if self._window['rows'] >= self.window_rows:
+            self._last_window = self._window
+            self._window = self._empty()
+            self.windows += 1
+
+        if self._baseline is not None:
+            self._add(self._baseline, batch)
+            if self._baseline['rows'] >= self.baseline_rows:
+                self.reference = self._baseline['features']
+                self.reference_scores = self._baseline['scores']
+                self.reference_rows = self._baseline['rows']
+                self._baseline = None
+
+    def _flush_staging(self):
+        if self._staged:
+            self._aggregate(self._staging[:self._staged], self._staging_scores[:self._staged])
+            self._staged = 0
+
+    # Fungsi untuk mencatat satu batch: X berupa matriks fitur mentah (N x 7) hasil encoding
+    def observe(self, X, fraud_prob):
+        X = np.asarray(X, dtype=np.float64)
+        fraud_prob = np.asarray(fraud_prob, dtype=np.float64)
+        n = len(X)
+        with self._lock:
+            if n >= STAGING_ROWS:
+                self._flush_staging()
+                self._aggregate(X, fraud_prob)
+                return
+            if self._staged + n > STAGING_ROWS:
+                self._flush_staging()
+            self._staging[self._staged:self._staged + n] = X
+            self._staging_scores[self._staged:self._staged + n] = fraud_prob
+            self._staged += n
+
+    # Fungsi untuk jalur scoring (observer ModelManager.on_scored): batch hanya diantrekan,
+    # encoding dan histogram dikerjakan thread background
+    def record(self, transactions, result, model_version=None):
+        n_rows = len(result['fraud_prob'])
+        if self._queue.rows + n_rows >= self._queue.max_rows // 2:
+            self._wake.set()
+        if self._queue.put((transactions, result['fraud_prob']), n_rows, block=False):
+            return True
+        with self._lock:
+            self.skipped += n_rows
+        return False
+
+    # Fungsi untuk menilai drift pada jendela terakhir yang lengkap (atau jendela berjalan)
+    def report(self):
+        # Batch yang belum diambil thread background ikut dinilai
+        self._drain()
+        with self._lock:
+            self._flush_staging()
+            window = self._last_window if self._last_window is not None else self._window
+            window = {key: np.copy(value) if isinstance(value, np.ndarray) else value
+                      for key, value in window.items()}
+            reference, reference_scores, reference_rows = self.reference, self.reference_scores, self.reference_rows
+            rows = self.rows
+            if rows:
+                scaled_mean = self._sum / rows
+                means = self.center + self.scale * scaled_mean
+                variances = self.scale ** 2 * np.maximum(self._sum_sq / rows - scaled_mean ** 2, 0.0)
+                score_mean = self._score_sum / rows
+            else:
+                means = variances = score_mean = None
+
+        n = window['rows']
+        features = {}
+        for j, name in enumerate(scoring.FEATURE_COLUMNS):
+            counts = window['features'][j]
+            entry = {'mean': float(means[j]) if rows else None,
+                     'std': float(np.sqrt(variances[j])) if rows else None}
+            statuses = []
+            # Jenis transaksi berupa kode kategori: hanya dibandingkan lewat PSI/KS
+            if n and j != scoring.TYPE_INDEX:
+                # Median dan IQR live dalam satuan skala training: idealnya 0 dan 1
+                median = histogram_quantile(counts, FEATURE_EDGES, 0.5)
+                iqr = histogram_quantile(counts, FEATURE_EDGES, 0.75) - histogram_quantile(counts, FEATURE_EDGES, 0.25)
+                entry['median_shift'] = median
+                entry['iqr_ratio'] = iqr
+                entry['below_median'] = float(window['below_median'][j] / n)
+                if n >= MIN_WINDOW_ROWS and abs(median) > MEDIAN_SHIFT_WARN:
+                    statuses.append('warn')
+                if n >= MIN_WINDOW_ROWS and iqr > 0 and not IQR_RATIO_RANGE[0] <= iqr <= IQR_RATIO_RANGE[1]:
+                    statuses.append('warn')
+            if reference is not None and n:
+                entry['psi'] = psi(counts, reference[j])
+                entry['ks'] = ks(counts, reference[j])
+                if n >= MIN_WINDOW_ROWS:
+                    statuses.append(_psi_status(entry['psi']))
+                    if entry['ks'] > _ks_threshold(n, reference_rows):
+                        statuses.append('drift')
+            entry['status'] = _status('ok', *statuses)
+            features[name] = entry
+
+        score = {'mean': score_mean}
+        if n:
+            score['p50'] = histogram_quantile(window['scores'], SCORE_EDGES[1:-1], 0.5)
+            score['p99'] = histogram_quantile(window['scores'], SCORE_EDGES[1:-1], 0.99)
+        if reference_scores is not None and n:
+            score['psi'] = psi(window['scores'], reference_scores)
+            score['ks'] = ks(window['scores'], reference_scores)
+        score['status'] = _psi_status(score.get('psi')) if n >= MIN_WINDOW_ROWS else 'ok'
+
+        return {
+            'rows': rows,
+            'window_rows': n,
+            'windows': self.windows,
+            'reference': self.reference_source if reference is not None else None,
+            'reference_rows': reference_rows,
+            'status': _status(score['status'], *(entry['status'] for name, entry in features.items()
+                                                 if name not in TIME_FEATURES)),
+            'features': features,
+            'score': score,
+        }
+
+    # Fungsi untuk mengekspor histogram referensi (disimpan sebagai JSON)
+    def reference_dict(self):
+        with self._lock:
+            if self.reference is None:
+                return None
+            return {'rows': self.reference_rows, 'features': self.reference.tolist(),
+                    'scores': self.reference_scores.tolist()}
+
+    def stats(self):
+        report = self.report()
+        with self._lock:
+            skipped = self.skipped
+        return {
+            'rows': report['rows'],
+            'skipped_rows': skipped,
+            'windows': report['windows'],
+            'reference': report['reference'],
+            'status': report['status'],
+            'drifting': [name for name, entry in report['features'].items()
+                         if entry['status'] != 'ok' and name not in TIME_FEATURES]
+                        + (['fraud_prob'] if report['score']['status'] != 'ok' else []),
+        }
+
+
+def load_reference(path):
+    with open(path) as handle:
+        return json.load(handle)
+
+
+# Fungsi untuk membangun histogram referensi dari file data (misalnya data training) per chunk
+def build_reference(source, model_path='xgb_model.pkl', scaler_path='scaler.pkl'):
+    import bulk_scoring
+
+    model, scaler = scoring.load_model_and_scaler(model_path, scaler_path)
+    monitor = DriftMonitor(scaler, baseline_rows=float('inf'))
+    for chunk, _ in bulk_scoring.iter_chunks(source, bulk_scoring.detect_format(source)):
+        bulk_scoring.check_columns(chunk.columns)
+        result = scoring.score_batch(model, scaler, chunk)
+        monitor.observe(scoring.encode_transactions(chunk), result['fraud_prob'])
+    with monitor._lock:
+        monitor._flush_staging()
+    baseline = monitor._baseline
+    return {'rows': baseline['rows'], 'features': baseline['features'].tolist(),
+            'scores': baseline['scores'].tolist()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Histogram referensi untuk monitor drift')
+    parser.add_argument('source', help='File data referensi (CSV/Parquet berformat PaySim)')
+    parser.add_argument('--output', default=DEFAULT_REFERENCE_PATH)
+    parser.add_argument('--model', default='xgb_model.pkl')
+    parser.add_argument('--scaler', default='scaler.pkl')
+    args = parser.parse_args()
+
+    reference = build_reference(args.source, args.model, args.scaler)
+    with open(args.output, 'w') as handle:
+        json.dump(reference, handle)
+    print(f"Referensi dari {reference['rows']:,} transaksi ditulis ke {args.output}")
+
+
+if __name__ == '__main__':
+    main()
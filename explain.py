@@ -0,0 +1,127 @@
+import threading
+import time
+
+import numpy as np
+
+import metrics
+import scoring
+
+# Jumlah baris per panggilan predict agar memori matriks kontribusi tetap terbatas
+CHUNK_ROWS = 65_536
+
+# 'exact': TreeSHAP (pred_contribs), dipakai secara default agar alasan satu transaksi tidak
+# bergantung pada ukuran batch-nya. 'approx': pendekatan Saabas (approx_contribs), puluhan kali
+# lebih cepat tetapi alasan utamanya sering berbeda; hanya dipakai jika diminta secara eksplisit.
+METHODS = ('exact', 'approx')
+
+# Label fitur untuk ditampilkan ke pengguna
+FEATURE_LABELS = {
+    'step': 'Waktu transaksi (step)',
+    'type': 'Jenis transaksi',
+    'amount': 'Nominal transaksi',
+    'oldbalanceOrg': 'Saldo awal pengirim',
+    'newbalanceOrig': 'Saldo akhir pengirim',
+    'oldbalanceDest': 'Saldo awal penerima',
+    'newbalanceDest': 'Saldo akhir penerima',
+}
+
+
+# Fungsi untuk menghitung feature importance (dinormalisasi, total 1) dari model yang dimuat;
+# None jika model tidak menyediakan importance (misalnya MockModel)
+def feature_importance(model, importance_type='gain'):
+    if hasattr(model, 'get_booster'):
+        scores = model.get_booster().get_score(importance_type=importance_type)
+        # Booster tanpa nama fitur memakai nama f0..f6 sesuai urutan kolom training
+        values = np.array([scores.get(name, scores.get(f"f{j}", 0.0))
+                           for j, name in enumerate(scoring.FEATURE_COLUMNS)], dtype=np.float64)
+    elif hasattr(model, 'feature_importances_'):
+        values = np.asarray(model.feature_importances_, dtype=np.float64)
+    else:
+        return None
+    total = values.sum()
+    if total <= 0:
+        return None
+    return dict(zip(scoring.FEATURE_COLUMNS, (values / total).tolist()))
+
+
+# Fungsi untuk alasan utama per transaksi: fitur dengan kontribusi terbesar ke arah penipuan
+# (hanya kontribusi positif), sebagai list [(kolom, kontribusi), ...] per baris
+def top_reasons(contributions, top=3):
+    order = np.argsort(-contributions, axis=1)[:, :top]
+    reasons = []
+    for row, indices in zip(contributions, order):
+        reasons.append([(scoring.FEATURE_COLUMNS[j], float(row[j])) for j in indices if row[j] > 0])
+    return reasons
+
+
+def _check_method(method):
+    if method not in METHODS:
+        raise ValueError(f"Metode kontribusi tidak dikenal: {method!r} (pilih {', '.join(METHODS)})")
+    return method
+
+
+# Kontribusi per fitur per transaksi (log-odds) dari booster XGBoost. Satu instance per versi
+# model (disimpan di snapshot ModelManager), sehingga importance cukup dihitung sekali.
+class ContributionEngine:
+    def __init__(self, model, scaler, method='exact'):
+        _check_method(method)
+        self.booster = model.get_booster()
+        self.scaler = scaler
+        self.method = method
+        self.importance = feature_importance(model)
+
+        self.rows = 0
+        self.calls = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    # Fungsi untuk membuat engine dari model; None jika model bukan XGBoost
+    @classmethod
+    def from_model(cls, model, scaler, **kwargs):
+        if model is None or not hasattr(model, 'get_booster'):
+            return None
+        return cls(model, scaler, **kwargs)
+
+    # Fungsi untuk menghitung kontribusi N transaksi sekaligus; method None berarti metode engine
+    # Hasil: contributions (N x 7), bias (N,), margin (N,) dalam log-odds; sigmoid(margin) = fraud_prob
+    def contributions(self, transactions, method=None):
+        import xgboost as xgb
+
+        method = self.method if method is None else _check_method(method)
+        start = time.perf_counter()
+        X = scoring.encode_transactions(transactions)
+        X_scaled = scoring.scale_features(self.scaler, X, copy=X is transactions)
+        approx = method == 'approx'
+        n_features = len(scoring.FEATURE_COLUMNS)
+        contributions = np.empty((len(X_scaled), n_features), dtype=np.float32)
+        bias = np.empty(len(X_scaled), dtype=np.float32)
+        for chunk_start in range(0, len(X_scaled), CHUNK_ROWS):
+            chunk = X_scaled[chunk_start:chunk_start + CHUNK_ROWS]
+            values = self.booster.predict(xgb.DMatrix(chunk), pred_contribs=True, approx_contribs=approx)
+            contributions[chunk_start:chunk_start + len(chunk)] = values[:, :n_features]
+            bias[chunk_start:chunk_start + len(chunk)] = values[:, n_features]
+
+        elapsed = time.perf_counter() - start
+        metrics.REGISTRY.observe('explain', elapsed)
+        with self._lock:
+            self.rows += len(X_scaled)
+            self.calls += 1
+            self.seconds += elapsed
+        return {
+            'contributions': contributions,
+            'bias': bias,
+            'margin': contributions.sum(axis=1) + bias,
+            'method': method,
+        }
+
+    # Fungsi untuk alasan utama per transaksi (lihat top_reasons)
+    def explain(self, transactions, top=3, method=None):
+        return top_reasons(self.contributions(transactions, method)['contributions'], top)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rows': self.rows,
+                'calls': self.calls,
+                'rows_per_second': self.rows / self.seconds if self.seconds else None,
+            }
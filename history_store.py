@@ -0,0 +1,461 @@
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+import bounded_queue
+import scoring
+
+DEFAULT_DIRECTORY = 'history'
+
+# Buffer ditulis sebagai satu file Parquet per partisi hari jika mencapai jumlah baris ini
+# atau sudah menunggu selama flush_interval (detik)
+DEFAULT_FLUSH_ROWS = 250_000
+DEFAULT_FLUSH_INTERVAL = 30.0
+
+# Jumlah baris maksimum yang menunggu ditulis
+DEFAULT_QUEUE_ROWS = 1_000_000
+
+# Perilaku saat antrean penuh: 'drop' (default; batch baru dibuang dan dihitung sebagai dropped)
+# atau 'block' (pemanggil menunggu writer, misalnya agar riwayat scoring file besar tidak terbuang)
+OVERFLOW_POLICIES = ('drop', 'block')
+
+# Manifest kompaksi per partisi: file gabungan aktif dan file-file yang digantikannya
+MANIFEST_NAME = '_compacted.json'
+
+# Pembaca mencoba ulang jika file partisi terhapus kompaksi di tengah pembacaan
+READ_ATTEMPTS = 3
+
+# Nama jenis transaksi per kode hasil encoding (ejaan aplikasi)
+TYPE_NAMES = {0: 'PAYMENT', 1: 'DEBIT', 2: 'CASH-OUT', 3: 'TRANSFER', 4: 'CASH-IN'}
+
+# Kolom opsional yang disimpan jika ada pada transaksi masukan
+ACCOUNT_COLUMNS = ('nameOrig', 'nameDest')
+LABEL_COLUMN = 'isFraud'
+
+# Agregat per (jam, jenis) yang ditulis bersama setiap file transaksi
+ROLLUP_SUMS = ('transactions', 'fraud', 'amount', 'fraud_amount', 'fraud_prob_sum', 'rule_decided',
+               'labeled', 'correct')
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ('scored_at', pa.timestamp('ms')),
+        ('step', pa.int32()),
+        ('type', pa.dictionary(pa.int8(), pa.string())),
+        ('amount', pa.float64()),
+        ('oldbalanceOrg', pa.float64()),
+        ('newbalanceOrig', pa.float64()),
+        ('oldbalanceDest', pa.float64()),
+        ('newbalanceDest', pa.float64()),
+        ('nameOrig', pa.string()),
+        ('nameDest', pa.string()),
+        ('isFraud', pa.int8()),
+        ('fraud_prob', pa.float32()),
+        ('prediction', pa.int8()),
+        ('decided_by', pa.string()),
+        ('model_version', pa.dictionary(pa.int8(), pa.string())),
+    ])
+
+
+def _rollup_schema():
+    import pyarrow as pa
+
+    return pa.schema([('hour', pa.int8()), ('type', pa.string())] + [
+        (name, pa.float64() if name in ('amount', 'fraud_amount', 'fraud_prob_sum') else pa.int64())
+        for name in ROLLUP_SUMS
+    ])
+
+
+# Fungsi untuk mengambil kolom opsional dari dict, list of dict, DataFrame atau record array
+def _optional_column(transactions, name):
+    if isinstance(transactions, dict):
+        transactions = [transactions]
+    if isinstance(transactions, (list, tuple)):
+        if not transactions or any(name not in row for row in transactions):
+            return None
+        return [row[name] for row in transactions]
+    if isinstance(transactions, np.ndarray) and transactions.dtype.names is None:
+        return None
+    if hasattr(transactions, 'schema'):
+        # RecordBatch/Table Arrow
+        names = transactions.schema.names
+        return transactions.column(name).to_numpy(zero_copy_only=False) if name in names else None
+    names = getattr(transactions, 'columns', None)
+    if names is None:
+        names = transactions.dtype.names
+    return np.asarray(transactions[name]) if name in names else None
+
+
+# Fungsi untuk mengubah satu batch hasil scoring menjadi kolom-kolom NumPy (sesuai skema)
+def _batch_columns(transactions, result, model_version, scored_at):
+    X = scoring.encode_transactions(transactions)
+    n = len(X)
+    type_codes = X[:, scoring.TYPE_INDEX].astype(np.int8)
+    columns = {
+        'scored_at': np.full(n, int(scored_at * 1000), dtype='datetime64[ms]'),
+        'step': X[:, 0].astype(np.int32),
+        'type': type_codes,
+    }
+    for j, name in enumerate(scoring.FEATURE_COLUMNS[2:], start=2):
+        columns[name] = X[:, j]
+    for name in ACCOUNT_COLUMNS:
+        values = _optional_column(transactions, name)
+        columns[name] = np.asarray(values, dtype=object) if values is not None else np.full(n, None, dtype=object)
+    label = _optional_column(transactions, LABEL_COLUMN)
+    columns[LABEL_COLUMN] = (np.asarray(label, dtype=np.float64) if label is not None
+                             else np.full(n, np.nan))
+    columns['fraud_prob'] = np.asarray(result['fraud_prob'], dtype=np.float32)
+    columns['prediction'] = np.asarray(result['prediction'], dtype=np.int8)
+    # Baris yang di-score model bernilai '' pada decided_by RuleEngine; disimpan sebagai null
+    decided_by = result.get('decided_by')
+    decided_by = np.array(decided_by, dtype=object) if decided_by is not None else np.full(n, None, dtype=object)
+    decided_by[decided_by == ''] = None
+    columns['decided_by'] = decided_by
+    columns['model_version'] = np.full(n, model_version, dtype=object)
+    return columns
+
+
+def _day(timestamp):
+    return time.strftime('%Y-%m-%d', time.localtime(timestamp))
+
+
+def _to_table(columns):
+    import pyarrow as pa
+
+    schema = _schema()
+    type_names = pa.array([TYPE_NAMES[code] for code in range(len(TYPE_NAMES))])
+    arrays = []
+    for field in schema:
+        values = columns[field.name]
+        if field.name == 'type':
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array(values, pa.int8()), type_names))
+        elif field.name == LABEL_COLUMN:
+            arrays.append(pa.array(values, pa.float64(), mask=np.isnan(values)).cast(pa.int8()))
+        elif field.name == 'model_version':
+            arrays.append(pa.array(values, pa.string()).dictionary_encode().cast(field.type))
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+# Fungsi untuk menghitung rollup per (jam, jenis) dari kolom-kolom satu partisi
+def _rollup(columns):
+    import pandas as pd
+
+    # Jam lokal per waktu scoring (bukan offset saat ini), sehingga benar melewati pergantian DST;
+    # konsisten dengan penentuan partisi hari. localtime cukup dihitung per detik unik.
+    seconds, inverse = np.unique(columns['scored_at'].astype('datetime64[s]').astype(np.int64),
+                                 return_inverse=True)
+    hours = np.array([time.localtime(second).tm_hour for second in seconds], dtype=np.int64)[inverse]
+    prediction = columns['prediction'].astype(np.int64)
+    label = columns[LABEL_COLUMN]
+    labeled = ~np.isnan(label)
+    frame = pd.DataFrame({
+        'hour': hours.astype(np.int8),
+        'type': columns['type'],
+        'transactions': np.ones(len(prediction), dtype=np.int64),
+        'fraud': prediction,
+        'amount': columns['amount'],
+        'fraud_amount': np.where(prediction == 1, columns['amount'], 0.0),
+        'fraud_prob_sum': columns['fraud_prob'].astype(np.float64),
+        'rule_decided': np.not_equal(columns['decided_by'], None).astype(np.int64),
+        'labeled': labeled.astype(np.int64),
+        'correct': (labeled & (np.nan_to_num(label) == prediction)).astype(np.int64),
+    })
+    rollup = frame.groupby(['hour', 'type'], as_index=False, sort=True).sum()
+    rollup['type'] = rollup['type'].map(TYPE_NAMES)
+    return rollup
+
+
+def _write_parquet(table, directory, name):
+    import pyarrow.parquet as pq
+
+    os.makedirs(directory, exist_ok=True)
+    # Ditulis ke file sementara lalu di-rename agar pembaca tidak pernah melihat file setengah jadi
+    tmp_path = os.path.join(directory, f".{name}.tmp")
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, os.path.join(directory, name))
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_manifest(directory, manifest):
+    # Rename atomik: inilah satu langkah yang menukar file-file lama dengan file gabungan
+    tmp_path = os.path.join(directory, f".{MANIFEST_NAME}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(directory, MANIFEST_NAME))
+
+
+# Fungsi untuk menjalankan pembacaan partisi, diulang jika file terhapus kompaksi sejak didaftar
+def _read_with_retry(read):
+    for attempt in range(READ_ATTEMPTS):
+        try:
+            return read()
+        except FileNotFoundError:
+            if attempt == READ_ATTEMPTS - 1:
+                raise
+
+
+# Riwayat transaksi yang sudah di-score dalam Parquet, dipartisi per hari (hive: date=YYYY-MM-DD).
+# Setiap file transaksi disertai file rollup kecil per (jam, jenis) sehingga statistik dashboard
+# cukup membaca rollup partisi yang diminta, bukan seluruh baris.
+# Kompaksi menulis file gabungan (compacted-*.parquet) lalu menukarnya lewat manifest partisi;
+# pembaca hanya memakai file yang ditunjuk manifest ditambah file part-* yang belum digantikan.
+class HistoryStore:
+    def __init__(self, directory=DEFAULT_DIRECTORY, flush_rows=DEFAULT_FLUSH_ROWS,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, queue_rows=DEFAULT_QUEUE_ROWS, overflow='drop'):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Kebijakan overflow tidak dikenal: {overflow!r} (pilih {', '.join(OVERFLOW_POLICIES)})")
+        self.directory = directory
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+
+        self.rows = 0
+        self.files = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+
+        self._queue = bounded_queue.RowQueue(queue_rows)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._days_written = set()
+
+    @property
+    def transactions_directory(self):
+        return os.path.join(self.directory, 'transactions')
+
+    @property
+    def rollups_directory(self):
+        return os.path.join(self.directory, 'rollups')
+
+    def start(self):
+        if self._thread is None:
+            import atexit
+
+            self._thread = threading.Thread(target=self._run, name='history-store', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    # Fungsi untuk mencatat satu batch hasil scoring; encoding dan penulisan dikerjakan writer
+    def record(self, transactions, result, model_version=None):
+        n = len(result['fraud_prob'])
+        # Writer dibangunkan jika sudah cukup baris untuk satu file atau antrean akan penuh
+        if self._queue.rows + n >= min(self.flush_rows, self._queue.max_rows):
+            self._wake.set()
+        if self._queue.put((time.time(), transactions, result, model_version), n,
+                           block=self.overflow == 'block'):
+            return True
+        with self._lock:
+            self.dropped += n
+        return False
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            stop = self._stop.is_set()
+            items = self._queue.drain()
+            try:
+                self._write(items)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                    self.last_error = str(e)
+            if stop:
+                return
+
+    def _write(self, items):
+        by_day = {}
+        for scored_at, transactions, result, model_version in items:
+            by_day.setdefault(_day(scored_at), []).append(
+                _batch_columns(transactions, result, model_version, scored_at)
+            )
+        for day, batches in by_day.items():
+            columns = {name: np.concatenate([batch[name] for batch in batches]) for name in batches[0]}
+            self.write_partition(day, columns)
+
+        # Partisi hari sebelumnya tidak lagi ditulis proses ini; file-filenya digabung
+        today = _day(time.time())
+        for day in sorted(self._days_written - {today}):
+            self.compact(day)
+            self._days_written.discard(day)
+
+    # Fungsi untuk menulis kolom-kolom satu hari sebagai file transaksi + file rollup
+    def write_partition(self, day, columns):
+        import pyarrow as pa
+
+        name = f"part-{time.time_ns()}-{os.getpid()}.parquet"
+        _write_parquet(_to_table(columns), os.path.join(self.transactions_directory, f"date={day}"), name)
+        rollup = pa.Table.from_pandas(_rollup(columns), schema=_rollup_schema(), preserve_index=False)
+        _write_parquet(rollup, os.path.join(self.rollups_directory, f"date={day}"), name)
+        self._days_written.add(day)
+        with self._lock:
+            self.rows += len(columns['prediction'])
+            self.files += 1
+
+    # Fungsi untuk menulis semua yang sudah mengantre dan menghentikan writer
+    def close(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+
+    def _days(self, base, start=None, end=None):
+        days = []
+        for path in glob.glob(os.path.join(base, 'date=*')):
+            day = os.path.basename(path)[len('date='):]
+            if (start is None or day >= start) and (end is None or day <= end):
+                days.append(day)
+        return sorted(days)
+
+    # Fungsi untuk daftar file aktif satu partisi: file gabungan dari manifest + part-* yang belum digabung
+    def _files(self, base, day):
+        directory = os.path.join(base, f"date={day}")
+        files = sorted(glob.glob(os.path.join(directory, 'part-*.parquet')))
+        manifest = _read_manifest(directory)
+        if manifest is None:
+            return files
+        replaced = set(manifest['replaces'])
+        return [os.path.join(directory, manifest['file'])] + [
+            path for path in files if os.path.basename(path) not in replaced
+        ]
+
+    # Fungsi untuk membaca rollup per (hari, jam, jenis) pada rentang hari [start, end]
+    def rollups(self, start=None, end=None):
+        import pandas as pd
+        import pyarrow.dataset as ds
+
+        def read(day):
+            files = self._files(self.rollups_directory, day)
+            if not files:
+                return None
+            return ds.dataset(files, schema=_rollup_schema(), format='parquet').to_table().to_pandas()
+
+        frames = []
+        for day in self._days(self.rollups_directory, start, end):
+            frame = _read_with_retry(lambda: read(day))
+            if frame is None:
+                continue
+            frame.insert(0, 'date', day)
+            frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=['date', 'hour', 'type', *ROLLUP_SUMS])
+        return pd.concat(frames, ignore_index=True).groupby(['date', 'hour', 'type'], as_index=False).sum()
+
+    # Fungsi untuk ringkasan harian (jumlah transaksi, fraud, nominal, akurasi jika ada label)
+    def daily(self, start=None, end=None):
+        rollups = self.rollups(start, end)
+        daily = rollups.drop(columns=['hour', 'type']).groupby('date', as_index=False).sum()
+        daily['fraud_rate'] = daily['fraud'] / daily['transactions'].where(daily['transactions'] > 0)
+        daily['mean_fraud_prob'] = daily['fraud_prob_sum'] / daily['transactions'].where(daily['transactions'] > 0)
+        daily['accuracy'] = daily['correct'] / daily['labeled'].where(daily['labeled'] > 0)
+        return daily
+
+    # Fungsi untuk membaca baris transaksi: hanya kolom dan partisi hari yang diminta yang dibaca
+    def scan(self, columns=None, start=None, end=None, filter=None):
+        import pyarrow.dataset as ds
+
+        def read():
+            files = [path for day in self._days(self.transactions_directory, start, end)
+                     for path in self._files(self.transactions_directory, day)]
+            if not files:
+                return _schema().empty_table().select(columns) if columns else _schema().empty_table()
+            dataset = ds.dataset(files, schema=_schema(), format='parquet')
+            return dataset.to_table(columns=columns, filter=filter)
+
+        return _read_with_retry(read)
+
+    # Fungsi untuk menggabungkan file-file kecil satu hari menjadi satu file transaksi + satu rollup
+    def compact(self, day):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        for base, schema in ((self.transactions_directory, _schema()), (self.rollups_directory, _rollup_schema())):
+            directory = os.path.join(base, f"date={day}")
+            # Sisa kompaksi sebelumnya yang terhenti setelah penukaran dihapus lebih dulu, agar tidak
+            # terlihat lagi oleh pembaca setelah manifest baru menggantikannya
+            self._remove_inactive(directory)
+            files = self._files(base, day)
+            if len(files) > 1:
+                table = ds.dataset(files, schema=schema, format='parquet').to_table()
+                if base == self.rollups_directory:
+                    table = pa.Table.from_pandas(
+                        table.to_pandas().groupby(['hour', 'type'], as_index=False).sum(),
+                        schema=schema, preserve_index=False
+                    )
+                # File gabungan belum terlihat pembaca sampai manifest baru menggantikan file-file lama
+                name = f"compacted-{time.time_ns()}-{os.getpid()}.parquet"
+                _write_parquet(table, directory, name)
+                _write_manifest(directory, {'file': name, 'replaces': [os.path.basename(path) for path in files]})
+            self._remove_inactive(directory)
+
+    # Fungsi untuk menghapus file yang tidak lagi ditunjuk manifest (termasuk sisa kompaksi yang terhenti)
+    def _remove_inactive(self, directory):
+        manifest = _read_manifest(directory)
+        if manifest is None:
+            return
+        replaced = set(manifest['replaces'])
+        for path in glob.glob(os.path.join(directory, '*.parquet')):
+            name = os.path.basename(path)
+            if name in replaced or (name.startswith('compacted-') and name != manifest['file']):
+                os.remove(path)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rows': self.rows,
+                'files': self.files,
+                'queued_batches': len(self._queue),
+                'queued_rows': self._queue.rows,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'last_error': self.last_error,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pemeliharaan riwayat scoring (Parquet per hari)')
+    parser.add_argument('--directory', default=DEFAULT_DIRECTORY)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('compact', help='Gabungkan file-file kecil setiap hari sebelum hari ini')
+    summary_parser = commands.add_parser('summary', help='Tampilkan ringkasan harian')
+    summary_parser.add_argument('--start', default=None, help='Hari awal (YYYY-MM-DD)')
+    summary_parser.add_argument('--end', default=None, help='Hari akhir (YYYY-MM-DD)')
+    args = parser.parse_args()
+
+    store = HistoryStore(args.directory)
+    if args.command == 'compact':
+        today = _day(time.time())
+        for day in store._days(store.transactions_directory, end=None):
+            if day < today:
+                store.compact(day)
+                print(f"{day} digabung")
+    else:
+        print(store.daily(args.start, args.end).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
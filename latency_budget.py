@@ -0,0 +1,294 @@
+import argparse
+import threading
+import time
+
+import numpy as np
+
+import cascade
+import scoring
+
+# Jumlah boosting round minimum diturunkan dari kurva akurasi: K terkecil yang mengubah keputusan
+# model penuh pada kurang dari proporsi ini di sampel kalibrasi. Untuk model bawaan hasilnya 85 dari
+# 100 round, sehingga pemotongan hanya menghemat waktu pada batch besar (sekitar 11% pada 256 baris,
+# tidak ada pada 1 baris); batas yang lebih longgar menghemat lebih banyak tetapi mengubah lebih
+# banyak keputusan (lihat kurva dari main()).
+DEFAULT_MAX_FLIP_RATE = 0.005
+
+# Jumlah transaksi sintetis PaySim untuk menurunkan jumlah round minimum
+FLOOR_CALIBRATION_ROWS = 20_000
+
+# Model hanya dipotong jika waktu yang diperkirakan dihemat minimal proporsi ini dari model penuh;
+# biaya tetap per panggilan mendominasi batch kecil sehingga memotong round hampir tidak menghemat waktu
+DEFAULT_MIN_SAVING = 0.1
+
+# Ukuran batch dan proporsi round untuk mengukur biaya per round saat model dimuat
+CALIBRATION_ROWS = (1, 256, 2048)
+CALIBRATION_FRACTIONS = (0.1, 0.5, 1.0)
+CALIBRATION_REPEATS = 3
+
+# Bobot EWMA koreksi biaya dari pengukuran scoring sebenarnya (beban CPU berubah saat lonjakan)
+COST_SMOOTHING = 0.05
+
+# Round yang diukur oleh alat kurva akurasi/latensi
+DEFAULT_CURVE_ROUNDS = [1, 2, 5, 10, 15, 20, 30, 40, 50, 60, 70, 80, 90, 100]
+
+
+# Model biaya inferensi: detik = (fixed + per_row * baris + per_row_round * baris * round) * scale.
+# Koefisien diukur sekali per versi model; scale mengikuti rasio waktu nyata terhadap perkiraan.
+class RoundCost:
+    def __init__(self, fixed, per_row, per_row_round):
+        self.fixed = fixed
+        self.per_row = per_row
+        self.per_row_round = per_row_round
+        self.scale = 1.0
+        self._lock = threading.Lock()
+
+    # Fungsi untuk mengukur koefisien biaya model dengan regresi kuadrat terkecil
+    @classmethod
+    def measure(cls, model, X_scaled, n_rounds, repeats=CALIBRATION_REPEATS):
+        samples, seconds = [], []
+        for rows in CALIBRATION_ROWS:
+            X = X_scaled[:rows]
+            for fraction in CALIBRATION_FRACTIONS:
+                rounds = max(1, int(n_rounds * fraction))
+                cascade.predict_truncated(model, X, rounds)
+                best = float('inf')
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    cascade.predict_truncated(model, X, rounds)
+                    best = min(best, time.perf_counter() - start)
+                samples.append((1.0, len(X), len(X) * rounds))
+                seconds.append(best)
+        coefficients = np.linalg.lstsq(np.array(samples), np.array(seconds), rcond=None)[0]
+        fixed, per_row, per_row_round = (max(float(value), 0.0) for value in coefficients)
+        # Biaya per round tidak boleh nol; jika regresi gagal memisahkannya, pakai rata-rata kasar
+        if per_row_round == 0.0:
+            per_row_round = max(seconds) / (CALIBRATION_ROWS[-1] * n_rounds)
+        return cls(fixed, per_row, per_row_round)
+
+    def predict(self, rows, rounds):
+        return (self.fixed + self.per_row * rows + self.per_row_round * rows * rounds) * self.scale
+
+    # Fungsi untuk jumlah round terbanyak yang diperkirakan selesai dalam `seconds`
+    def rounds_within(self, rows, seconds, max_rounds):
+        remaining = seconds / self.scale - self.fixed - self.per_row * rows
+        if remaining <= 0 or rows == 0:
+            return 0 if rows else max_rounds
+        return int(min(max_rounds, remaining // (self.per_row_round * rows)))
+
+    def observe(self, rows, rounds, seconds):
+        expected = self.predict(rows, rounds) / self.scale
+        if expected <= 0:
+            return
+        # Satu pengukuran ekstrem (misalnya GC) tidak boleh menggeser perkiraan terlalu jauh
+        ratio = min(max(seconds / expected, 0.25), 4.0)
+        with self._lock:
+            self.scale += COST_SMOOTHING * (ratio - self.scale)
+
+    def to_dict(self):
+        return {
+            'fixed_us': self.fixed * 1e6,
+            'per_row_us': self.per_row * 1e6,
+            'per_row_round_ns': self.per_row_round * 1e9,
+            'scale': self.scale,
+        }
+
+
+# Fungsi untuk K terkecil yang keputusannya berbeda dari model penuh pada kurang dari max_flip_rate
+# transaksi. Pencarian turun dari model penuh, sehingga hanya K di atas floor yang dievaluasi.
+def derive_min_rounds(model, X_scaled, max_flip_rate=DEFAULT_MAX_FLIP_RATE, threshold=scoring.DEFAULT_THRESHOLD):
+    n_rounds = model.get_booster().num_boosted_rounds()
+    full = cascade.predict_truncated(model, X_scaled, n_rounds) > threshold
+    step = max(1, n_rounds // 20)
+    floor = n_rounds
+    for rounds in range(n_rounds - step, 0, -step):
+        flips = (cascade.predict_truncated(model, X_scaled, rounds) > threshold) != full
+        if flips.mean() >= max_flip_rate:
+            break
+        floor = rounds
+    return floor
+
+
+# Fungsi untuk sampel kalibrasi ter-scale dari generator PaySim (distribusi mirip trafik nyata)
+def calibration_sample(scaler, n_rows=FLOOR_CALIBRATION_ROWS, seed=0):
+    import paysim_generator
+
+    transactions = next(paysim_generator.iter_transactions(n_rows, chunksize=n_rows, seed=seed))
+    return cascade._prepare(scaler, transactions)
+
+
+# Scoring dengan budget latensi: hanya K boosting round pertama yang dievaluasi (iteration_range),
+# dengan K terbesar yang diperkirakan selesai dalam budget menurut biaya per round yang diukur.
+# Tanpa budget, model penuh dipakai. Saat lonjakan trafik (batch besar, antrean panjang, CPU
+# penuh) skor menjadi sedikit kurang akurat alih-alih melewati SLA otorisasi pembayaran.
+# Tanpa min_rounds, jumlah round minimum diturunkan dari kurva akurasi model (max_flip_rate).
+class BudgetedScorer:
+    def __init__(self, model, scaler, min_rounds=None, max_flip_rate=DEFAULT_MAX_FLIP_RATE,
+                 min_saving=DEFAULT_MIN_SAVING, cost=None):
+        if not hasattr(model, 'get_booster'):
+            raise ValueError("Scoring dengan budget latensi membutuhkan model XGBoost")
+        self.model = model
+        self.scaler = scaler
+        self.n_rounds = model.get_booster().num_boosted_rounds()
+        if min_rounds is None:
+            min_rounds = derive_min_rounds(model, calibration_sample(scaler), max_flip_rate)
+        self.min_rounds = min(min_rounds, self.n_rounds)
+        self.max_flip_rate = max_flip_rate
+        self.min_saving = min_saving
+        if cost is None:
+            # Baris acak di ruang fitur ter-scale: jalur pohon bervariasi seperti trafik nyata
+            X = np.random.default_rng(0).standard_normal((CALIBRATION_ROWS[-1], len(scoring.FEATURE_COLUMNS)))
+            cost = RoundCost.measure(model, X, self.n_rounds)
+        self.cost = cost
+
+        self.rows = 0
+        self.truncated_rows = 0
+        self.round_rows = 0
+        self.over_budget = 0
+        self._lock = threading.Lock()
+
+    # Fungsi untuk memilih jumlah round: dibatasi budget (ms), max_rounds (budget komputasi) dan min_rounds
+    def rounds_for(self, n_rows, budget_ms=None, max_rounds=None):
+        rounds = self.n_rounds if max_rounds is None else min(max_rounds, self.n_rounds)
+        if budget_ms is not None:
+            within = self.cost.rounds_within(n_rows, budget_ms / 1000.0, self.n_rounds)
+            # Budget yang bahkan tidak cukup untuk biaya tetap tidak tertolong oleh pemotongan model
+            if within > 0:
+                rounds = min(rounds, within)
+        rounds = max(rounds, self.min_rounds)
+        full = self.cost.predict(n_rows, self.n_rounds)
+        if rounds < self.n_rounds and full - self.cost.predict(n_rows, rounds) < self.min_saving * full:
+            return self.n_rounds
+        return rounds
+
+    def score(self, transactions, threshold=scoring.DEFAULT_THRESHOLD, budget_ms=None, max_rounds=None):
+        X_scaled = cascade._prepare(self.scaler, transactions)
+        rounds = self.rounds_for(len(X_scaled), budget_ms, max_rounds)
+
+        start = time.perf_counter()
+        fraud_prob = cascade.predict_truncated(self.model, X_scaled, rounds)
+        elapsed = time.perf_counter() - start
+        if len(X_scaled):
+            self.cost.observe(len(X_scaled), rounds, elapsed)
+
+        with self._lock:
+            self.rows += len(X_scaled)
+            self.round_rows += len(X_scaled) * rounds
+            if rounds < self.n_rounds:
+                self.truncated_rows += len(X_scaled)
+            if budget_ms is not None and elapsed * 1000.0 > budget_ms:
+                self.over_budget += 1
+
+        return {
+            'fraud_prob': fraud_prob,
+            'safe_prob': 1.0 - fraud_prob,
+            'prediction': (fraud_prob > threshold).astype(np.int64),
+            'rounds': np.full(len(X_scaled), rounds, dtype=np.int16),
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                'n_rounds': self.n_rounds,
+                'min_rounds': self.min_rounds,
+                'max_flip_rate': self.max_flip_rate,
+                'rows': self.rows,
+                'truncated_rows': self.truncated_rows,
+                'truncated_rate': self.truncated_rows / self.rows if self.rows else None,
+                'mean_rounds': self.round_rows / self.rows if self.rows else None,
+                'over_budget_calls': self.over_budget,
+                'cost': self.cost.to_dict(),
+            }
+
+
+def _timed_ms(fn, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0
+
+
+# Fungsi untuk kurva akurasi/latensi: setiap jumlah round dibandingkan dengan model penuh
+# (keputusan yang berubah, selisih probabilitas) dan, jika ada label isFraud, dengan label
+def accuracy_latency_curve(model, scaler, transactions, rounds_list=DEFAULT_CURVE_ROUNDS,
+                           threshold=scoring.DEFAULT_THRESHOLD, batch_size=256, repeats=5):
+    X_scaled = cascade._prepare(scaler, transactions)
+    n_rounds = model.get_booster().num_boosted_rounds()
+    labels = np.asarray(transactions['isFraud']) if hasattr(transactions, 'columns') and \
+        'isFraud' in transactions.columns else None
+    full_prob = np.asarray(model.predict_proba(X_scaled))[:, 1]
+    full_fraud = full_prob > threshold
+    single, batch = X_scaled[:1], X_scaled[:batch_size]
+
+    curve = []
+    for rounds in sorted({min(rounds, n_rounds) for rounds in rounds_list}):
+        fraud_prob = cascade.predict_truncated(model, X_scaled, rounds)
+        fraud = fraud_prob > threshold
+        row = {
+            'rounds': rounds,
+            'single_ms': _timed_ms(lambda: cascade.predict_truncated(model, single, rounds), repeats * 10),
+            'batch_ms': _timed_ms(lambda: cascade.predict_truncated(model, batch, rounds), repeats),
+            'flip_rate': float((fraud != full_fraud).mean()),
+            'mean_abs_delta': float(np.abs(fraud_prob - full_prob).mean()),
+        }
+        if labels is not None:
+            true_positive = int((fraud & (labels == 1)).sum())
+            row['recall'] = true_positive / max(int((labels == 1).sum()), 1)
+            row['precision'] = true_positive / max(int(fraud.sum()), 1)
+        curve.append(row)
+    return curve
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Kurva akurasi/latensi scoring XGBoost terpotong (iteration_range) terhadap model penuh'
+    )
+    parser.add_argument('sample', nargs='?', default=None,
+                        help='File sampel trafik (CSV/Parquet berformat PaySim); default data sintetis')
+    parser.add_argument('--rows', type=int, default=200_000, help='Jumlah baris yang dievaluasi')
+    parser.add_argument('--rounds', type=int, nargs='+', default=DEFAULT_CURVE_ROUNDS)
+    parser.add_argument('--batch-size', type=int, default=256, help='Ukuran batch untuk pengukuran latensi')
+    parser.add_argument('--max-flip-rate', type=float, default=DEFAULT_MAX_FLIP_RATE,
+                        help='Batas proporsi keputusan berubah untuk menurunkan jumlah round minimum')
+    parser.add_argument('--model', default='xgb_model.pkl')
+    parser.add_argument('--scaler', default='scaler.pkl')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    model, scaler = scoring.load_model_and_scaler(args.model, args.scaler)
+    if args.sample is not None:
+        import bulk_scoring
+
+        transactions, _ = next(bulk_scoring.iter_chunks(args.sample, bulk_scoring.detect_format(args.sample),
+                                                        args.rows))
+    else:
+        import paysim_generator
+
+        transactions = next(paysim_generator.iter_transactions(args.rows, chunksize=args.rows, seed=args.seed))
+
+    scorer = BudgetedScorer(model, scaler, max_flip_rate=args.max_flip_rate)
+    cost = scorer.cost.to_dict()
+    print(f"Biaya terukur: tetap {cost['fixed_us']:.0f} us, {cost['per_row_round_ns']:.1f} ns per baris per round")
+    print(f"Round minimum: {scorer.min_rounds} dari {scorer.n_rounds} "
+          f"(keputusan berubah < {args.max_flip_rate:.1%} pada sampel kalibrasi)")
+    for rows in (1, args.batch_size):
+        saving = 1.0 - scorer.cost.predict(rows, scorer.min_rounds) / scorer.cost.predict(rows, scorer.n_rounds)
+        print(f"  {rows} baris: round minimum menghemat {saving:.0%} waktu inferensi"
+              + ('' if saving >= scorer.min_saving else ' (tidak dipotong, penghematan terlalu kecil)'))
+
+    curve = accuracy_latency_curve(model, scaler, transactions, args.rounds, batch_size=args.batch_size)
+    labeled = 'recall' in curve[0]
+    header = f"{'round':>5} {'1 baris':>9} {f'{args.batch_size} baris':>11} {'keputusan berubah':>18} {'|Δ prob|':>9}"
+    print(header + (f" {'recall':>7} {'presisi':>8}" if labeled else ''))
+    for row in curve:
+        line = (f"{row['rounds']:>5} {row['single_ms']:>7.3f}ms {row['batch_ms']:>9.3f}ms "
+                f"{row['flip_rate']:>18.4%} {row['mean_abs_delta']:>9.5f}")
+        if labeled:
+            line += f" {row['recall']:>7.2%} {row['precision']:>8.2%}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
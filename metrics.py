@@ -0,0 +1,229 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Batas bucket latensi (detik), berjarak logaritmik dari 10 mikrodetik sampai 10 detik
+def _log_buckets(start=1e-5, stop=10.0, per_decade=10):
+    bounds = []
+    value = start
+    factor = 10 ** (1.0 / per_decade)
+    while value <= stop * 1.0001:
+        bounds.append(value)
+        value *= factor
+    return bounds
+
+
+DEFAULT_LATENCY_BUCKETS = _log_buckets()
+
+# Jendela rolling untuk kuantil dan throughput (detik), dibagi menjadi beberapa irisan waktu
+DEFAULT_WINDOW = 60.0
+DEFAULT_SLICES = 6
+
+# Batas bucket yang diekspor ke Prometheus (subset DEFAULT_LATENCY_BUCKETS agar output ringkas)
+PROMETHEUS_BUCKETS = DEFAULT_LATENCY_BUCKETS[::5]
+
+
+# Irisan waktu bergulir: nilai dicatat ke irisan aktif, irisan yang lebih tua dari
+# jendela dikosongkan ulang saat waktu berjalan
+class _RollingSlices:
+    def __init__(self, window, slices, factory):
+        self.slice_seconds = window / slices
+        self.factory = factory
+        self.slices = [factory() for _ in range(slices)]
+        self.epochs = [-1] * slices
+
+    def current(self, now):
+        epoch = int(now // self.slice_seconds)
+        index = epoch % len(self.slices)
+        if self.epochs[index] != epoch:
+            self.slices[index] = self.factory()
+            self.epochs[index] = epoch
+        return self.slices[index]
+
+    def live(self, now):
+        epoch = int(now // self.slice_seconds)
+        oldest = epoch - len(self.slices) + 1
+        return [data for data, slice_epoch in zip(self.slices, self.epochs) if slice_epoch >= oldest]
+
+
+# Histogram latensi dengan memori konstan; kuantil diestimasi dari batas atas bucket.
+# Hitungan kumulatif dipakai untuk ekspor Prometheus; dengan `window`, kuantil dan
+# throughput dihitung dari jendela waktu terakhir saja.
+class LatencyHistogram:
+    def __init__(self, bounds=DEFAULT_LATENCY_BUCKETS, window=None, slices=DEFAULT_SLICES):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.window = window
+        self._rolling = None
+        if window is not None:
+            self._rolling = _RollingSlices(window, slices, lambda: [0] * (len(self.bounds) + 1))
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.bounds, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            if self._rolling is not None:
+                self._rolling.current(time.monotonic())[index] += 1
+
+    def _window_counts(self):
+        with self._lock:
+            if self._rolling is None:
+                return list(self.counts), self.count
+            counts = [sum(values) for values in zip(*self._rolling.live(time.monotonic()))]
+        if not counts:
+            return [0] * (len(self.bounds) + 1), 0
+        return counts, sum(counts)
+
+    # Jumlah observasi per detik di jendela rolling (None untuk histogram kumulatif)
+    def rate(self):
+        if self._rolling is None:
+            return None
+        return self._window_counts()[1] / self.window
+
+    def quantile(self, q):
+        counts, count = self._window_counts()
+        if count == 0:
+            return None
+        target = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            cumulative += bucket_count
+            if cumulative >= target and bucket_count:
+                return self.bounds[index] if index < len(self.bounds) else float('inf')
+        return float('inf')
+
+    def summary(self):
+        summary = {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.quantile(0.50),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+        }
+        if self._rolling is not None:
+            summary['rate'] = self.rate()
+        return summary
+
+    # Bucket kumulatif (le, jumlah) untuk format histogram Prometheus
+    def cumulative_buckets(self, bounds=PROMETHEUS_BUCKETS):
+        with self._lock:
+            counts = list(self.counts)
+        buckets = []
+        for bound in bounds:
+            # Bucket internal dengan batas atas <= bound seluruhnya masuk ke bucket ekspor
+            upper = bisect.bisect_right(self.bounds, bound * 1.0001)
+            buckets.append((bound, sum(counts[:upper])))
+        return buckets
+
+
+# Penghitung throughput: total kumulatif dan laju per detik di jendela rolling
+class Counter:
+    def __init__(self, window=DEFAULT_WINDOW, slices=DEFAULT_SLICES):
+        self.total = 0
+        self.window = window
+        self._rolling = _RollingSlices(window, slices, lambda: [0])
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.total += amount
+            self._rolling.current(time.monotonic())[0] += amount
+
+    def rate(self):
+        with self._lock:
+            return sum(values[0] for values in self._rolling.live(time.monotonic())) / self.window
+
+
+# Registri metrik per proses: histogram latensi per tahap scoring dan counter throughput.
+# Dibaca oleh panel admin Streamlit dan endpoint /metrics (format teks Prometheus).
+class MetricsRegistry:
+    def __init__(self, window=DEFAULT_WINDOW, prefix='safepay'):
+        self.window = window
+        self.prefix = prefix
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def stage_histogram(self, stage):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.stages.setdefault(stage, LatencyHistogram(window=self.window))
+        return histogram
+
+    def counter(self, name):
+        counter = self.counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self.counters.setdefault(name, Counter(window=self.window))
+        return counter
+
+    def observe(self, stage, seconds):
+        self.stage_histogram(stage).observe(seconds)
+
+    def inc(self, name, amount=1):
+        self.counter(name).inc(amount)
+
+    # Pengukur durasi satu tahap, misalnya: with REGISTRY.timer('encode'): ...
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_histogram(stage).observe(time.perf_counter() - start)
+
+    def snapshot(self):
+        return {
+            'stages': {stage: histogram.summary() for stage, histogram in sorted(self.stages.items())},
+            'counters': {
+                name: {'total': counter.total, 'rate': counter.rate()} for name, counter in sorted(self.counters.items())
+            },
+        }
+
+    def render_prometheus(self):
+        name = f"{self.prefix}_stage_duration_seconds"
+        lines = [
+            f"# HELP {name} Durasi tahap scoring dalam detik",
+            f"# TYPE {name} histogram",
+        ]
+        for stage, histogram in sorted(self.stages.items()):
+            for bound, count in histogram.cumulative_buckets():
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound:.6g}"}} {count}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum:.9g}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+
+        # Kuantil rolling sebagai gauge agar bisa dibaca tanpa histogram_quantile()
+        quantile_name = f"{self.prefix}_stage_duration_rolling_seconds"
+        lines += [
+            f"# HELP {quantile_name} Kuantil durasi tahap scoring pada jendela {self.window:g} detik terakhir",
+            f"# TYPE {quantile_name} gauge",
+        ]
+        for stage, histogram in sorted(self.stages.items()):
+            for q in (0.5, 0.95, 0.99):
+                value = histogram.quantile(q)
+                if value is not None:
+                    lines.append(f'{quantile_name}{{stage="{stage}",quantile="{q:g}"}} {value:.9g}')
+
+        for counter_name, counter in sorted(self.counters.items()):
+            total_name = f"{self.prefix}_{counter_name}_total"
+            rate_name = f"{self.prefix}_{counter_name}_per_second"
+            lines += [
+                f"# TYPE {total_name} counter",
+                f"{total_name} {counter.total}",
+                f"# TYPE {rate_name} gauge",
+                f"{rate_name} {counter.rate():.9g}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+# Registri default yang dipakai bersama oleh scoring, app Streamlit dan server
+REGISTRY = MetricsRegistry()
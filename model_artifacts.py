@@ -0,0 +1,169 @@
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+
+import scoring
+import tree_engine
+
+# Format artefak native: satu file biner datar berisi semua array (little-endian, rata 64 byte)
+# ditambah manifest JSON berisi tata letak, parameter scaler dan checksum.
+# File biner di-memory-map read-only sehingga banyak proses worker berbagi satu salinan fisik
+# di page cache, dan tidak ada kode pickle yang dijalankan saat startup.
+FORMAT_NAME = 'safepay-model'
+FORMAT_VERSION = 1
+
+MANIFEST_FILE = 'manifest.json'
+DATA_FILE = 'models.bin'
+DEFAULT_ARTIFACT_DIR = 'artifacts'
+
+ALIGNMENT = 64
+
+# Array per ensemble beserta tipe datanya di dalam file biner
+ENSEMBLE_ARRAYS = {
+    'feature': '<i8',
+    'threshold': '<f8',
+    'children': '<i8',
+    'default_left': '|u1',
+    'value': '<f8',
+    'roots': '<i8',
+}
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Fungsi untuk mengekspor model pickle menjadi artefak native yang bisa di-memory-map
+def export_artifacts(output_dir=DEFAULT_ARTIFACT_DIR, model_path='xgb_model.pkl', scaler_path='scaler.pkl',
+                     rf_path='rf_model.pkl'):
+    import joblib
+
+    model, scaler = scoring.load_model_and_scaler(model_path, scaler_path)
+    ensembles = {'xgb': tree_engine.compile_xgboost(model, scaler)}
+    sources = {'xgb': model_path, 'scaler': scaler_path}
+    if rf_path is not None and os.path.exists(rf_path):
+        ensembles['rf'] = tree_engine.compile_sklearn_forest(joblib.load(rf_path), scaler)
+        sources['rf'] = rf_path
+
+    center, scale = tree_engine.scaler_params(scaler, len(scoring.FEATURE_COLUMNS))
+
+    os.makedirs(output_dir, exist_ok=True)
+    data_path = os.path.join(output_dir, DATA_FILE)
+    offset = 0
+    models = {}
+
+    # Ditulis ke file sementara lalu di-rename agar pembaca tidak pernah melihat file setengah jadi
+    with open(data_path + '.tmp', 'wb') as handle:
+        def write_array(array, dtype):
+            nonlocal offset
+            padding = -offset % ALIGNMENT
+            handle.write(b'\0' * padding)
+            offset += padding
+            data = np.ascontiguousarray(array, dtype=dtype)
+            handle.write(data.tobytes())
+            layout = {'offset': offset, 'dtype': dtype, 'shape': list(data.shape)}
+            offset += data.nbytes
+            return layout
+
+        for name, ensemble in ensembles.items():
+            models[name] = {
+                'output': ensemble.output,
+                'max_depth': ensemble.max_depth,
+                'base_margin': ensemble.base_margin,
+                'n_features': ensemble.n_features,
+                'arrays': {
+                    array_name: write_array(getattr(ensemble, array_name), dtype)
+                    for array_name, dtype in ENSEMBLE_ARRAYS.items()
+                },
+            }
+        scaler_layout = {
+            'center': write_array(center, '<f8'),
+            'scale': write_array(scale, '<f8'),
+        }
+    os.replace(data_path + '.tmp', data_path)
+
+    data_sha256 = _sha256_file(data_path)
+    manifest = {
+        'format': FORMAT_NAME,
+        'format_version': FORMAT_VERSION,
+        'version': data_sha256[:12],
+        'feature_columns': scoring.FEATURE_COLUMNS,
+        'data_file': DATA_FILE,
+        'data_size': offset,
+        'data_sha256': data_sha256,
+        'scaler': scaler_layout,
+        'models': models,
+        'sources': {name: {'path': path, 'sha256': _sha256_file(path)} for name, path in sources.items()},
+    }
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(manifest_path + '.tmp', 'w') as handle:
+        json.dump(manifest, handle, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return manifest
+
+
+# Fungsi untuk memuat artefak native secara memory-map read-only (tanpa pickle, tanpa xgboost/sklearn)
+def load_artifacts(artifact_dir=DEFAULT_ARTIFACT_DIR, verify=True):
+    with open(os.path.join(artifact_dir, MANIFEST_FILE)) as handle:
+        manifest = json.load(handle)
+
+    if manifest.get('format') != FORMAT_NAME:
+        raise ValueError(f"Bukan artefak {FORMAT_NAME}: {artifact_dir}")
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Versi format artefak tidak didukung: {manifest.get('format_version')}")
+    if manifest['feature_columns'] != scoring.FEATURE_COLUMNS:
+        raise ValueError("Urutan kolom fitur pada artefak berbeda dengan aplikasi")
+
+    data_path = os.path.join(artifact_dir, manifest['data_file'])
+    if os.path.getsize(data_path) != manifest['data_size']:
+        raise ValueError(f"Ukuran {data_path} tidak sesuai manifest")
+
+    data = np.memmap(data_path, dtype=np.uint8, mode='r')
+    if verify and hashlib.sha256(data).hexdigest() != manifest['data_sha256']:
+        raise ValueError(f"Checksum {data_path} tidak sesuai manifest")
+
+    def view(layout):
+        dtype = np.dtype(layout['dtype'])
+        count = int(np.prod(layout['shape'], dtype=np.int64))
+        return np.frombuffer(data, dtype=dtype, count=count, offset=layout['offset']).reshape(layout['shape'])
+
+    models = {}
+    for name, spec in manifest['models'].items():
+        arrays = {array_name: view(layout) for array_name, layout in spec['arrays'].items()}
+        models[name] = tree_engine.CompiledTreeEnsemble(
+            arrays['feature'], arrays['threshold'], arrays['children'],
+            arrays['default_left'].view(np.bool_), arrays['value'], arrays['roots'],
+            spec['max_depth'], spec['base_margin'], spec['n_features'], spec['output']
+        )
+
+    return {
+        'version': manifest['version'],
+        'models': models,
+        'center': view(manifest['scaler']['center']),
+        'scale': view(manifest['scaler']['scale']),
+        'manifest': manifest,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ekspor model SafePay.AI ke format artefak native (memory-map)')
+    parser.add_argument('--output', default=DEFAULT_ARTIFACT_DIR, help='Direktori tujuan artefak')
+    parser.add_argument('--model', default='xgb_model.pkl', help='Path model XGBoost')
+    parser.add_argument('--scaler', default='scaler.pkl', help='Path scaler')
+    parser.add_argument('--rf', default='rf_model.pkl', help='Path model random forest (opsional)')
+    args = parser.parse_args()
+
+    manifest = export_artifacts(args.output, args.model, args.scaler, args.rf)
+    print(f"Artefak versi {manifest['version']} ditulis ke {args.output} "
+          f"({manifest['data_size']:,} byte, model: {', '.join(manifest['models'])})")
+
+
+if __name__ == '__main__':
+    main()
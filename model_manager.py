@@ -0,0 +1,305 @@
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+
+import metrics
+import scoring
+
+# Interval pengecekan file artefak (detik)
+DEFAULT_POLL_INTERVAL = 5.0
+
+# Jumlah baris batch pemanasan sebelum model baru diaktifkan
+WARMUP_ROWS = 256
+
+# Golden set: transaksi PaySim dengan keputusan yang jelas; model baru wajib memutuskan
+# semuanya dengan benar sebelum menggantikan model aktif
+GOLDEN_SET = [
+    ({'step': 1, 'type': 'TRANSFER', 'amount': 181.0, 'oldbalanceOrg': 181.0, 'newbalanceOrig': 0.0,
+      'oldbalanceDest': 0.0, 'newbalanceDest': 0.0}, 1),
+    ({'step': 1, 'type': 'CASH-OUT', 'amount': 181.0, 'oldbalanceOrg': 181.0, 'newbalanceOrig': 0.0,
+      'oldbalanceDest': 21182.0, 'newbalanceDest': 0.0}, 1),
+    ({'step': 1, 'type': 'TRANSFER', 'amount': 2806.0, 'oldbalanceOrg': 2806.0, 'newbalanceOrig': 0.0,
+      'oldbalanceDest': 0.0, 'newbalanceDest': 0.0}, 1),
+    ({'step': 743, 'type': 'CASH-OUT', 'amount': 850002.52, 'oldbalanceOrg': 850002.52, 'newbalanceOrig': 0.0,
+      'oldbalanceDest': 6510099.11, 'newbalanceDest': 7360101.63}, 1),
+    ({'step': 1, 'type': 'PAYMENT', 'amount': 9839.64, 'oldbalanceOrg': 170136.0, 'newbalanceOrig': 160296.36,
+      'oldbalanceDest': 0.0, 'newbalanceDest': 0.0}, 0),
+    ({'step': 1, 'type': 'PAYMENT', 'amount': 1864.28, 'oldbalanceOrg': 21249.0, 'newbalanceOrig': 19384.72,
+      'oldbalanceDest': 0.0, 'newbalanceDest': 0.0}, 0),
+    ({'step': 1, 'type': 'CASH-IN', 'amount': 143236.26, 'oldbalanceOrg': 0.0, 'newbalanceOrig': 0.0,
+      'oldbalanceDest': 608932.17, 'newbalanceDest': 97263.78}, 0),
+    ({'step': 1, 'type': 'DEBIT', 'amount': 5337.77, 'oldbalanceOrg': 41720.0, 'newbalanceOrig': 36382.23,
+      'oldbalanceDest': 41898.0, 'newbalanceDest': 40348.79}, 0),
+    ({'step': 13, 'type': 'PAYMENT', 'amount': 100000.0, 'oldbalanceOrg': 500000.0, 'newbalanceOrig': 400000.0,
+      'oldbalanceDest': 1000000.0, 'newbalanceDest': 1100000.0}, 0),
+    ({'step': 1, 'type': 'CASH-OUT', 'amount': 229133.94, 'oldbalanceOrg': 15325.0, 'newbalanceOrig': 0.0,
+      'oldbalanceDest': 5083.0, 'newbalanceDest': 51513.44}, 0),
+]
+
+
+# Fungsi untuk menghitung versi model dari isi file artefak
+def artifact_version(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as handle:
+            for block in iter(lambda: handle.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+# Fungsi untuk memastikan model kandidat layak diaktifkan
+def validate_candidate(model, scaler, engine=None, golden_set=GOLDEN_SET):
+    transactions = [transaction for transaction, _ in golden_set]
+
+    # Pemanasan: satu batch berukuran realistis agar alokasi internal model sudah siap
+    warmup = (transactions * (WARMUP_ROWS // len(transactions) + 1))[:WARMUP_ROWS]
+    if engine is not None:
+        engine.score(warmup)
+    else:
+        scoring.score_batch(model, scaler, warmup)
+
+    result = engine.score(transactions) if engine is not None else scoring.score_batch(model, scaler, transactions)
+    fraud_prob = result['fraud_prob']
+    if not ((fraud_prob >= 0) & (fraud_prob <= 1)).all():
+        raise ValueError("Probabilitas golden set di luar rentang [0, 1]")
+
+    wrong = [i for i, (_, expected) in enumerate(golden_set) if result['prediction'][i] != expected]
+    if wrong:
+        raise ValueError(f"Model baru salah memutuskan {len(wrong)} transaksi golden set (indeks {wrong})")
+
+
+# Pengelola model dengan hot reload: file artefak dipantau (mtime/ukuran lalu checksum),
+# versi baru dimuat dan divalidasi di background, lalu ditukar secara atomik.
+# Setiap prediksi memakai satu snapshot (model, scaler, versi) sehingga prediksi yang sedang
+# berjalan tidak terganggu oleh pergantian model.
+class ModelManager:
+    def __init__(self, model_path='xgb_model.pkl', scaler_path='scaler.pkl', poll_interval=DEFAULT_POLL_INTERVAL,
+                 compiled=False, golden_set=GOLDEN_SET, cascade=None, cache=None,
+                 rules=None, velocity=None, budget=None):
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.poll_interval = poll_interval
+        self.compiled = compiled
+        self.golden_set = golden_set
+        # Parameter CascadeScorer (first_stage_rounds, band); None berarti selalu model penuh
+        self.cascade = cascade
+        # PredictionCache opsional; dikosongkan setiap kali versi model berganti
+        self.cache = cache
+        # RuleEngine opsional; transaksi yang diputuskan aturan tidak sampai ke model
+        self.rules = rules
+        # VelocityTracker opsional; fitur velocity per akun ditambahkan ke hasil scoring
+        self.velocity = velocity
+        # Parameter BudgetedScorer (min_rounds); None berarti budget latensi per request diabaikan
+        self.budget = budget
+
+        self.reloads = 0
+        self.rejected = 0
+        self.last_error = None
+        self.on_swap = []
+        if cache is not None:
+            self.on_swap.append(cache.invalidate)
+        # Pencatat hasil scoring: callback(transactions, result, model_version) dipanggil setelah setiap
+        # batch (misalnya AuditLog.record, HistoryStore.record, DriftMonitor.record). Callback hanya
+        # boleh mengantrekan; encoding dan I/O dikerjakan thread masing-masing pencatat.
+        self.on_scored = []
+
+        self._active = None
+        self._file_state = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Fungsi untuk membuat manager statis (misalnya mock model) tanpa pemantauan file
+    @classmethod
+    def from_models(cls, model, scaler, version, **kwargs):
+        manager = cls(model_path=None, scaler_path=None, **kwargs)
+        manager._active = manager._snapshot(version, model, scaler, None)
+        return manager
+
+    # Fungsi untuk membuat manager statis dari evaluator pohon (misalnya artefak native)
+    @classmethod
+    def from_engine(cls, engine, version, **kwargs):
+        manager = cls(model_path=None, scaler_path=None, **kwargs)
+        manager._active = manager._snapshot(version, None, None, engine)
+        return manager
+
+    def _snapshot(self, version, model, scaler, engine):
+        cascade_scorer = None
+        if self.cascade is not None:
+            import cascade
+
+            # Evaluator pohon sudah melebur scaler, jadi tahap cascade memakai fitur mentah
+            if engine is not None:
+                cascade_scorer = cascade.CascadeScorer(engine, None, **self.cascade)
+            else:
+                cascade_scorer = cascade.CascadeScorer(model, scaler, **self.cascade)
+        budgeted_scorer = None
+        # Dengan evaluator terkompilasi budget diabaikan: model penuh di evaluator tersebut sudah
+        # lebih cepat daripada XGBoost dengan iteration_range terpotong
+        if self.budget is not None and engine is None and hasattr(model, 'get_booster'):
+            import latency_budget
+
+            # Biaya per round diukur sekali per versi model, sebelum versi tersebut diaktifkan
+            budgeted_scorer = latency_budget.BudgetedScorer(model, scaler, **self.budget)
+        return {'version': version, 'model': model, 'scaler': scaler, 'engine': engine,
+                'cascade': cascade_scorer, 'budget': budgeted_scorer, 'loaded_at': time.time()}
+
+    @property
+    def active(self):
+        return self._active
+
+    @property
+    def version(self):
+        return self._active['version'] if self._active is not None else None
+
+    # Fungsi untuk mendapatkan ContributionEngine versi model aktif (dibuat sekali per versi);
+    # None jika model aktif bukan XGBoost (misalnya mock model atau artefak native)
+    def explainer(self, snapshot=None):
+        snapshot = snapshot if snapshot is not None else self._active
+        if snapshot is None:
+            return None
+        if 'explainer' not in snapshot:
+            import explain
+
+            snapshot['explainer'] = explain.ContributionEngine.from_model(snapshot['model'], snapshot['scaler'])
+        return snapshot['explainer']
+
+    # Pemuatan awal dilakukan sinkron (error seperti FileNotFoundError diteruskan ke pemanggil)
+    def start(self, watch=True):
+        if self._active is None:
+            self.check_for_update(raise_errors=True)
+        if watch and self.model_path is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name='model-manager', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.check_for_update()
+
+    def _stat(self):
+        return tuple(
+            (os.stat(path).st_mtime_ns, os.stat(path).st_size) for path in (self.model_path, self.scaler_path)
+        )
+
+    # Fungsi untuk memuat versi baru jika file berubah; mengembalikan True jika model ditukar
+    def check_for_update(self, raise_errors=False):
+        with self._reload_lock:
+            file_state = None
+            try:
+                file_state = self._stat()
+                if file_state == self._file_state:
+                    return False
+
+                # mtime berubah belum tentu isi berubah (misalnya file disalin ulang)
+                version = artifact_version((self.model_path, self.scaler_path))
+                if self._active is not None and version == self._active['version']:
+                    self._file_state = file_state
+                    return False
+
+                model, scaler = scoring.load_model_and_scaler(self.model_path, self.scaler_path)
+                engine = None
+                if self.compiled:
+                    import tree_engine
+
+                    engine = tree_engine.compile_xgboost(model, scaler)
+                validate_candidate(model, scaler, engine, self.golden_set)
+
+                # File bisa saja ditimpa lagi selama pemuatan; versi dicek ulang sebelum ditukar
+                if artifact_version((self.model_path, self.scaler_path)) != version:
+                    return False
+            except Exception as e:
+                self.last_error = str(e)
+                if self._active is not None:
+                    self.rejected += 1
+                # Versi yang ditolak tidak dimuat ulang sampai filenya berubah lagi
+                if file_state is not None:
+                    self._file_state = file_state
+                if raise_errors:
+                    raise
+                return False
+
+            # Penukaran atomik: satu assignment referensi snapshot
+            self._active = self._snapshot(version, model, scaler, engine)
+            self._file_state = file_state
+            self.reloads += 1
+            self.last_error = None
+
+        for callback in self.on_swap:
+            callback(version)
+        return True
+
+    # Fungsi untuk scoring dengan model aktif; hasil selalu menyertakan versi model.
+    # budget_ms (opsional) adalah sisa waktu untuk inferensi; jika budget aktif, model dipotong
+    # ke jumlah boosting round yang diperkirakan selesai dalam waktu tersebut.
+    # snapshot (opsional) mengunci versi model, misalnya satu versi untuk seluruh file bulk;
+    # cached=False melewati cache prediksi agar file besar tidak mengusir entri interaktif.
+    def score(self, transactions, threshold=scoring.DEFAULT_THRESHOLD, budget_ms=None, snapshot=None,
+              cached=True):
+        start = time.perf_counter()
+        snapshot = self._active if snapshot is None else snapshot
+
+        def score_model(transactions, threshold):
+            if cached and self.cache is not None:
+                return self._score_cached(snapshot, transactions, threshold, budget_ms)
+            return self._score_snapshot(snapshot, transactions, threshold, budget_ms)
+
+        # Fitur velocity dibaca dari riwayat sebelum batch, tetapi batch baru dicatat ke riwayat
+        # setelah semua transaksinya diputuskan. Batch yang ditolak (lalu diulang per transaksi
+        # oleh MicroBatcher/StreamConsumer) tidak ikut terhitung.
+        velocity_features = self.velocity.features(transactions) if self.velocity is not None else None
+        if self.rules is not None:
+            result = self.rules.score(score_model, transactions, threshold=threshold)
+        else:
+            result = score_model(transactions, threshold)
+        if self.velocity is not None:
+            self.velocity.observe(transactions)
+        if velocity_features is not None:
+            result.update(velocity_features)
+        result['model_version'] = snapshot['version']
+        for callback in self.on_scored:
+            callback(transactions, result, snapshot['version'])
+
+        metrics.REGISTRY.observe('score', time.perf_counter() - start)
+        metrics.REGISTRY.inc('scoring_calls')
+        metrics.REGISTRY.inc('transactions', len(result['fraud_prob']))
+        return result
+
+    @staticmethod
+    def _score_snapshot(snapshot, transactions, threshold, budget_ms=None):
+        if budget_ms is not None and snapshot['budget'] is not None:
+            with metrics.REGISTRY.timer('predict_proba'):
+                return snapshot['budget'].score(transactions, threshold=threshold, budget_ms=budget_ms)
+        if snapshot['cascade'] is not None:
+            return snapshot['cascade'].score(transactions, threshold=threshold)
+        if snapshot['engine'] is not None:
+            # Evaluator pohon melakukan encoding dan inferensi sekaligus (tanpa tahap scale)
+            with metrics.REGISTRY.timer('predict_proba'):
+                return snapshot['engine'].score(transactions, threshold=threshold)
+        return scoring.score_batch(snapshot['model'], snapshot['scaler'], transactions, threshold=threshold)
+
+    # Hanya vektor fitur yang belum ada di cache yang di-score, dalam satu batch
+    def _score_cached(self, snapshot, transactions, threshold, budget_ms=None):
+        X = scoring.encode_transactions(transactions)
+        fraud_prob, missing = self.cache.lookup(snapshot['version'], X)
+        if len(missing):
+            X_missing = X[missing]
+            result = self._score_snapshot(snapshot, X_missing, threshold, budget_ms)
+            fraud_prob[missing] = result['fraud_prob']
+            # Skor dari model terpotong tidak disimpan agar cache hanya berisi skor model penuh
+            if 'rounds' not in result or result['rounds'][0] >= snapshot['budget'].n_rounds:
+                self.cache.store(snapshot['version'], X_missing, fraud_prob[missing])
+        return {
+            'fraud_prob': fraud_prob,
+            'safe_prob': 1.0 - fraud_prob,
+            'prediction': (fraud_prob > threshold).astype(np.int64),
+        }
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Jumlah entri maksimum (satu entri = satu vektor fitur, sekitar 200 byte termasuk overhead)
+DEFAULT_MAX_ENTRIES = 100_000
+
+# Umur entri (detik) sebelum dianggap kedaluwarsa
+DEFAULT_TTL = 300.0
+
+
+# Cache prediksi LRU + TTL dengan kunci (versi model, vektor fitur hasil encoding).
+# Yang disimpan hanya probabilitas fraud; label dihitung ulang dari threshold pemanggil.
+class PredictionCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Kunci per baris: byte mentah vektor float64, lebih murah daripada tuple dan tetap eksak
+    @staticmethod
+    def _keys(version, X):
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        return [(version, row.tobytes()) for row in X]
+
+    # Fungsi untuk mencari probabilitas per baris; mengembalikan (fraud_prob, indeks baris yang miss).
+    # Baris yang miss berisi NaN dan harus diisi pemanggil lewat store().
+    def lookup(self, version, X):
+        keys = self._keys(version, X)
+        fraud_prob = np.full(len(keys), np.nan)
+        missing = []
+        now = time.monotonic()
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] < now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    missing.append(i)
+                    continue
+                self._entries.move_to_end(key)
+                fraud_prob[i] = entry[1]
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        return fraud_prob, np.array(missing, dtype=np.int64)
+
+    def store(self, version, X, fraud_prob):
+        keys = self._keys(version, X)
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, prob in zip(keys, np.asarray(fraud_prob, dtype=np.float64).tolist()):
+                self._entries[key] = (expires_at, prob)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # Dipanggil saat model ditukar; entri versi lama tidak akan pernah cocok lagi
+    def invalidate(self, version=None):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
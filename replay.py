@@ -0,0 +1,322 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+# Log transaksi rekaman: satu JSON per baris, {"ts": detik sejak awal rekaman, "transaction": {...}}.
+# (requests.jsonl di root repo dipakai sebagai backlog, jadi nama default log dibedakan)
+DEFAULT_LOG = 'traffic.jsonl'
+
+DEFAULT_URL = 'http://127.0.0.1:8000/score'
+
+# Jumlah request yang boleh berjalan bersamaan; kelebihannya dicatat sebagai 'overload'
+# (tidak ditunda, agar beban tetap open-loop)
+DEFAULT_MAX_IN_FLIGHT = 1000
+
+DEFAULT_TIMEOUT = 10.0
+
+# 1 step PaySim = 1 jam
+STEP_SECONDS = 3600.0
+
+MODES = ('original', 'rate', 'poisson')
+
+
+# Fungsi untuk membaca transaksi per chunk dari file PaySim, atau dari generator sintetis jika source None
+def _iter_source(source, limit, seed):
+    if source is None:
+        import paysim_generator
+
+        return paysim_generator.iter_transactions(limit, seed=seed)
+
+    import bulk_scoring
+
+    return (chunk for chunk, _ in bulk_scoring.iter_chunks(source, bulk_scoring.detect_format(source)))
+
+
+# Fungsi untuk membuat log rekaman; timestamp disebar merata dalam step asal setiap transaksi
+def record(source, destination=DEFAULT_LOG, limit=None, seed=0):
+    if source is None and limit is None:
+        raise ValueError("Jumlah transaksi (--limit) wajib jika log dibuat dari generator sintetis")
+
+    rng = np.random.default_rng(seed)
+    written = 0
+    with open(destination, 'w') as handle:
+        for chunk in _iter_source(source, limit, seed):
+            if limit is not None:
+                chunk = chunk.head(limit - written)
+            offsets = (chunk['step'].to_numpy() - 1) * STEP_SECONDS + rng.random(len(chunk)) * STEP_SECONDS
+            order = np.argsort(offsets, kind='stable')
+            columns = [column for column in chunk.columns if column not in ('isFraud', 'isFlaggedFraud')]
+            records = chunk[columns].iloc[order].to_dict('records')
+            for offset, transaction in zip(offsets[order].tolist(), records):
+                handle.write(json.dumps({'ts': round(offset, 6), 'transaction': transaction}) + '\n')
+            written += len(chunk)
+            if limit is not None and written >= limit:
+                break
+    return written
+
+
+def load_log(path):
+    timestamps, transactions = [], []
+    with open(path) as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            timestamps.append(float(entry['ts']))
+            transactions.append(entry['transaction'])
+    if not transactions:
+        raise ValueError(f"Log {path} kosong; buat dengan: python replay.py record FILE_PAYSIM")
+    return np.asarray(timestamps), transactions
+
+
+# Fungsi untuk menyusun jadwal kirim (detik sejak mulai) untuk setiap request
+def schedule(timestamps, mode, rate=None, speed=1.0, duration=None, seed=0):
+    if mode == 'original':
+        offsets = (timestamps - timestamps[0]) / speed
+    else:
+        if not rate:
+            raise ValueError("Mode rate/poisson membutuhkan --rate")
+        count = len(timestamps) if duration is None else int(np.ceil(rate * duration))
+        if mode == 'rate':
+            offsets = np.arange(count) / rate
+        else:
+            # Kedatangan Poisson: jarak antar kedatangan berdistribusi eksponensial
+            offsets = np.cumsum(np.random.default_rng(seed).exponential(1.0 / rate, count))
+    if duration is not None:
+        offsets = offsets[offsets < duration]
+    return offsets
+
+
+# Klien HTTP/1.1 minimal dengan koneksi keep-alive (tanpa dependensi tambahan)
+class _HttpTarget:
+    def __init__(self, url, timeout=DEFAULT_TIMEOUT):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.path = parts.path or '/'
+        self.timeout = timeout
+        self._idle = []
+
+    async def send(self, transaction):
+        body = json.dumps(transaction).encode()
+        connection = self._idle.pop() if self._idle else await asyncio.open_connection(self.host, self.port)
+        reader, writer = connection
+        try:
+            writer.write(
+                f"POST {self.path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+            )
+            status, response = await asyncio.wait_for(self._read_response(reader), self.timeout)
+        except BaseException:
+            writer.close()
+            raise
+        self._idle.append(connection)
+        return status
+
+    @staticmethod
+    async def _read_response(reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Koneksi ditutup server")
+        status = int(status_line.split()[1])
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value.strip())
+        return status, await reader.readexactly(length)
+
+    async def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+# Target in-process: transaksi langsung ke ModelManager lewat MicroBatcher (tanpa jaringan)
+class _InProcessTarget:
+    def __init__(self, manager, batcher):
+        self.manager = manager
+        self.batcher = batcher
+
+    @classmethod
+    async def create(cls, model_path, scaler_path):
+        import batching
+        import model_manager
+
+        loop = asyncio.get_running_loop()
+        manager = model_manager.ModelManager(model_path, scaler_path)
+        await loop.run_in_executor(None, lambda: manager.start(watch=False))
+        batcher = batching.MicroBatcher(manager.score)
+        await batcher.start()
+        return cls(manager, batcher)
+
+    async def send(self, transaction):
+        await self.batcher.submit(transaction)
+        return 200
+
+    async def close(self):
+        await self.batcher.stop()
+
+
+# Menjalankan beban open-loop: setiap request dikirim pada jadwalnya tanpa menunggu respons
+# sebelumnya. Latensi diukur dari waktu kirim terjadwal (bukan waktu kirim aktual), sehingga
+# antrean di sisi klien maupun server ikut terhitung (aman terhadap coordinated omission).
+async def run_load(target, transactions, offsets, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+    latencies = np.full(len(offsets), np.nan)
+    service_times = np.full(len(offsets), np.nan)
+    errors = {}
+    in_flight = 0
+    tasks = set()
+
+    async def fire(index, intended):
+        nonlocal in_flight
+        sent = time.perf_counter()
+        try:
+            status = await target.send(transactions[index % len(transactions)])
+            if status != 200:
+                raise RuntimeError(f"HTTP {status}")
+            done = time.perf_counter()
+            latencies[index] = done - intended
+            service_times[index] = done - sent
+        except Exception as e:
+            kind = type(e).__name__ if not isinstance(e, RuntimeError) else str(e)
+            errors[kind] = errors.get(kind, 0) + 1
+        finally:
+            in_flight -= 1
+
+    start = time.perf_counter()
+    for index, offset in enumerate(offsets.tolist()):
+        intended = start + offset
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if in_flight >= max_in_flight:
+            errors['overload'] = errors.get('overload', 0) + 1
+            continue
+        in_flight += 1
+        task = asyncio.create_task(fire(index, intended))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    send_duration = time.perf_counter() - start
+    if tasks:
+        await asyncio.gather(*tasks)
+    total_duration = time.perf_counter() - start
+
+    return summarize(latencies, service_times, errors, len(offsets), offsets, send_duration, total_duration)
+
+
+def _percentiles(values):
+    values = values[~np.isnan(values)] * 1000
+    if len(values) == 0:
+        return None
+    return {
+        'p50_ms': float(np.percentile(values, 50)),
+        'p90_ms': float(np.percentile(values, 90)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'p999_ms': float(np.percentile(values, 99.9)),
+        'max_ms': float(values.max()),
+    }
+
+
+def summarize(latencies, service_times, errors, scheduled, offsets, send_duration, total_duration):
+    completed = int(np.count_nonzero(~np.isnan(latencies)))
+    failed = sum(errors.values())
+    target_rate = scheduled / offsets[-1] if len(offsets) > 1 and offsets[-1] > 0 else None
+    return {
+        'scheduled': scheduled,
+        'completed': completed,
+        'errors': errors,
+        'error_rate': failed / scheduled if scheduled else 0.0,
+        'target_rate': target_rate,
+        'achieved_throughput': completed / total_duration if total_duration else 0.0,
+        'send_duration_s': send_duration,
+        'total_duration_s': total_duration,
+        'latency': _percentiles(latencies),
+        'service_time': _percentiles(service_times),
+    }
+
+
+async def _replay(args):
+    timestamps, transactions = load_log(args.log)
+    if args.in_process:
+        target = await _InProcessTarget.create(args.model, args.scaler)
+    else:
+        target = _HttpTarget(args.url, args.timeout)
+
+    reports = []
+    try:
+        # Beberapa --rate dijalankan bertahap untuk mencari titik saturasi
+        for rate in (args.rate or [None]):
+            offsets = schedule(timestamps, args.mode, rate, args.speed, args.duration, args.seed)
+            report = await run_load(target, transactions, offsets, args.max_in_flight)
+            report['mode'] = args.mode
+            reports.append(report)
+            _print_report(report, file=sys.stderr)
+    finally:
+        await target.close()
+    return reports
+
+
+def _print_report(report, file):
+    latency = report['latency'] or {}
+    target = f"{report['target_rate']:.1f}/s" if report['target_rate'] else '-'
+    print(f"target {target:>10}  tercapai {report['achieved_throughput']:8.1f}/s  "
+          f"selesai {report['completed']:>8,}/{report['scheduled']:<8,}  error {report['error_rate']:6.2%}  "
+          f"p50 {latency.get('p50_ms', float('nan')):8.2f} ms  p99 {latency.get('p99_ms', float('nan')):8.2f} ms  "
+          f"p99.9 {latency.get('p999_ms', float('nan')):8.2f} ms", file=file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay trafik transaksi open-loop ke jalur scoring')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = commands.add_parser('record', help='Buat log rekaman dari file PaySim (CSV/Parquet)')
+    record_parser.add_argument('source', nargs='?', default=None,
+                               help='File PaySim; tanpa file, transaksi dibuat oleh paysim_generator')
+    record_parser.add_argument('--output', default=DEFAULT_LOG)
+    record_parser.add_argument('--limit', type=int, default=None, help='Jumlah transaksi maksimum')
+    record_parser.add_argument('--seed', type=int, default=0)
+
+    run_parser = commands.add_parser('run', help='Kirim log rekaman ke server atau scoring in-process')
+    run_parser.add_argument('--log', default=DEFAULT_LOG)
+    run_parser.add_argument('--mode', choices=MODES, default='original',
+                            help='original: timestamp rekaman; rate: interval tetap; poisson: kedatangan acak')
+    run_parser.add_argument('--speed', type=float, default=1.0, help='Percepatan timestamp rekaman (mode original)')
+    run_parser.add_argument('--rate', type=float, nargs='+', default=None,
+                            help='Request per detik (mode rate/poisson); beberapa nilai dijalankan bertahap')
+    run_parser.add_argument('--duration', type=float, default=None, help='Batas durasi per tahap (detik)')
+    run_parser.add_argument('--url', default=DEFAULT_URL)
+    run_parser.add_argument('--in-process', action='store_true',
+                            help='Scoring langsung di proses ini lewat ModelManager dan MicroBatcher')
+    run_parser.add_argument('--model', default='xgb_model.pkl')
+    run_parser.add_argument('--scaler', default='scaler.pkl')
+    run_parser.add_argument('--max-in-flight', type=int, default=DEFAULT_MAX_IN_FLIGHT)
+    run_parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT)
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--output', default=None, help='File JSON untuk laporan')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        count = record(args.source, args.output, args.limit, args.seed)
+        print(f"{count:,} transaksi ditulis ke {args.output}")
+        return
+
+    if args.mode != 'original' and not args.rate:
+        parser.error("--rate wajib untuk mode rate dan poisson")
+    reports = asyncio.run(_replay(args))
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(reports, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,473 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+import bulk_scoring
+import metrics
+import model_manager
+import scoring
+
+# Target jumlah baris per shard; shard adalah unit kerja sekaligus unit checkpoint
+DEFAULT_SHARD_ROWS = 1_000_000
+
+# Jumlah baris per record batch di dalam satu shard
+DEFAULT_BATCH_SIZE = 250_000
+
+# Ukuran sampel awal CSV untuk membaca header dan menghitung rata-rata byte per baris
+CSV_SAMPLE_BYTES = 4 << 20
+
+MANIFEST_NAME = 'manifest.json'
+
+# Model dan scaler milik proses worker, dimuat sekali oleh _init_worker
+_MODEL = None
+_SCALER = None
+
+
+# Fungsi untuk daftar file input: satu file, atau semua file CSV/Parquet di dalam direktori
+# (rekursif, misalnya partisi date=... dari history_store) dengan urutan yang stabil
+def list_inputs(source):
+    if os.path.isdir(source):
+        paths = []
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                try:
+                    bulk_scoring.detect_format(name)
+                except ValueError:
+                    continue
+                paths.append(os.path.join(root, name))
+    else:
+        paths = [source]
+    if not paths:
+        raise ValueError(f"Tidak ada file CSV/Parquet di {source}")
+
+    formats = {bulk_scoring.detect_format(path) for path in paths}
+    if len(formats) > 1:
+        raise ValueError("File input harus berformat sama (semua CSV atau semua Parquet)")
+    return paths, formats.pop()
+
+
+# Fungsi untuk sidik file input: checkpoint hanya berlaku selama file input tidak berubah
+def fingerprint(paths):
+    return [[path, os.stat(path).st_size, os.stat(path).st_mtime_ns] for path in paths]
+
+
+# Shard Parquet: row group berurutan dari satu file digabung sampai mencapai shard_rows
+def _parquet_shards(paths, shard_rows):
+    import pyarrow.parquet as pq
+
+    shards = []
+    for path in paths:
+        parquet_file = pq.ParquetFile(path)
+        bulk_scoring.check_columns(parquet_file.schema_arrow.names)
+        metadata = parquet_file.metadata
+        groups, rows = [], 0
+        for index in range(metadata.num_row_groups):
+            groups.append(index)
+            rows += metadata.row_group(index).num_rows
+            if rows >= shard_rows:
+                shards.append({'path': path, 'row_groups': groups, 'rows': rows})
+                groups, rows = [], 0
+        if groups:
+            shards.append({'path': path, 'row_groups': groups, 'rows': rows})
+    return shards
+
+
+# Fungsi untuk membaca awal file CSV: baris header, byte per baris, dan tipe kolom. Tipe tidak
+# ditebak dari sampel (nilai desimal bisa baru muncul di akhir file): fitur numerik selalu
+# float64, type sebagai dictionary, kolom lain string, sehingga skema setiap part sama.
+def _csv_sample(path):
+    import pyarrow.csv as pacsv
+
+    with open(path, 'rb') as handle:
+        header = handle.readline()
+        sample = handle.read(CSV_SAMPLE_BYTES)
+    # Baris terakhir sampel bisa terpotong
+    sample = sample[:sample.rfind(b'\n') + 1]
+    if not sample:
+        raise ValueError(f"File CSV kosong: {path}")
+    table = pacsv.read_csv(_buffer(header + sample), read_options=_read_options())
+    bulk_scoring.check_columns(table.schema.names)
+
+    column_types = {}
+    for name in table.schema.names:
+        if name == 'type':
+            column_types[name] = 'dictionary'
+        elif name in scoring.FEATURE_COLUMNS:
+            column_types[name] = 'double'
+        else:
+            column_types[name] = 'string'
+    return header, len(sample) / table.num_rows, column_types
+
+
+# CSV dibaca satu thread: paralelisme datang dari proses worker. Thread pool CSV pyarrow yang dipakai
+# berulang kali dalam satu proses juga bisa membuat proses abort saat keluar (pyarrow 17).
+def _read_options():
+    import pyarrow.csv as pacsv
+
+    return pacsv.ReadOptions(use_threads=False)
+
+
+def _buffer(data):
+    import pyarrow as pa
+
+    return pa.BufferReader(data)
+
+
+# Shard CSV: rentang byte berukuran kira-kira shard_rows baris, digeser ke batas baris berikutnya.
+# CSV PaySim tidak memiliki newline di dalam nilai bertanda kutip.
+def _csv_shards(paths, shard_rows):
+    shards, column_types = [], None
+    for path in paths:
+        header, row_bytes, types = _csv_sample(path)
+        if column_types is None:
+            column_types = types
+        elif set(types) != set(column_types):
+            raise ValueError(f"Kolom {path} berbeda dari file input pertama")
+
+        size = os.path.getsize(path)
+        target = max(int(row_bytes * shard_rows), 1)
+        with open(path, 'rb') as handle:
+            start = len(header)
+            while start < size:
+                handle.seek(min(start + target, size))
+                if handle.tell() < size:
+                    handle.readline()
+                end = handle.tell()
+                shards.append({'path': path, 'offset': start, 'length': end - start,
+                               'rows': int(round((end - start) / row_bytes))})
+                start = end
+    return shards, column_types
+
+
+# Fungsi untuk membagi input menjadi shard; urutan shard menentukan urutan baris keluaran
+def plan_shards(paths, file_format, shard_rows=DEFAULT_SHARD_ROWS):
+    if shard_rows < 1:
+        raise ValueError("Jumlah baris per shard minimal 1")
+    if file_format == 'parquet':
+        shards, column_types = _parquet_shards(paths, shard_rows), None
+    else:
+        shards, column_types = _csv_shards(paths, shard_rows)
+    for index, shard in enumerate(shards):
+        shard['index'] = index
+        shard['part'] = f'part-{index:05d}.parquet'
+    return shards, column_types
+
+
+def _arrow_type(name):
+    import pyarrow as pa
+
+    if name == 'dictionary':
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.type_for_alias(name)
+
+
+# Fungsi untuk membaca record batch satu shard
+def _iter_shard(shard, file_format, column_types, batch_size):
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(shard['path'], read_dictionary=['type'])
+        yield from parquet_file.iter_batches(batch_size=batch_size, row_groups=shard['row_groups'])
+        return
+
+    import pyarrow.csv as pacsv
+
+    with open(shard['path'], 'rb') as handle:
+        header = handle.readline()
+        handle.seek(shard['offset'])
+        data = handle.read(shard['length'])
+    convert_options = pacsv.ConvertOptions(
+        column_types={name: _arrow_type(alias) for name, alias in column_types.items()}
+    )
+    table = pacsv.read_csv(_buffer(header + data), read_options=_read_options(), convert_options=convert_options)
+    yield from table.to_batches(max_chunksize=batch_size)
+
+
+# Inisialisasi proses worker: model dimuat sendiri dengan nthread=1, paralelisme dari jumlah proses
+def _init_worker(model_path, scaler_path):
+    global _MODEL, _SCALER
+    import worker_pool
+
+    metrics.REGISTRY = metrics.MetricsRegistry()
+    model, _SCALER = scoring.load_model_and_scaler(model_path, scaler_path)
+    _MODEL = worker_pool.pin_model_threads(model)
+
+
+# Fungsi untuk scoring satu shard di proses worker. File part ditulis dengan nama sementara lalu
+# di-rename, sehingga part yang ada selalu lengkap walaupun worker mati di tengah jalan.
+def _score_shard(shard, file_format, column_types, work_dir, threshold, model_version, batch_size):
+    import pyarrow.parquet as pq
+
+    import arrow_ingest
+
+    start = time.perf_counter()
+    destination = os.path.join(work_dir, shard['part'])
+    # Nama sementara per proses: worker run yang terhenti bisa masih menulis shard yang sama
+    # ketika run lanjutan mengerjakannya lagi
+    temporary = f"{destination}.{os.getpid()}.tmp"
+    summary = {'index': shard['index'], 'rows': 0, 'fraud': 0}
+    writer = None
+    try:
+        for batch in _iter_shard(shard, file_format, column_types, batch_size):
+            result = arrow_ingest.score_batch(_MODEL, _SCALER, batch, threshold=threshold)
+            batch = bulk_scoring.append_result_columns(batch, result, model_version)
+            if writer is None:
+                writer = pq.ParquetWriter(temporary, batch.schema, store_schema=False)
+            writer.write_batch(batch)
+            summary['rows'] += batch.num_rows
+            summary['fraud'] += int(np.count_nonzero(result['prediction']))
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        # Shard tanpa baris tetap ditandai selesai; part kosong dilewati saat penggabungan
+        summary['empty'] = True
+    else:
+        os.replace(temporary, destination)
+    summary['seconds'] = time.perf_counter() - start
+    return summary
+
+
+def _write_json(path, data):
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as handle:
+        json.dump(data, handle, indent=1)
+    os.replace(temporary, path)
+
+
+def _read_json(path):
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def _done_path(work_dir, shard):
+    return os.path.join(work_dir, shard['part'] + '.done')
+
+
+# Rescoring offline dataset historis besar: input dibagi menjadi shard, shard di-score paralel oleh
+# pool proses, dan setiap shard yang selesai dicatat sebagai checkpoint di direktori kerja.
+# Run yang berhenti (crash, Ctrl+C) dilanjutkan dengan menjalankan perintah yang sama lagi;
+# hanya shard yang belum selesai yang dikerjakan. Keluaran digabung sesuai urutan shard sehingga
+# isi file hasil sama persis berapa pun jumlah worker dan berapa kali run dilanjutkan.
+class Rescorer:
+    def __init__(self, source, destination, work_dir=None, model_path='xgb_model.pkl', scaler_path='scaler.pkl',
+                 workers=None, shard_rows=DEFAULT_SHARD_ROWS, batch_size=DEFAULT_BATCH_SIZE,
+                 threshold=scoring.DEFAULT_THRESHOLD, log=None):
+        import worker_pool
+
+        self.output_format = bulk_scoring.detect_format(destination)
+        self.source = source
+        self.destination = destination
+        self.work_dir = work_dir or destination + '.shards'
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.workers = workers or len(worker_pool.available_cpus())
+        if self.workers < 1:
+            raise ValueError("Jumlah worker minimal 1")
+        self.shard_rows = shard_rows
+        self.batch_size = batch_size
+        self.threshold = threshold
+        self.log = log or (lambda message: print(message, file=sys.stderr))
+        self.manifest = None
+
+    # Fungsi untuk membuat rencana shard baru, atau memuat rencana run sebelumnya untuk dilanjutkan
+    def prepare(self, restart=False):
+        paths, file_format = list_inputs(self.source)
+        config = {
+            'inputs': fingerprint(paths),
+            'format': file_format,
+            'model_version': model_manager.artifact_version((self.model_path, self.scaler_path)),
+            'threshold': self.threshold,
+            'shard_rows': self.shard_rows,
+        }
+        manifest_path = os.path.join(self.work_dir, MANIFEST_NAME)
+
+        if os.path.exists(manifest_path) and not restart:
+            manifest = _read_json(manifest_path)
+            if manifest['config'] != config:
+                changed = [key for key in config if manifest['config'].get(key) != config[key]]
+                raise ValueError(
+                    f"Checkpoint di {self.work_dir} dibuat dengan {', '.join(changed)} yang berbeda; "
+                    "gunakan --restart untuk memulai ulang"
+                )
+            self.manifest = manifest
+            return self
+
+        if os.path.exists(self.work_dir):
+            shutil.rmtree(self.work_dir)
+        os.makedirs(self.work_dir)
+        shards, column_types = plan_shards(paths, file_format, self.shard_rows)
+        self.manifest = {'config': config, 'column_types': column_types, 'shards': shards}
+        _write_json(manifest_path, self.manifest)
+        return self
+
+    # Fungsi untuk status checkpoint setiap shard (ringkasan shard yang sudah selesai, atau None)
+    def completed(self):
+        done = {}
+        for shard in self.manifest['shards']:
+            path = _done_path(self.work_dir, shard)
+            if os.path.exists(path):
+                done[shard['index']] = _read_json(path)
+        return done
+
+    # Fungsi untuk scoring semua shard yang belum selesai dengan pool proses
+    def run(self):
+        import multiprocessing
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+        config = self.manifest['config']
+        shards = self.manifest['shards']
+        done = self.completed()
+        pending = [shard for shard in shards if shard['index'] not in done]
+        if done:
+            self.log(f"Melanjutkan run: {len(done)}/{len(shards)} shard sudah selesai")
+        if not pending:
+            return done
+
+        executor = ProcessPoolExecutor(
+            max_workers=min(self.workers, len(pending)), mp_context=multiprocessing.get_context('fork'),
+            initializer=_init_worker, initargs=(self.model_path, self.scaler_path),
+        )
+        try:
+            # Jumlah shard yang mengantre dibatasi agar manifest besar tidak dikirim sekaligus
+            queued = iter(pending)
+            running = set()
+            while True:
+                for shard in queued:
+                    running.add(executor.submit(
+                        _score_shard, shard, config['format'], self.manifest['column_types'], self.work_dir,
+                        self.threshold, config['model_version'], self.batch_size,
+                    ))
+                    if len(running) >= 2 * self.workers:
+                        break
+                if not running:
+                    break
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    summary = future.result()
+                    shard = shards[summary['index']]
+                    # Checkpoint ditulis setelah file part lengkap berada di tempatnya
+                    _write_json(_done_path(self.work_dir, shard), summary)
+                    done[shard['index']] = summary
+                    self.log(f"[{len(done)}/{len(shards)}] {shard['part']}: {summary['rows']:,} baris, "
+                             f"{summary['fraud']:,} fraud, {summary['seconds']:.1f} detik")
+        except BaseException:
+            # Shard yang sudah selesai tetap tercatat; run berikutnya melanjutkan dari sini
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+        return done
+
+    # Fungsi untuk menggabungkan semua part sesuai urutan shard menjadi satu file keluaran
+    def merge(self):
+        import pyarrow.parquet as pq
+
+        done = self.completed()
+        missing = [shard['part'] for shard in self.manifest['shards'] if shard['index'] not in done]
+        if missing:
+            raise ValueError(f"{len(missing)} shard belum selesai, mis. {missing[0]}")
+
+        temporary = self.destination + '.tmp'
+        writer, schema = None, None
+        try:
+            for shard in self.manifest['shards']:
+                if done[shard['index']].get('empty'):
+                    continue
+                part = pq.ParquetFile(os.path.join(self.work_dir, shard['part']))
+                if schema is None:
+                    schema = part.schema_arrow
+                    writer = self._open_writer(temporary, schema)
+                elif not part.schema_arrow.equals(schema):
+                    raise ValueError(f"Skema {shard['part']} berbeda dari part pertama; "
+                                     "file input harus memiliki kolom dan tipe yang sama")
+                for batch in part.iter_batches(batch_size=self.batch_size):
+                    writer.write_batch(batch)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            raise ValueError("Input tidak berisi transaksi")
+        os.replace(temporary, self.destination)
+
+    def _open_writer(self, path, schema):
+        if self.output_format == 'parquet':
+            import pyarrow.parquet as pq
+
+            return pq.ParquetWriter(path, schema)
+        import pyarrow.csv as pacsv
+
+        return pacsv.CSVWriter(path, schema)
+
+    # Fungsi untuk menjalankan seluruh proses: rencana/lanjutan, scoring, penggabungan, pembersihan
+    def rescore(self, restart=False, keep_shards=False):
+        start = time.perf_counter()
+        self.prepare(restart)
+        resumed = len(self.completed())
+        done = self.run()
+        self.merge()
+        if not keep_shards:
+            shutil.rmtree(self.work_dir)
+
+        seconds = time.perf_counter() - start
+        rows = sum(summary['rows'] for summary in done.values())
+        return {
+            'rows': rows,
+            'fraud': sum(summary['fraud'] for summary in done.values()),
+            'shards': len(self.manifest['shards']),
+            'resumed_shards': resumed,
+            'workers': self.workers,
+            'seconds': seconds,
+            'rows_per_second': rows / seconds if seconds else None,
+            'model_version': self.manifest['config']['model_version'],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Rescoring offline dataset historis berukuran besar: input dibagi menjadi shard, '
+                    'di-score paralel, dengan checkpoint sehingga run yang berhenti bisa dilanjutkan'
+    )
+    parser.add_argument('source', help='File CSV/Parquet, atau direktori berisi file CSV/Parquet')
+    parser.add_argument('destination', help='File hasil (.csv atau .parquet)')
+    parser.add_argument('--work-dir', default=None,
+                        help='Direktori part dan checkpoint (default: <destination>.shards)')
+    parser.add_argument('--workers', type=int, default=None, help='Jumlah proses worker (default: jumlah core)')
+    parser.add_argument('--shard-rows', type=int, default=DEFAULT_SHARD_ROWS, help='Target jumlah baris per shard')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help='Jumlah baris per record batch di dalam shard')
+    parser.add_argument('--model', default='xgb_model.pkl', help='Path model XGBoost')
+    parser.add_argument('--scaler', default='scaler.pkl', help='Path scaler')
+    parser.add_argument('--threshold', type=float, default=scoring.DEFAULT_THRESHOLD)
+    parser.add_argument('--restart', action='store_true',
+                        help='Abaikan checkpoint yang ada dan mulai dari awal')
+    parser.add_argument('--keep-shards', action='store_true',
+                        help='Jangan hapus direktori part setelah penggabungan selesai')
+    args = parser.parse_args()
+
+    rescorer = Rescorer(args.source, args.destination, work_dir=args.work_dir, model_path=args.model,
+                        scaler_path=args.scaler, workers=args.workers, shard_rows=args.shard_rows,
+                        batch_size=args.batch_size, threshold=args.threshold)
+    try:
+        summary = rescorer.rescore(restart=args.restart, keep_shards=args.keep_shards)
+    except KeyboardInterrupt:
+        print(f"Dihentikan; jalankan perintah yang sama untuk melanjutkan dari checkpoint di {rescorer.work_dir}",
+              file=sys.stderr)
+        sys.exit(130)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    print(f"{summary['rows']:,} transaksi di-score ({summary['fraud']:,} terdeteksi fraud) dalam "
+          f"{summary['shards']} shard, {summary['resumed_shards']} dari checkpoint sebelumnya")
+    print(f"{summary['seconds']:.1f} detik, {summary['rows_per_second']:,.0f} baris/detik dengan "
+          f"{summary['workers']} worker; model {summary['model_version']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+import threading
+
+import numpy as np
+
+import scoring
+
+# Aksi aturan:
+#   flag  -> hanya faktor risiko (ditampilkan), model tetap dijalankan
+#   safe  -> diputuskan aman tanpa model
+#   fraud -> diputuskan fraud tanpa model
+ACTION_FLAG = 'flag'
+ACTION_SAFE = 'safe'
+ACTION_FRAUD = 'fraud'
+
+# Kolom turunan yang bisa dipakai di kondisi aturan selain FEATURE_COLUMNS
+DERIVED_COLUMNS = {
+    # step 1 = hari 1 jam 00:00, sama dengan konversi di halaman prediksi
+    'hour': lambda columns: (columns['step'] - 1) % 24,
+}
+
+# Aturan deklaratif: setiap kondisi berbentuk (kolom, operator, nilai) dan semua kondisi
+# dalam satu aturan digabung dengan AND. Nilai boleh berupa nama kolom lain.
+# Aturan keputusan dievaluasi berurutan; aturan pertama yang cocok menentukan hasil.
+DEFAULT_RULES = [
+    {
+        'name': 'non_fraud_type',
+        'label': "🟢 Jenis transaksi tanpa riwayat fraud (PAYMENT/CASH-IN)",
+        'when': [('type', 'in', ['PAYMENT', 'CASH-IN'])],
+        # Pada data training PaySim, fraud hanya terjadi pada TRANSFER dan CASH-OUT
+        'action': ACTION_SAFE,
+    },
+    {
+        'name': 'large_amount',
+        'label': "💰 Jumlah transaksi sangat besar (> 1 juta)",
+        'when': [('amount', '>', 1_000_000)],
+    },
+    {
+        'name': 'risky_type',
+        'label': "💳 Jenis transaksi berisiko tinggi (CASH-OUT/TRANSFER)",
+        'when': [('type', 'in', ['CASH-OUT', 'TRANSFER'])],
+    },
+    {
+        'name': 'empty_origin',
+        'label': "🏦 Saldo pengirim kosong",
+        'when': [('oldbalanceOrg', '==', 0)],
+    },
+    {
+        'name': 'empty_destination',
+        'label': "🎯 Penerima rekening baru/kosong",
+        'when': [('oldbalanceDest', '==', 0), ('newbalanceDest', '==', 'amount')],
+    },
+    {
+        'name': 'amount_exceeds_balance',
+        'label': "⚠️ Jumlah transaksi melebihi saldo pengirim",
+        'when': [('amount', '>', 'oldbalanceOrg')],
+    },
+    {
+        'name': 'early_morning',
+        'label': "🌙 Transaksi pada dini hari (00:00-05:59)",
+        'when': [('hour', '<=', 5)],
+    },
+    {
+        'name': 'late_night',
+        'label': "🌃 Transaksi pada malam hari (22:00-23:59)",
+        'when': [('hour', '>=', 22)],
+    },
+    {
+        'name': 'end_of_period',
+        'label': "📅 Transaksi pada akhir periode (hari 25+)",
+        'when': [('step', '>', 600)],
+    },
+]
+
+_OPERATORS = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+}
+
+
+# Fungsi untuk mengubah satu kondisi menjadi fungsi mask NumPy atas kolom-kolom batch
+def _compile_condition(column, operator, value):
+    if column not in scoring.FEATURE_COLUMNS and column not in DERIVED_COLUMNS:
+        raise ValueError(f"Kolom aturan tidak dikenal: {column}")
+
+    if operator in ('in', 'not in'):
+        values = list(value)
+        if column == 'type':
+            # Nama jenis transaksi dibandingkan lewat kode hasil encoding
+            values = [scoring.TYPE_MAPPING[name] for name in values]
+        values = np.array(values, dtype=np.float64)
+        invert = operator == 'not in'
+        return lambda columns: np.isin(columns[column], values, invert=invert)
+
+    if operator not in _OPERATORS:
+        raise ValueError(f"Operator aturan tidak dikenal: {operator}")
+    compare = _OPERATORS[operator]
+    if isinstance(value, str):
+        if value not in scoring.FEATURE_COLUMNS and value not in DERIVED_COLUMNS:
+            raise ValueError(f"Kolom aturan tidak dikenal: {value}")
+        return lambda columns: compare(columns[column], columns[value])
+    return lambda columns: compare(columns[column], value)
+
+
+# Mesin aturan: aturan deklaratif dikompilasi sekali menjadi fungsi mask yang
+# dievaluasi per batch (satu operasi NumPy per kondisi, bukan if per baris)
+class RuleEngine:
+    def __init__(self, rules=DEFAULT_RULES):
+        self.rules = list(rules)
+        self.names = [rule['name'] for rule in self.rules]
+        self.labels = [rule.get('label', rule['name']) for rule in self.rules]
+        self.actions = [rule.get('action', ACTION_FLAG) for rule in self.rules]
+        for action in self.actions:
+            if action not in (ACTION_FLAG, ACTION_SAFE, ACTION_FRAUD):
+                raise ValueError(f"Aksi aturan tidak dikenal: {action}")
+        self._conditions = [
+            [_compile_condition(*condition) for condition in rule['when']] for rule in self.rules
+        ]
+        self._derived = sorted({
+            operand for rule in self.rules for condition in rule['when'] for operand in condition[::2]
+            if isinstance(operand, str) and operand in DERIVED_COLUMNS
+        })
+
+        self.rows = 0
+        self.decided = 0
+        self._lock = threading.Lock()
+
+    def _columns(self, X):
+        columns = {name: X[:, index] for index, name in enumerate(scoring.FEATURE_COLUMNS)}
+        for name in self._derived:
+            columns[name] = DERIVED_COLUMNS[name](columns)
+        return columns
+
+    # Fungsi untuk menghitung mask semua aturan; hasil berbentuk (jumlah aturan, jumlah baris)
+    def evaluate(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        columns = self._columns(X)
+        masks = np.ones((len(self.rules), len(X)), dtype=bool)
+        for index, conditions in enumerate(self._conditions):
+            for condition in conditions:
+                masks[index] &= condition(columns)
+        return masks
+
+    # Fungsi untuk menentukan keputusan aturan per baris:
+    # -1 = serahkan ke model, 0 = aman, 1 = fraud; beserta indeks aturan yang memutuskan
+    def decide(self, masks):
+        n_rows = masks.shape[1]
+        decision = np.full(n_rows, -1, dtype=np.int64)
+        decided_by = np.full(n_rows, -1, dtype=np.int64)
+        for index, action in enumerate(self.actions):
+            if action == ACTION_FLAG:
+                continue
+            hit = masks[index] & (decision == -1)
+            decision[hit] = 1 if action == ACTION_FRAUD else 0
+            decided_by[hit] = index
+        return decision, decided_by
+
+    # Fungsi untuk mendapatkan label faktor risiko (aturan flag) yang cocok per baris
+    def explain(self, transactions):
+        masks = self.evaluate(scoring.encode_transactions(transactions))
+        flags = [index for index, action in enumerate(self.actions) if action == ACTION_FLAG]
+        return [[self.labels[index] for index in flags if masks[index, row]] for row in range(masks.shape[1])]
+
+    # Scoring dengan pre-filter: baris yang diputuskan aturan tidak pernah sampai ke model.
+    # score_fn menerima matriks fitur mentah dan mengembalikan dict hasil scoring.
+    def score(self, score_fn, transactions, threshold=scoring.DEFAULT_THRESHOLD):
+        X = scoring.encode_transactions(transactions)
+        decision, decided_by = self.decide(self.evaluate(X))
+        undecided = np.flatnonzero(decision == -1)
+
+        fraud_prob = decision.astype(np.float64)
+        if len(undecided):
+            fraud_prob[undecided] = score_fn(X[undecided], threshold=threshold)['fraud_prob']
+
+        with self._lock:
+            self.rows += len(X)
+            self.decided += len(X) - len(undecided)
+
+        names = np.array(self.names + [''], dtype=object)
+        return {
+            'fraud_prob': fraud_prob,
+            'safe_prob': 1.0 - fraud_prob,
+            'prediction': (fraud_prob > threshold).astype(np.int64),
+            'decided_by': names[decided_by],
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rows': self.rows,
+                'decided': self.decided,
+                'decided_rate': self.decided / self.rows if self.rows else None,
+            }
@@ -0,0 +1,165 @@
+import numpy as np
+
+import metrics
+
+# Urutan kolom fitur sesuai dengan data yang digunakan saat training
+FEATURE_COLUMNS = [
+    'step', 'type', 'amount', 'oldbalanceOrg',
+    'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest'
+]
+
+# Encoding type sesuai dengan mapping yang digunakan saat training
+# (ejaan PaySim asli dengan underscore juga diterima)
+TYPE_MAPPING = {
+    'PAYMENT': 0, 'TRANSFER': 3, 'CASH-IN': 4, 'CASH-OUT': 2, 'DEBIT': 1,
+    'CASH_IN': 4, 'CASH_OUT': 2
+}
+
+TYPE_INDEX = FEATURE_COLUMNS.index('type')
+
+# Batas probabilitas penipuan (sama dengan model.predict pada XGBClassifier)
+DEFAULT_THRESHOLD = 0.5
+
+
+# Mock model untuk demo jika file model tidak tersedia
+class MockModel:
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > DEFAULT_THRESHOLD).astype(np.int64)
+
+    def predict_proba(self, X):
+        # Simulasi prediksi berdasarkan jumlah transaksi dan jenis
+        X = np.asarray(X)
+        suspicious = (X[:, 2] > 200000) & np.isin(X[:, 1], [2, 3])  # amount > 200k dan CASH-OUT/TRANSFER
+        fraud_prob = np.where(suspicious, 0.8, 0.15)
+        return np.column_stack([1.0 - fraud_prob, fraud_prob])
+
+
+class MockScaler:
+    def transform(self, X):
+        return X
+
+
+# Fungsi untuk memuat model XGBoost dan scaler tanpa ketergantungan pada Streamlit
+def load_model_and_scaler(model_path='xgb_model.pkl', scaler_path='scaler.pkl'):
+    import joblib
+
+    model = joblib.load(model_path)
+    scaler = joblib.load(scaler_path)
+    return model, scaler
+
+
+# Fungsi untuk mengubah kolom 'type' (string atau kode) menjadi kode numerik
+def encode_types(types):
+    types = np.asarray(types)
+    if types.dtype.kind in 'iufb':
+        return types.astype(np.float64)
+
+    if types.dtype.kind == 'S':
+        types = types.astype(str)
+
+    # Mapping per nilai unik, bukan per baris (factorize berbasis hash, tanpa sorting)
+    import pandas as pd
+
+    inverse, uniques = pd.factorize(types)
+    if (inverse < 0).any():
+        raise ValueError("Jenis transaksi kosong ditemukan")
+    codes = np.empty(len(uniques), dtype=np.float64)
+    for i, name in enumerate(uniques):
+        if name not in TYPE_MAPPING:
+            raise ValueError(f"Jenis transaksi tidak dikenal: {name!r}")
+        codes[i] = TYPE_MAPPING[name]
+    return codes[inverse]
+
+
+def _encode_type_list(values):
+    try:
+        return [TYPE_MAPPING[value] if isinstance(value, str) else value for value in values]
+    except KeyError as e:
+        raise ValueError(f"Jenis transaksi tidak dikenal: {e.args[0]!r}") from None
+
+
+# Fungsi untuk membangun matriks fitur (N x 7) dari DataFrame, NumPy record array, list of dict
+# atau RecordBatch/Table Arrow
+def encode_transactions(transactions):
+    if isinstance(transactions, dict):
+        transactions = [transactions]
+
+    if type(transactions).__module__.startswith('pyarrow'):
+        import arrow_ingest
+
+        # Kolom Arrow dibaca langsung, tanpa DataFrame perantara
+        return arrow_ingest.encode_batch(transactions, dtype=np.float64)
+
+    X = np.empty((len(transactions), len(FEATURE_COLUMNS)), dtype=np.float64)
+
+    if isinstance(transactions, (list, tuple)):
+        for j, column in enumerate(FEATURE_COLUMNS):
+            values = [row[column] for row in transactions]
+            X[:, j] = _encode_type_list(values) if j == TYPE_INDEX else values
+        return X
+
+    if isinstance(transactions, np.ndarray) and transactions.dtype.names is None:
+        # Matriks numerik yang sudah ter-encode
+        if transactions.ndim != 2 or transactions.shape[1] != len(FEATURE_COLUMNS):
+            raise ValueError(f"Matriks fitur harus berukuran (N, {len(FEATURE_COLUMNS)})")
+        return np.asarray(transactions, dtype=np.float64)
+
+    # DataFrame pandas atau NumPy record array, diakses per kolom
+    for j, column in enumerate(FEATURE_COLUMNS):
+        values = np.asarray(transactions[column])
+        X[:, j] = encode_types(values) if j == TYPE_INDEX else values
+    return X
+
+
+# Fungsi untuk parameter affine (center, scale) scaler berbentuk (X - center) / scale; salah satunya
+# None jika tidak dipakai. None untuk scaler lain (misalnya MinMaxScaler: X * scale_ + min_), yang
+# harus lewat transform. Opsi with_centering/with_mean/with_scaling/with_std ikut diperhitungkan.
+def affine_params(scaler):
+    if not type(scaler).__module__.startswith('sklearn.'):
+        return None
+    from sklearn.preprocessing import RobustScaler, StandardScaler
+
+    if isinstance(scaler, RobustScaler):
+        return (scaler.center_ if scaler.with_centering else None,
+                scaler.scale_ if scaler.with_scaling else None)
+    if isinstance(scaler, StandardScaler):
+        return (scaler.mean_ if scaler.with_mean else None,
+                scaler.scale_ if scaler.with_std else None)
+    return None
+
+
+# Fungsi untuk scaling fitur dalam satu langkah; tipe float32/float64 matriks input dipertahankan
+def scale_features(scaler, X, copy=True):
+    dtype = X.dtype if isinstance(X, np.ndarray) and X.dtype in (np.float32, np.float64) else np.float64
+    params = affine_params(scaler)
+    if params is None:
+        return np.ascontiguousarray(scaler.transform(X), dtype=dtype)
+
+    # RobustScaler/StandardScaler: transformasi affine langsung tanpa validasi per panggilan
+    center, scale = params
+    X = np.array(X, dtype=dtype, copy=copy)
+    if center is not None:
+        X -= np.asarray(center, dtype=dtype)
+    if scale is not None:
+        X /= np.asarray(scale, dtype=dtype)
+    return X
+
+
+# Fungsi untuk melakukan scoring N transaksi sekaligus
+def score_batch(model, scaler, transactions, threshold=DEFAULT_THRESHOLD):
+    with metrics.REGISTRY.timer('encode'):
+        X = encode_transactions(transactions)
+    with metrics.REGISTRY.timer('scale'):
+        # Matriks hasil encoding adalah milik kita sendiri, jadi boleh di-scale in-place
+        X_scaled = scale_features(scaler, X, copy=X is transactions)
+
+    # Satu kali predict_proba per batch, label diturunkan dari probabilitas
+    with metrics.REGISTRY.timer('predict_proba'):
+        fraud_prob = np.asarray(model.predict_proba(X_scaled))[:, 1]
+    prediction = (fraud_prob > threshold).astype(np.int64)
+
+    return {
+        'fraud_prob': fraud_prob,
+        'safe_prob': 1.0 - fraud_prob,
+        'prediction': prediction,
+    }
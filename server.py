@@ -0,0 +1,451 @@
+import argparse
+import asyncio
+import functools
+import json
+import time
+
+import audit_log
+import batching
+import drift
+import history_store
+import metrics
+import model_manager
+import prediction_cache
+import rules
+import scoring
+import velocity
+
+# Ukuran body request maksimum (byte)
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+# Header untuk budget latensi per request (milidetik), menggantikan --latency-budget-ms
+BUDGET_HEADER = b'x-latency-budget-ms'
+
+
+# Aplikasi ASGI untuk scoring transaksi di luar Streamlit
+#   POST /score   -> satu transaksi (JSON object) atau {"transactions": [...]}
+#                    (header X-Latency-Budget-Ms: batas waktu inferensi, model dipotong jika perlu)
+#   GET  /health  -> status model
+#   GET  /shadow  -> statistik shadow scoring champion vs challenger (jika aktif)
+#   GET  /cascade -> statistik eskalasi cascade scoring (jika aktif)
+#   GET  /drift   -> laporan drift fitur dan skor terhadap statistik training (jika aktif)
+#   POST /explain -> kontribusi per fitur (log-odds) untuk satu transaksi atau {"transactions": [...]}
+#   GET  /metrics -> latensi per tahap dan throughput dalam format teks Prometheus
+class ScoringApp:
+    def __init__(self, model_path='xgb_model.pkl', scaler_path='scaler.pkl',
+                 max_batch_size=batching.DEFAULT_MAX_BATCH_SIZE, max_wait_ms=batching.DEFAULT_MAX_WAIT_MS,
+                 compiled=False, artifact_dir=None, shadow_rf_path=None, cascade=None,
+                 cache=None, rules=None, velocity=None, audit=None, history=None, drift=None, workers=None,
+                 budget=None, latency_budget_ms=None):
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.compiled = compiled
+        self.artifact_dir = artifact_dir
+        self.shadow_rf_path = shadow_rf_path
+        self.cascade = cascade
+        self.cache = cache
+        self.rules = rules
+        self.velocity = velocity
+        self.audit = audit
+        self.history = history
+        self.drift = drift
+        # Jumlah proses worker scoring (worker_pool.py); None berarti scoring di proses ini
+        self.workers = workers
+        self.pool = None
+        # Parameter BudgetedScorer dan budget latensi default per request (None = model penuh)
+        self.budget = budget
+        self.latency_budget_ms = latency_budget_ms
+        self.manager = None
+        self.shadow = None
+        self.batcher = None
+
+    async def startup(self):
+        loop = asyncio.get_running_loop()
+        if self.workers is not None:
+            # Worker di-fork sebelum thread audit/riwayat berjalan dan sebelum ada prediksi di proses ini
+            import worker_pool
+
+            self.pool = await loop.run_in_executor(
+                None, lambda: worker_pool.WorkerPool.from_files(self.model_path, self.scaler_path,
+                                                                workers=self.workers).start()
+            )
+        if self.audit is not None:
+            self.audit.start()
+        if self.history is not None:
+            self.history.start()
+        if self.drift is not None:
+            self.drift.start()
+        if self.pool is not None:
+            # Inferensi dikerjakan worker; aturan, cache dan pencatatan tetap di proses ini.
+            # Model tidak di-reload otomatis karena worker memegang salinan hasil fork.
+            self.manager = model_manager.ModelManager.from_engine(
+                self.pool, self.pool.version, cache=self.cache, rules=self.rules, velocity=self.velocity
+            )
+        elif self.artifact_dir is not None:
+            # Artefak native di-memory-map: tanpa pickle, dibagi antar proses lewat page cache
+            import model_artifacts
+
+            artifacts = await loop.run_in_executor(None, model_artifacts.load_artifacts, self.artifact_dir)
+            self.manager = model_manager.ModelManager.from_engine(
+                artifacts['models']['xgb'], artifacts['version'], cascade=self.cascade, cache=self.cache,
+                rules=self.rules, velocity=self.velocity
+            )
+        else:
+            # Model pickle dipantau dan di-reload otomatis saat file diganti
+            manager = model_manager.ModelManager(self.model_path, self.scaler_path, compiled=self.compiled,
+                                                 cascade=self.cascade, cache=self.cache, rules=self.rules,
+                                                 velocity=self.velocity, budget=self.budget)
+            self.manager = await loop.run_in_executor(None, manager.start)
+        # Log audit, riwayat dan monitor drift hanya mengantrekan hasil; pekerjaannya di thread masing-masing
+        self.manager.on_scored.extend(sink.record for sink in (self.audit, self.history, self.drift)
+                                      if sink is not None)
+        if self.shadow_rf_path is not None:
+            # Random forest sebagai challenger, di-score di luar jalur respons
+            import shadow
+
+            challenger = await loop.run_in_executor(
+                None, shadow.load_rf_challenger, self.shadow_rf_path, self.scaler_path
+            )
+            self.shadow = shadow.ShadowScorer(self.manager.score, challenger)
+        # Dengan worker pool, satu batch per worker boleh berjalan bersamaan
+        self.batcher = batching.MicroBatcher(self.score, self.max_batch_size, self.max_wait_ms,
+                                             concurrency=self.pool.workers if self.pool is not None else 1)
+        await self.batcher.start()
+
+    async def shutdown(self):
+        if self.batcher is not None:
+            await self.batcher.stop()
+        if self.manager is not None:
+            self.manager.stop()
+        if self.shadow is not None:
+            self.shadow.shutdown(wait=False)
+        if self.pool is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.pool.close)
+        if self.audit is not None:
+            # Sisa keputusan di antrean ditulis dan segmen terakhir dikompresi
+            await asyncio.get_running_loop().run_in_executor(None, self.audit.close)
+        if self.history is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.history.close)
+        if self.drift is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.drift.close)
+
+    def score(self, transactions, budget_ms=None):
+        if self.shadow is not None:
+            return self.shadow.score(transactions, budget_ms=budget_ms)
+        return self.manager.score(transactions, budget_ms=budget_ms)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        method, path = scope['method'], scope['path']
+
+        if path == '/health' and method == 'GET':
+            status = 200 if self.batcher is not None else 503
+            await _send_json(send, status, {
+                'status': 'ok' if status == 200 else 'starting',
+                'model_version': self.manager.version if self.manager else None,
+                'batches': self.batcher.batches if self.batcher else 0,
+                'items': self.batcher.items if self.batcher else 0,
+                'cache': self.cache.stats() if self.cache is not None else None,
+                'rules': self.rules.stats() if self.rules is not None else None,
+                'velocity': self.velocity.stats() if self.velocity is not None else None,
+                'audit': self.audit.stats() if self.audit is not None else None,
+                'history': self.history.stats() if self.history is not None else None,
+                'drift': self.drift.stats() if self.drift is not None else None,
+                'workers': self.pool.stats() if self.pool is not None else None,
+                'budget': self.manager.active['budget'].stats()
+                if self.manager is not None and self.manager.active['budget'] is not None else None,
+            })
+            return
+
+        if path == '/shadow' and method == 'GET':
+            if self.shadow is None:
+                await _send_json(send, 404, {'error': 'Shadow scoring tidak aktif (gunakan --shadow-rf)'})
+            else:
+                await _send_json(send, 200, self.shadow.stats())
+            return
+
+        if path == '/cascade' and method == 'GET':
+            snapshot = self.manager.active if self.manager else None
+            if snapshot is None or snapshot['cascade'] is None:
+                await _send_json(send, 404, {'error': 'Cascade scoring tidak aktif (gunakan --cascade)'})
+            else:
+                await _send_json(send, 200, dict(snapshot['cascade'].stats(), model_version=snapshot['version']))
+            return
+
+        if path == '/drift' and method == 'GET':
+            if self.drift is None:
+                await _send_json(send, 404, {'error': 'Monitor drift tidak aktif (gunakan --drift)'})
+            else:
+                await _send_json(send, 200, self.drift.report())
+            return
+
+        if path == '/metrics' and method == 'GET':
+            await _send_text(send, 200, metrics.REGISTRY.render_prometheus())
+            return
+
+        if path == '/explain':
+            await self._explain(method, receive, send)
+            return
+
+        if path != '/score':
+            await _send_json(send, 404, {'error': 'Endpoint tidak ditemukan'})
+            return
+        if method != 'POST':
+            await _send_json(send, 405, {'error': 'Gunakan metode POST'})
+            return
+        if self.batcher is None:
+            await _send_json(send, 503, {'error': 'Model belum siap'})
+            return
+
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            budget_ms = _budget_ms(scope, self.latency_budget_ms)
+        except ValueError as e:
+            await _send_json(send, 400, {'error': f'Header {BUDGET_HEADER.decode()} tidak valid: {e}'})
+            return
+        # Deadline dihitung sejak request diterima, sehingga waktu baca body dan antre ikut terpotong
+        deadline = loop.time() + budget_ms / 1000.0 if budget_ms is not None else None
+        try:
+            payload = json.loads(await _read_body(receive))
+        except ValueError as e:
+            await _send_json(send, 400, {'error': f'Body JSON tidak valid: {e}'})
+            return
+
+        try:
+            if isinstance(payload, dict) and 'transactions' in payload:
+                # Request yang sudah berupa batch langsung di-score tanpa melewati micro-batcher
+                remaining_ms = max(0.0, (deadline - loop.time()) * 1000.0) if deadline is not None else None
+                result = await loop.run_in_executor(
+                    None, functools.partial(self.score, payload['transactions'], budget_ms=remaining_ms)
+                )
+                body = {key: value.tolist() if hasattr(value, 'tolist') else value for key, value in result.items()}
+            elif isinstance(payload, dict):
+                body = await self.batcher.submit(payload, deadline)
+            else:
+                raise ValueError('Body harus berupa object transaksi atau {"transactions": [...]}')
+        except (KeyError, TypeError, ValueError) as e:
+            await _send_json(send, 422, {'error': f'Transaksi tidak valid: {e}'})
+            return
+
+        await _send_json(send, 200, body)
+        # Latensi end-to-end request, termasuk antre di micro-batcher
+        metrics.REGISTRY.observe('http_score', time.perf_counter() - start)
+        metrics.REGISTRY.inc('http_requests')
+
+    async def _explain(self, method, receive, send):
+        if method != 'POST':
+            await _send_json(send, 405, {'error': 'Gunakan metode POST'})
+            return
+        if self.manager is None:
+            await _send_json(send, 503, {'error': 'Model belum siap'})
+            return
+        # Snapshot diambil sekali agar versi model di respons sesuai dengan engine yang dipakai
+        snapshot = self.manager.active
+        engine = self.manager.explainer(snapshot)
+        if engine is None:
+            await _send_json(send, 404, {'error': 'Model aktif tidak mendukung kontribusi fitur (bukan XGBoost)'})
+            return
+
+        try:
+            payload = json.loads(await _read_body(receive))
+        except ValueError as e:
+            await _send_json(send, 400, {'error': f'Body JSON tidak valid: {e}'})
+            return
+
+        try:
+            # Pendekatan Saabas hanya dipakai jika diminta: {"transactions": [...], "method": "approx"}
+            method = None
+            if isinstance(payload, dict) and 'transactions' in payload:
+                transactions = payload['transactions']
+                method = payload.get('method')
+            elif isinstance(payload, dict):
+                transactions = [payload]
+            else:
+                raise ValueError('Body harus berupa object transaksi atau {"transactions": [...]}')
+            result = await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(engine.contributions, transactions, method)
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            await _send_json(send, 422, {'error': f'Transaksi tidak valid: {e}'})
+            return
+
+        await _send_json(send, 200, {
+            'features': list(scoring.FEATURE_COLUMNS),
+            'contributions': result['contributions'].tolist(),
+            'bias': result['bias'].tolist(),
+            'margin': result['margin'].tolist(),
+            'method': result['method'],
+            'model_version': snapshot['version'],
+        })
+        metrics.REGISTRY.inc('http_explain_requests')
+
+
+# Fungsi untuk budget latensi request: header X-Latency-Budget-Ms atau nilai default server
+def _budget_ms(scope, default):
+    for name, value in scope.get('headers', []):
+        if name.lower() == BUDGET_HEADER:
+            budget_ms = float(value.decode('latin-1'))
+            if not budget_ms > 0:
+                raise ValueError('budget harus lebih dari 0')
+            return budget_ms
+    return default
+
+
+async def _read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if len(body) > MAX_BODY_SIZE:
+            raise ValueError('Body terlalu besar')
+        if not message.get('more_body', False):
+            return bytes(body)
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_text(send, status, text):
+    body = text.encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'text/plain; version=0.0.4'), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+# Instance default, misalnya untuk: uvicorn server:app
+app = ScoringApp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Layanan HTTP scoring SafePay.AI dengan micro-batching')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--model', default='xgb_model.pkl', help='Path model XGBoost')
+    parser.add_argument('--scaler', default='scaler.pkl', help='Path scaler')
+    parser.add_argument('--max-batch-size', type=int, default=batching.DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=batching.DEFAULT_MAX_WAIT_MS)
+    parser.add_argument('--compiled', action='store_true',
+                        help='Gunakan evaluator pohon NumPy (tree_engine) sebagai pengganti XGBoost')
+    parser.add_argument('--artifacts', default=None,
+                        help='Direktori artefak native (model_artifacts.py) untuk dimuat via memory-map')
+    parser.add_argument('--shadow-rf', default=None,
+                        help='Path rf_model.pkl untuk shadow scoring sebagai challenger')
+    parser.add_argument('--cascade', action='store_true',
+                        help='Scoring bertingkat: model penuh hanya untuk transaksi di band ketidakpastian')
+    parser.add_argument('--cascade-rounds', type=int, default=None,
+                        help='Jumlah boosting round tahap pertama cascade')
+    parser.add_argument('--cascade-band', type=float, nargs=2, default=None, metavar=('LOW', 'HIGH'),
+                        help='Band ketidakpastian skor tahap pertama (hasil python cascade.py SAMPEL)')
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help='Jumlah entri cache prediksi (0 = tanpa cache)')
+    parser.add_argument('--cache-ttl', type=float, default=prediction_cache.DEFAULT_TTL,
+                        help='Umur entri cache prediksi (detik)')
+    parser.add_argument('--rules', action='store_true',
+                        help='Aktifkan pre-filter aturan (rules.py) sebelum inferensi model')
+    parser.add_argument('--velocity', action='store_true',
+                        help='Hitung fitur velocity per akun (butuh kolom nameOrig dan nameDest)')
+    parser.add_argument('--audit-dir', default=None,
+                        help='Direktori log audit keputusan (JSONL, dirotasi dan dikompresi gzip)')
+    parser.add_argument('--audit-overflow', choices=audit_log.OVERFLOW_POLICIES, default='block',
+                        help='Perilaku saat antrean log audit penuh')
+    parser.add_argument('--history-dir', default=None,
+                        help='Direktori riwayat scoring (Parquet per hari) untuk statistik dashboard')
+    parser.add_argument('--drift', action='store_true',
+                        help='Pantau drift fitur dan skor terhadap statistik training di scaler')
+    parser.add_argument('--drift-reference', default=None,
+                        help='File histogram referensi (python drift.py DATA); default baseline trafik awal')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Jumlah proses worker scoring, masing-masing dipin ke satu core (0 = semua core)')
+    parser.add_argument('--latency-budget', action='store_true',
+                        help='Izinkan budget latensi per request (header X-Latency-Budget-Ms); '
+                             'model dipotong ke K boosting round pertama agar selesai dalam budget')
+    parser.add_argument('--latency-budget-ms', type=float, default=None,
+                        help='Budget latensi default setiap request (mengaktifkan --latency-budget)')
+    parser.add_argument('--min-rounds', type=int, default=None,
+                        help='Jumlah boosting round minimum saat budget habis '
+                             '(default: diturunkan dari kurva akurasi model)')
+    args = parser.parse_args()
+
+    if args.workers is not None and (args.compiled or args.artifacts or args.cascade):
+        parser.error("--workers tidak dapat digabung dengan --compiled, --artifacts atau --cascade")
+    budget = None
+    if args.latency_budget or args.latency_budget_ms is not None:
+        if args.workers is not None or args.artifacts:
+            parser.error("Budget latensi membutuhkan model XGBoost di proses server (tanpa --workers/--artifacts)")
+        # Evaluator terkompilasi model penuh lebih cepat daripada XGBoost yang dipotong
+        if args.compiled:
+            parser.error("Budget latensi tidak dapat digabung dengan --compiled")
+        budget = {}
+        if args.min_rounds is not None:
+            budget['min_rounds'] = args.min_rounds
+
+    try:
+        import uvicorn
+    except ImportError:
+        parser.error("Paket 'uvicorn' dibutuhkan untuk menjalankan server (pip install uvicorn)")
+
+    cascade = None
+    if args.cascade:
+        cascade = {}
+        if args.cascade_rounds is not None:
+            cascade['first_stage_rounds'] = args.cascade_rounds
+        if args.cascade_band is not None:
+            cascade['band'] = tuple(args.cascade_band)
+
+    cache = None
+    if args.cache_size > 0:
+        cache = prediction_cache.PredictionCache(args.cache_size, args.cache_ttl)
+
+    monitor = None
+    if args.drift:
+        import joblib
+
+        reference = drift.load_reference(args.drift_reference) if args.drift_reference else None
+        monitor = drift.DriftMonitor(joblib.load(args.scaler), reference)
+
+    scoring_app = ScoringApp(args.model, args.scaler, args.max_batch_size, args.max_wait_ms, args.compiled,
+                             args.artifacts, args.shadow_rf, cascade, cache,
+                             rules.RuleEngine() if args.rules else None,
+                             velocity.VelocityTracker() if args.velocity else None,
+                             audit_log.AuditLog(args.audit_dir, overflow=args.audit_overflow)
+                             if args.audit_dir else None,
+                             history_store.HistoryStore(args.history_dir) if args.history_dir else None,
+                             monitor, args.workers, budget, args.latency_budget_ms)
+    uvicorn.run(scoring_app, host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
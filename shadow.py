@@ -0,0 +1,119 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import metrics
+import scoring
+
+# Jumlah maksimum batch shadow yang boleh mengantre; kelebihannya dilewati, bukan ditumpuk
+DEFAULT_MAX_PENDING = 1000
+
+# Batas bin histogram selisih probabilitas champion vs challenger
+DELTA_BINS = np.array([0.0, 0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0])
+
+
+# Fungsi untuk membuat challenger random forest dari rf_model.pkl.
+# Secara default forest dikompilasi ke tree_engine (scaler dilebur ke threshold) agar
+# scoring shadow ringan dan tidak menahan GIL selama inferensi sklearn per panggilan.
+def load_rf_challenger(rf_path='rf_model.pkl', scaler_path='scaler.pkl', compiled=True):
+    import joblib
+
+    forest = joblib.load(rf_path)
+    scaler = joblib.load(scaler_path)
+    if compiled:
+        import tree_engine
+
+        engine = tree_engine.compile_sklearn_forest(forest, scaler)
+        return engine.score
+    return lambda X: scoring.score_batch(forest, scaler, X)
+
+
+# Shadow scoring: champion menentukan respons, challenger dihitung di thread pool
+# terpisah dan hanya dipakai untuk statistik perbandingan.
+class ShadowScorer:
+    def __init__(self, champion, challenger, max_workers=1, max_pending=DEFAULT_MAX_PENDING):
+        self.champion = champion
+        self.challenger = challenger
+        self.max_pending = max_pending
+
+        self.champion_latency = metrics.LatencyHistogram()
+        self.challenger_latency = metrics.LatencyHistogram()
+
+        self.rows = 0
+        self.agree = 0
+        self.champion_only_fraud = 0
+        self.challenger_only_fraud = 0
+        self.delta_sum = 0.0
+        self.delta_max = 0.0
+        self.delta_counts = np.zeros(len(DELTA_BINS) - 1, dtype=np.int64)
+        self.dropped = 0
+        self.errors = 0
+
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='shadow')
+
+    def score(self, transactions, **kwargs):
+        # Champion menerima transaksi asli (kolom akun dipakai fitur velocity);
+        # encoding untuk challenger dilakukan di thread shadow, di luar jalur respons
+        start = time.perf_counter()
+        result = self.champion(transactions, **kwargs)
+        self.champion_latency.observe(time.perf_counter() - start)
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.dropped += len(result['fraud_prob'])
+                return result
+            self._pending += 1
+        self._executor.submit(self._shadow, transactions, result['fraud_prob'], result['prediction'])
+        return result
+
+    def _shadow(self, transactions, champion_prob, champion_prediction):
+        try:
+            X = scoring.encode_transactions(transactions)
+            start = time.perf_counter()
+            challenger = self.challenger(X)
+            self.challenger_latency.observe(time.perf_counter() - start)
+
+            delta = np.abs(challenger['fraud_prob'] - champion_prob)
+            champion_fraud = champion_prediction == 1
+            challenger_fraud = challenger['prediction'] == 1
+            with self._lock:
+                self.rows += len(X)
+                self.agree += int(np.count_nonzero(champion_fraud == challenger_fraud))
+                self.champion_only_fraud += int(np.count_nonzero(champion_fraud & ~challenger_fraud))
+                self.challenger_only_fraud += int(np.count_nonzero(~champion_fraud & challenger_fraud))
+                self.delta_sum += float(delta.sum())
+                self.delta_max = max(self.delta_max, float(delta.max()))
+                self.delta_counts += np.histogram(delta, bins=DELTA_BINS)[0]
+        except Exception:
+            with self._lock:
+                self.errors += 1
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rows': self.rows,
+                'agreement_rate': self.agree / self.rows if self.rows else None,
+                'champion_only_fraud': self.champion_only_fraud,
+                'challenger_only_fraud': self.challenger_only_fraud,
+                'mean_abs_delta': self.delta_sum / self.rows if self.rows else None,
+                'max_abs_delta': self.delta_max,
+                'delta_histogram': {
+                    f"{low:g}-{high:g}": int(count)
+                    for low, high, count in zip(DELTA_BINS[:-1], DELTA_BINS[1:], self.delta_counts)
+                },
+                'champion_latency': self.champion_latency.summary(),
+                'challenger_latency': self.challenger_latency.summary(),
+                'pending': self._pending,
+                'dropped': self.dropped,
+                'errors': self.errors,
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,408 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import bulk_scoring
+import scoring
+
+# Batas ukuran micro-batch (baris) dan waktu tunggu maksimum sebelum batch di-score
+DEFAULT_MAX_BATCH_SIZE = 1024
+DEFAULT_MAX_WAIT_MS = 5.0
+
+# Kapasitas antrean input (potongan baris, masing-masing paling banyak READ_SIZE byte) dan output
+# (batch keputusan). Saat penuh, pembaca berhenti membaca sehingga produser ikut tertahan.
+DEFAULT_QUEUE_CHUNKS = 64
+DEFAULT_OUTPUT_BATCHES = 8
+
+# Ukuran blok pembacaan file/stdin/socket
+READ_SIZE = 64 * 1024
+
+# Interval pengecekan data baru saat mengikuti (tail) file yang sedang ditulis (detik)
+DEFAULT_POLL_INTERVAL = 0.2
+
+# Panjang maksimum baris mentah yang disertakan pada record error
+MAX_ERROR_LINE = 200
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Tipe {type(value).__name__} tidak dapat ditulis ke stream keputusan")
+
+
+_ENCODER = json.JSONEncoder(default=_json_default)
+
+
+# Pemisah blok byte menjadi baris lengkap; sisa baris yang belum selesai disimpan untuk blok berikutnya
+class _LineSplitter:
+    def __init__(self):
+        self._partial = b''
+
+    def feed(self, data):
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()
+        return [line for line in lines if line.strip()]
+
+    def flush(self):
+        line, self._partial = self._partial, b''
+        return [line] if line.strip() else []
+
+
+# Consumer stream transaksi NDJSON: baris dibaca dari file (opsional diikuti seperti tail -f),
+# stdin atau Unix socket, dikelompokkan menjadi micro-batch berbatas ukuran dan waktu, di-score
+# lewat ModelManager, lalu keputusannya ditulis ke stream output dengan urutan yang sama dengan
+# input. Satu batch di-score pada satu waktu sehingga urutan per akun (dan fitur velocity) terjaga.
+# Semua antrean berbatas: jika scoring atau output lambat, pembacaan input ikut tertahan.
+class StreamConsumer:
+    def __init__(self, manager, output, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 queue_chunks=DEFAULT_QUEUE_CHUNKS, output_batches=DEFAULT_OUTPUT_BATCHES,
+                 threshold=scoring.DEFAULT_THRESHOLD):
+        self.manager = manager
+        self.output = output
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue_chunks = queue_chunks
+        self.output_batches = output_batches
+        self.threshold = threshold
+
+        self.lines = 0
+        self.decisions = 0
+        self.errors = 0
+        self.batches = 0
+        self.max_input_depth = 0
+        self.started_at = None
+
+        self._input = None
+        self._output = None
+        self._stop = None
+        self._lock = threading.Lock()
+        # Satu thread scoring (urutan terjaga) dan satu thread penulis output
+        self._scoring = ThreadPoolExecutor(max_workers=1, thread_name_prefix='stream-scoring')
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='stream-writer')
+
+    # Fungsi untuk menjalankan consumer sampai input habis (atau sampai stop() dipanggil)
+    async def run(self, feed):
+        self._input = asyncio.Queue(maxsize=self.queue_chunks)
+        self._output = asyncio.Queue(maxsize=self.output_batches)
+        self._stop = asyncio.Event()
+        self.started_at = time.perf_counter()
+
+        reader = asyncio.create_task(self._read(feed))
+        writer = asyncio.create_task(self._write())
+        try:
+            await self._score()
+            await self._output.put(None)
+            await writer
+        finally:
+            reader.cancel()
+            writer.cancel()
+            self._scoring.shutdown(wait=False)
+            self._writer.shutdown(wait=False)
+        return self.stats()
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    async def _read(self, feed):
+        try:
+            await feed(self._put_lines, self._stop)
+        finally:
+            # Penanda akhir input; antrean tetap dikonsumsi sehingga put ini pasti selesai
+            await self._input.put(None)
+
+    async def _put_lines(self, lines):
+        await self._input.put(lines)
+        depth = self._input.qsize()
+        if depth > self.max_input_depth:
+            self.max_input_depth = depth
+
+    # Fungsi untuk mengumpulkan baris sampai max_batch_size atau sampai max_wait sejak baris pertama
+    async def _collect(self, carry):
+        lines = carry
+        if not lines:
+            chunk = await self._input.get()
+            if chunk is None:
+                return None, None
+            lines = chunk
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(lines) < self.max_batch_size:
+            try:
+                chunk = self._input.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    chunk = await asyncio.wait_for(self._input.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if chunk is None:
+                # Akhir input: batch terakhir tetap di-score, penanda dikembalikan untuk loop berikutnya
+                self._input.put_nowait(None)
+                break
+            lines = lines + chunk
+        return lines[:self.max_batch_size], lines[self.max_batch_size:]
+
+    async def _score(self):
+        loop = asyncio.get_running_loop()
+        carry = []
+        while True:
+            batch, carry = await self._collect(carry)
+            if batch is None:
+                return
+            data = await loop.run_in_executor(self._scoring, self._process, batch)
+            # Output penuh berarti penulis tertinggal: scoring menunggu, input ikut tertahan
+            await self._output.put(data)
+
+    async def _write(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            data = await self._output.get()
+            if data is None:
+                return
+            await loop.run_in_executor(self._writer, self._write_data, data)
+
+    def _write_data(self, data):
+        self.output.write(data)
+        self.output.flush()
+
+    # Fungsi untuk parse, scoring dan serialisasi satu batch (dijalankan di thread scoring)
+    def _process(self, lines):
+        with self._lock:
+            first = self.lines
+            self.lines += len(lines)
+
+        records = [None] * len(lines)
+        transactions, positions = [], []
+        for i, line in enumerate(lines):
+            try:
+                transaction = json.loads(line)
+                if not isinstance(transaction, dict):
+                    raise ValueError('baris harus berupa object JSON transaksi')
+                # Kolom yang hilang ditolak per baris agar batch tidak perlu di-score ulang satu per satu
+                bulk_scoring.check_columns(transaction)
+            except ValueError as e:
+                records[i] = self._error(first + i, line, e)
+                continue
+            transactions.append(transaction)
+            positions.append(i)
+
+        if transactions:
+            try:
+                self._decide(transactions, positions, records)
+            except Exception:
+                # Satu transaksi yang tidak valid tidak boleh menggagalkan seluruh batch
+                for transaction, i in zip(transactions, positions):
+                    try:
+                        self._decide([transaction], [i], records)
+                    except Exception as e:
+                        records[i] = self._error(first + i, lines[i], e)
+
+        errors = sum(1 for record in records if 'error' in record)
+        with self._lock:
+            self.batches += 1
+            self.errors += errors
+            self.decisions += len(records) - errors
+        return ('\n'.join(_ENCODER.encode(record) for record in records) + '\n').encode()
+
+    def _decide(self, transactions, positions, records):
+        result = self.manager.score(transactions, threshold=self.threshold)
+        columns = {}
+        for name, value in result.items():
+            if name == 'safe_prob':
+                continue
+            columns[name] = value.tolist() if getattr(value, 'ndim', 0) > 0 else [value] * len(transactions)
+        for j, (transaction, i) in enumerate(zip(transactions, positions)):
+            record = dict(transaction)
+            for name, values in columns.items():
+                record[name] = values[j]
+            records[i] = record
+
+    @staticmethod
+    def _error(sequence, line, error):
+        raw = line.decode('utf-8', errors='replace')
+        return {'seq': sequence, 'error': f"{type(error).__name__}: {error}", 'line': raw[:MAX_ERROR_LINE]}
+
+    def stats(self):
+        with self._lock:
+            elapsed = time.perf_counter() - self.started_at if self.started_at is not None else 0.0
+            return {
+                'lines': self.lines,
+                'decisions': self.decisions,
+                'errors': self.errors,
+                'batches': self.batches,
+                'mean_batch_size': self.lines / self.batches if self.batches else None,
+                'max_input_depth': self.max_input_depth,
+                'queue_chunks': self.queue_chunks,
+                'rows_per_second': self.lines / elapsed if elapsed else None,
+            }
+
+
+# Fungsi untuk sumber file atau stdin ('-'): dibaca per blok di thread terpisah. Dengan follow,
+# file diikuti seperti tail -f (termasuk saat dirotasi atau dipotong) sampai consumer dihentikan.
+def file_feed(path, follow=False, poll_interval=DEFAULT_POLL_INTERVAL):
+    async def feed(put_lines, stop):
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+
+        def read():
+            try:
+                _read_file(path, follow, poll_interval, stop,
+                           lambda lines: asyncio.run_coroutine_threadsafe(put_lines(lines), loop).result())
+            except BaseException as e:
+                loop.call_soon_threadsafe(lambda: done.done() or done.set_exception(e))
+            else:
+                loop.call_soon_threadsafe(lambda: done.done() or done.set_result(None))
+
+        threading.Thread(target=read, name='stream-reader', daemon=True).start()
+        stopped = asyncio.ensure_future(stop.wait())
+        try:
+            # Pembacaan stdin yang sedang memblok tidak bisa dibatalkan; saat stop, thread ditinggalkan
+            await asyncio.wait([done, stopped], return_when=asyncio.FIRST_COMPLETED)
+            if done.done():
+                done.result()
+        finally:
+            stopped.cancel()
+
+    return feed
+
+
+def _read_file(path, follow, poll_interval, stop, emit):
+    splitter = _LineSplitter()
+    handle = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    try:
+        fd = handle.fileno()
+        while not stop.is_set():
+            data = os.read(fd, READ_SIZE)
+            if data:
+                lines = splitter.feed(data)
+                if lines:
+                    # Memblok saat antrean input penuh (backpressure)
+                    emit(lines)
+                continue
+            if not follow or path == '-':
+                break
+            time.sleep(poll_interval)
+            # File dirotasi (inode baru) atau dipotong: baca ulang dari awal file yang sekarang
+            try:
+                current = os.stat(path)
+            except FileNotFoundError:
+                continue
+            position = os.lseek(fd, 0, os.SEEK_CUR)
+            if current.st_ino != os.fstat(fd).st_ino or current.st_size < position:
+                handle.close()
+                handle = open(path, 'rb')
+                fd = handle.fileno()
+        lines = splitter.flush()
+        if lines:
+            emit(lines)
+    finally:
+        if handle is not sys.stdin.buffer:
+            handle.close()
+
+
+# Fungsi untuk sumber Unix socket: setiap koneksi produser dibaca per blok; saat antrean penuh
+# koneksi tidak dibaca sehingga buffer socket penuh dan produser tertahan
+def unix_socket_feed(path):
+    async def feed(put_lines, stop):
+        async def handle(reader, writer):
+            splitter = _LineSplitter()
+            try:
+                while not stop.is_set():
+                    data = await reader.read(READ_SIZE)
+                    if not data:
+                        break
+                    lines = splitter.feed(data)
+                    if lines:
+                        await put_lines(lines)
+                lines = splitter.flush()
+                if lines:
+                    await put_lines(lines)
+            finally:
+                writer.close()
+
+        if os.path.exists(path):
+            os.remove(path)
+        server = await asyncio.start_unix_server(handle, path)
+        try:
+            await stop.wait()
+        finally:
+            server.close()
+            await server.wait_closed()
+            os.remove(path)
+
+    return feed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Consumer stream transaksi NDJSON dengan micro-batching dan backpressure')
+    parser.add_argument('source', nargs='?', default='-',
+                        help="File NDJSON atau '-' untuk stdin (default); diabaikan jika --socket dipakai")
+    parser.add_argument('--socket', default=None, help='Path Unix socket yang didengarkan untuk produser NDJSON')
+    parser.add_argument('--follow', action='store_true',
+                        help='Ikuti file yang terus ditulis (seperti tail -f), termasuk saat dirotasi')
+    parser.add_argument('--output', default='-', help="File tujuan keputusan NDJSON atau '-' untuk stdout")
+    parser.add_argument('--model', default='xgb_model.pkl', help='Path model XGBoost')
+    parser.add_argument('--scaler', default='scaler.pkl', help='Path scaler')
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS)
+    parser.add_argument('--queue-chunks', type=int, default=DEFAULT_QUEUE_CHUNKS,
+                        help=f'Kapasitas antrean input (blok {READ_SIZE // 1024} KB)')
+    parser.add_argument('--threshold', type=float, default=scoring.DEFAULT_THRESHOLD)
+    parser.add_argument('--rules', action='store_true',
+                        help='Aktifkan pre-filter aturan (rules.py) sebelum inferensi model')
+    parser.add_argument('--velocity', action='store_true',
+                        help='Hitung fitur velocity per akun (butuh kolom nameOrig dan nameDest)')
+    parser.add_argument('--audit-dir', default=None, help='Direktori log audit keputusan')
+    parser.add_argument('--history-dir', default=None, help='Direktori riwayat scoring (Parquet per hari)')
+    args = parser.parse_args()
+
+    import audit_log
+    import history_store
+    import model_manager
+    import rules
+    import velocity
+
+    audit = audit_log.AuditLog(args.audit_dir).start() if args.audit_dir else None
+    history = history_store.HistoryStore(args.history_dir).start() if args.history_dir else None
+    manager = model_manager.ModelManager(args.model, args.scaler,
+                                         rules=rules.RuleEngine() if args.rules else None,
+                                         velocity=velocity.VelocityTracker() if args.velocity else None).start()
+    manager.on_scored.extend(sink.record for sink in (audit, history) if sink is not None)
+    feed = unix_socket_feed(args.socket) if args.socket else file_feed(args.source, args.follow)
+    output = sys.stdout.buffer if args.output == '-' else open(args.output, 'ab')
+    consumer = StreamConsumer(manager, output, args.max_batch_size, args.max_wait_ms, args.queue_chunks,
+                              threshold=args.threshold)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, consumer.stop)
+        return await consumer.run(feed)
+
+    try:
+        stats = asyncio.run(run())
+    finally:
+        manager.stop()
+        if audit is not None:
+            audit.close()
+        if history is not None:
+            history.close()
+        if output is not sys.stdout.buffer:
+            output.close()
+    print(json.dumps(stats), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+# Modul aplikasi berada di root repositori (tanpa package)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import paysim_generator  # noqa: E402
+import scoring  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def model_path():
+    return os.path.join(ROOT, 'xgb_model.pkl')
+
+
+@pytest.fixture(scope='session')
+def scaler_path():
+    return os.path.join(ROOT, 'scaler.pkl')
+
+
+@pytest.fixture(scope='session')
+def model_and_scaler(model_path, scaler_path):
+    return scoring.load_model_and_scaler(model_path, scaler_path)
+
+
+# Transaksi PaySim sintetis (deterministik) yang mencakup semua jenis transaksi dan sebagian fraud
+@pytest.fixture(scope='session')
+def transactions():
+    return next(paysim_generator.iter_transactions(20_000, chunksize=20_000, seed=7))
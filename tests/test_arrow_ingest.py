@@ -0,0 +1,35 @@
+import numpy as np
+import pyarrow as pa
+import pytest
+
+import arrow_ingest
+import paysim_generator
+import scoring
+
+
+def test_arrow_scoring_matches_interactive_path(model_and_scaler):
+    # Sampel besar agar selisih pembulatan float32 (jika ada) pasti muncul
+    transactions = next(paysim_generator.iter_transactions(200_000, chunksize=200_000, seed=3))
+    batch = pa.RecordBatch.from_pandas(transactions, preserve_index=False)
+
+    result = arrow_ingest.score_batch(*model_and_scaler, batch)
+    expected = scoring.score_batch(*model_and_scaler, transactions)
+
+    # Scaling float64 lalu float32 hanya di akhir: tidak ada selisih, juga tepat di sekitar threshold
+    np.testing.assert_array_equal(result['fraud_prob'], expected['fraud_prob'])
+    np.testing.assert_array_equal(result['prediction'], expected['prediction'])
+
+
+def test_dictionary_type_column_is_encoded(transactions):
+    batch = pa.RecordBatch.from_pandas(transactions.head(100), preserve_index=False)
+    encoded = batch.set_column(batch.schema.get_field_index('type'), 'type',
+                               batch.column('type').dictionary_encode())
+
+    np.testing.assert_array_equal(arrow_ingest.encode_batch(encoded), scoring.encode_transactions(transactions.head(100)))
+
+
+def test_unknown_type_rejected(transactions):
+    batch = pa.RecordBatch.from_pandas(transactions.head(2).assign(type='WIRE'), preserve_index=False)
+
+    with pytest.raises(ValueError):
+        arrow_ingest.encode_batch(batch)
@@ -0,0 +1,60 @@
+import glob
+import gzip
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+import audit_log
+
+TRANSACTIONS = [{'step': 1, 'type': 'TRANSFER', 'amount': 100.0, 'oldbalanceOrg': 100.0, 'newbalanceOrig': 0.0,
+                 'oldbalanceDest': 0.0, 'newbalanceDest': 0.0}] * 4
+RESULT = {'fraud_prob': np.full(4, 0.9), 'prediction': np.ones(4, dtype=np.int64)}
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+
+
+def test_rotated_segments_are_compressed_without_losing_records(tmp_path):
+    log = audit_log.AuditLog(str(tmp_path), max_bytes=1_000, flush_interval=0.01).start()
+    for _ in range(50):
+        assert log.record(TRANSACTIONS, RESULT, 'v1')
+        time.sleep(0.005)
+    log.close()
+
+    stats = log.stats()
+    assert stats['compressed_segments'] == stats['segments'] > 1
+    assert not glob.glob(os.path.join(tmp_path, '*.jsonl'))
+    lines = []
+    for path in glob.glob(os.path.join(tmp_path, '*.jsonl.gz')):
+        with gzip.open(path, 'rt') as handle:
+            lines.extend(json.loads(line) for line in handle)
+    assert len(lines) == stats['records'] == 200
+    assert {line['model_version'] for line in lines} == {'v1'}
+
+
+def test_unwritten_data_is_bounded_while_writes_fail(tmp_path):
+    directory = str(tmp_path / 'audit')
+    log = audit_log.AuditLog(directory, flush_interval=0.01, queue_rows=8, overflow='drop').start()
+    # Direktori hilang: segmen tidak bisa dibuka dan setiap penulisan gagal
+    shutil.rmtree(directory)
+    for _ in range(20):
+        log.record(TRANSACTIONS, RESULT)
+        time.sleep(0.02)
+
+    stats = log.stats()
+    assert stats['errors'] > 0
+    assert stats['unwritten_records'] <= 8
+    assert stats['dropped'] > 0
+
+    os.makedirs(directory)
+    _wait_for(lambda: log.stats()['unwritten_records'] == 0)
+    log.close()
+    stats = log.stats()
+    assert stats['records'] + stats['dropped'] == 80
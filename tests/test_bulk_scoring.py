@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import bulk_scoring
+import model_manager
+import prediction_cache
+import rules
+
+
+@pytest.fixture
+def manager(model_and_scaler):
+    manager = model_manager.ModelManager.from_models(*model_and_scaler, 'test', rules=rules.RuleEngine(),
+                                                     cache=prediction_cache.PredictionCache())
+    manager.recorded = []
+    manager.on_scored.append(lambda transactions, result, version: manager.recorded.append((len(result['fraud_prob']),
+                                                                                            version)))
+    return manager
+
+
+@pytest.mark.parametrize('file_format', bulk_scoring.SUPPORTED_FORMATS)
+def test_bulk_matches_interactive_scoring_and_reaches_observers(manager, transactions, tmp_path, file_format):
+    batch = transactions.head(5_000)
+    source = tmp_path / f"source.{file_format}"
+    destination = tmp_path / f"scored.{file_format}"
+    if file_format == 'csv':
+        batch.to_csv(source, index=False)
+    else:
+        batch.to_parquet(source, index=False)
+
+    summary = bulk_scoring.score_file(manager, str(source), str(destination), file_format, chunksize=2_000)
+    scored = pd.read_csv(destination) if file_format == 'csv' else pd.read_parquet(destination)
+    recorded, manager.recorded = manager.recorded, []
+    expected = manager.score(batch)
+
+    assert summary['rows'] == len(batch)
+    assert recorded == [(2_000, 'test'), (2_000, 'test'), (1_000, 'test')]
+    # Aturan pre-filter ikut berlaku: keputusan sama dengan scoring interaktif
+    np.testing.assert_array_equal(scored['prediction'], expected['prediction'])
+    np.testing.assert_allclose(scored['fraud_prob'], expected['fraud_prob'], rtol=0, atol=1e-12)
+    # Chunk file besar tidak masuk cache prediksi
+    assert manager.cache.stats()['hits'] == 0
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+import cascade
+import scoring
+import tree_engine
+
+
+def test_calibrated_band_gives_no_flips(model_and_scaler, transactions):
+    model, scaler = model_and_scaler
+    calibration = cascade.calibrate_band(model, scaler, transactions, max_flip_rate=0.0)
+    scorer = cascade.CascadeScorer(model, scaler, band=calibration['band'])
+
+    result = scorer.score(transactions)
+    expected = scoring.score_batch(model, scaler, transactions)
+
+    assert calibration['flip_rate'] == 0.0
+    np.testing.assert_array_equal(result['prediction'], expected['prediction'])
+    # Baris yang dieskalasi mendapat skor model penuh
+    escalated = result['stage'] == 2
+    np.testing.assert_allclose(result['fraud_prob'][escalated], expected['fraud_prob'][escalated], atol=1e-6)
+    assert scorer.stats()['escalated'] == escalated.sum() < len(transactions)
+
+
+def test_compiled_cascade_matches_xgboost_cascade(model_and_scaler, transactions):
+    model, scaler = model_and_scaler
+    engine = tree_engine.compile_xgboost(model, scaler)
+
+    expected = cascade.CascadeScorer(model, scaler).score(transactions)
+    result = cascade.CascadeScorer(engine, None).score(transactions)
+
+    np.testing.assert_array_equal(result['stage'], expected['stage'])
+    assert np.abs(result['fraud_prob'] - expected['fraud_prob']).max() < 1e-6
+
+
+def test_band_must_cover_threshold(model_and_scaler, transactions):
+    scorer = cascade.CascadeScorer(*model_and_scaler, band=(0.6, 0.9))
+
+    with pytest.raises(ValueError):
+        scorer.score(transactions.iloc[:10])
+
+
+def test_invalid_band_is_rejected(model_and_scaler):
+    with pytest.raises(ValueError):
+        cascade.CascadeScorer(*model_and_scaler, band=(0.9, 0.1))
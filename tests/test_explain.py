@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+import explain
+import scoring
+
+
+@pytest.fixture(scope='module')
+def engine(model_and_scaler):
+    return explain.ContributionEngine.from_model(*model_and_scaler)
+
+
+def test_contributions_leave_input_matrix_unchanged(engine, transactions):
+    X = scoring.encode_transactions(transactions[:100])
+    original = X.copy()
+
+    engine.contributions(X)
+
+    np.testing.assert_array_equal(X, original)
+
+
+def test_margin_matches_model_probability(engine, model_and_scaler, transactions):
+    batch = transactions[:500]
+    result = engine.contributions(batch)
+    expected = scoring.score_batch(*model_and_scaler, batch)['fraud_prob']
+
+    probability = 1.0 / (1.0 + np.exp(-result['margin'].astype(np.float64)))
+    np.testing.assert_allclose(probability, expected, atol=1e-5)
+
+
+def test_unknown_method_rejected(engine, transactions):
+    with pytest.raises(ValueError):
+        engine.contributions(transactions[:1], method='shap')
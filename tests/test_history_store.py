@@ -0,0 +1,77 @@
+import os
+import time
+
+import numpy as np
+
+import history_store
+
+TRANSACTIONS = [
+    {'step': 1, 'type': 'TRANSFER', 'amount': 181.0, 'oldbalanceOrg': 181.0, 'newbalanceOrig': 0.0,
+     'oldbalanceDest': 0.0, 'newbalanceDest': 0.0, 'isFraud': 1},
+    {'step': 1, 'type': 'PAYMENT', 'amount': 9839.64, 'oldbalanceOrg': 170136.0, 'newbalanceOrig': 160296.36,
+     'oldbalanceDest': 0.0, 'newbalanceDest': 0.0, 'isFraud': 0},
+]
+RESULT = {'fraud_prob': np.array([0.9, 0.1]), 'prediction': np.array([1, 0])}
+DAY = '2026-03-28'
+
+
+def _write(store, scored_at):
+    store.write_partition(DAY, history_store._batch_columns(TRANSACTIONS, RESULT, 'v1', scored_at))
+
+
+def test_compaction_keeps_totals(tmp_path):
+    store = history_store.HistoryStore(str(tmp_path))
+    for i in range(3):
+        _write(store, 1774654200 + i)
+
+    store.compact(DAY)
+    _write(store, 1774654300)
+    store.compact(DAY)
+
+    directory = os.path.join(store.transactions_directory, f'date={DAY}')
+    assert len(store._files(store.transactions_directory, DAY)) == 1
+    assert not [name for name in os.listdir(directory) if name.startswith('part-')]
+    assert store.scan().num_rows == 8
+    daily = store.daily()
+    assert daily['transactions'].tolist() == [8]
+    assert daily['accuracy'].tolist() == [1.0]
+
+
+def test_files_replaced_by_manifest_are_ignored(tmp_path):
+    store = history_store.HistoryStore(str(tmp_path))
+    _write(store, 1774654200)
+    _write(store, 1774654201)
+    # Kompaksi terhenti setelah penukaran manifest, sebelum file lama dihapus
+    store._remove_inactive = lambda directory: None
+    store.compact(DAY)
+
+    assert store.scan().num_rows == 4
+    assert store.daily()['transactions'].tolist() == [4]
+
+
+def test_rollup_hour_uses_local_time_of_each_row(monkeypatch):
+    monkeypatch.setenv('TZ', 'Europe/Berlin')
+    time.tzset()
+    try:
+        # Sebelum dan sesudah pergantian ke waktu musim panas (29 Maret 2026, 01:00 UTC)
+        before, after = 1774744200, 1774751400
+        columns = {name: np.concatenate([a, b]) for (name, a), b in zip(
+            history_store._batch_columns(TRANSACTIONS[:1], {'fraud_prob': [0.9], 'prediction': [1]}, 'v1',
+                                         before).items(),
+            history_store._batch_columns(TRANSACTIONS[:1], {'fraud_prob': [0.9], 'prediction': [1]}, 'v1',
+                                         after).values(),
+        )}
+
+        assert sorted(history_store._rollup(columns)['hour']) == [1, 4]
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_queue_is_bounded_in_rows(tmp_path):
+    store = history_store.HistoryStore(str(tmp_path), queue_rows=3)
+
+    assert store.record(TRANSACTIONS, RESULT)
+    assert not store.record(TRANSACTIONS, RESULT)
+    assert store.stats()['dropped'] == 2
+    assert store.stats()['queued_rows'] == 2
@@ -0,0 +1,80 @@
+import shutil
+
+import joblib
+import numpy as np
+import pytest
+
+import model_manager
+import prediction_cache
+import scoring
+import tree_engine
+
+GOLDEN_TRANSACTIONS = [transaction for transaction, _ in model_manager.GOLDEN_SET]
+
+
+@pytest.fixture
+def artifact_copy(tmp_path, model_path, scaler_path):
+    paths = (str(tmp_path / 'xgb_model.pkl'), str(tmp_path / 'scaler.pkl'))
+    shutil.copy(model_path, paths[0])
+    shutil.copy(scaler_path, paths[1])
+    return paths
+
+
+def test_golden_set_passes_for_model_and_compiled_engine(model_and_scaler):
+    model, scaler = model_and_scaler
+    model_manager.validate_candidate(model, scaler)
+    model_manager.validate_candidate(model, scaler, tree_engine.compile_xgboost(model, scaler))
+
+
+def test_golden_set_rejects_wrong_model():
+    with pytest.raises(ValueError):
+        model_manager.validate_candidate(scoring.MockModel(), scoring.MockScaler())
+
+
+def test_rejected_candidate_keeps_active_model(artifact_copy):
+    manager = model_manager.ModelManager(*artifact_copy).start(watch=False)
+    version = manager.version
+
+    joblib.dump(scoring.MockModel(), artifact_copy[0])
+
+    assert not manager.check_for_update()
+    assert manager.rejected == 1
+    assert manager.version == version
+    assert manager.score(GOLDEN_TRANSACTIONS)['model_version'] == version
+
+
+def test_swap_invalidates_prediction_cache(artifact_copy):
+    cache = prediction_cache.PredictionCache()
+    manager = model_manager.ModelManager(*artifact_copy, cache=cache).start(watch=False)
+    first = manager.score(GOLDEN_TRANSACTIONS)
+    second = manager.score(GOLDEN_TRANSACTIONS)
+
+    np.testing.assert_array_equal(second['fraud_prob'], first['fraud_prob'])
+    assert cache.stats()['hits'] == len(GOLDEN_TRANSACTIONS)
+
+    # Scaler yang sedikit berbeda: isi file berubah tetapi golden set tetap lolos
+    scaler = joblib.load(artifact_copy[1])
+    scaler.scale_ = scaler.scale_ * (1 + 1e-9)
+    joblib.dump(scaler, artifact_copy[1])
+
+    assert manager.check_for_update()
+    assert manager.version != first['model_version']
+    assert len(cache) == 0
+    assert manager.score(GOLDEN_TRANSACTIONS)['model_version'] == manager.version
+
+
+def test_compiled_manager_matches_model_manager(artifact_copy):
+    expected = model_manager.ModelManager(*artifact_copy).start(watch=False).score(GOLDEN_TRANSACTIONS)
+    result = model_manager.ModelManager(*artifact_copy, compiled=True).start(watch=False).score(GOLDEN_TRANSACTIONS)
+
+    assert np.abs(result['fraud_prob'] - expected['fraud_prob']).max() < 1e-6
+
+
+def test_on_scored_observers_receive_results(model_and_scaler):
+    manager = model_manager.ModelManager.from_models(*model_and_scaler, 'test')
+    recorded = []
+    manager.on_scored.append(lambda transactions, result, version: recorded.append((len(transactions), version)))
+
+    manager.score(GOLDEN_TRANSACTIONS)
+
+    assert recorded == [(len(GOLDEN_TRANSACTIONS), 'test')]
@@ -0,0 +1,41 @@
+import time
+
+import numpy as np
+
+import prediction_cache
+
+X = np.array([[1.0, 3.0, 181.0, 181.0, 0.0, 0.0, 0.0],
+              [1.0, 0.0, 9839.64, 170136.0, 160296.36, 0.0, 0.0]])
+
+
+def test_lookup_returns_stored_probabilities_per_version():
+    cache = prediction_cache.PredictionCache()
+    cache.store('v1', X[:1], [0.9])
+
+    fraud_prob, missing = cache.lookup('v1', X)
+    np.testing.assert_array_equal(missing, [1])
+    assert fraud_prob[0] == 0.9 and np.isnan(fraud_prob[1])
+
+    # Skor versi model lain tidak pernah dipakai
+    _, missing = cache.lookup('v2', X)
+    np.testing.assert_array_equal(missing, [0, 1])
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = prediction_cache.PredictionCache(max_entries=1)
+    cache.store('v1', X[:1], [0.9])
+    cache.store('v1', X[1:], [0.1])
+
+    _, missing = cache.lookup('v1', X)
+    np.testing.assert_array_equal(missing, [0])
+    assert cache.stats()['evictions'] == 1
+
+
+def test_expired_entry_is_not_returned():
+    cache = prediction_cache.PredictionCache(ttl=0.0)
+    cache.store('v1', X, [0.9, 0.1])
+    time.sleep(0.001)
+
+    _, missing = cache.lookup('v1', X)
+    np.testing.assert_array_equal(missing, [0, 1])
+    assert cache.stats()['expirations'] == 2
@@ -0,0 +1,66 @@
+import os
+
+import pyarrow.parquet as pq
+import pytest
+
+import paysim_generator
+import rescore
+
+
+@pytest.fixture(scope='module')
+def source(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('rescore') / 'transactions.csv')
+    paysim_generator.write_transactions(path, 30_000, chunksize=10_000, seed=3)
+    return path
+
+
+def _rescorer(source, destination, model_path, scaler_path, **kwargs):
+    kwargs.setdefault('workers', 1)
+    return rescore.Rescorer(source, destination, model_path=model_path, scaler_path=scaler_path,
+                            shard_rows=8000, batch_size=3000, log=lambda message: None, **kwargs)
+
+
+def _interrupt_after(shards):
+    def log(message):
+        if message.startswith(f'[{shards}/'):
+            raise KeyboardInterrupt
+    return log
+
+
+@pytest.mark.parametrize('extension', ['csv', 'parquet'])
+def test_resumed_run_matches_uninterrupted_run(tmp_path, source, model_path, scaler_path, extension):
+    expected = str(tmp_path / f'expected.{extension}')
+    summary = _rescorer(source, expected, model_path, scaler_path).rescore()
+    assert summary['rows'] == 30_000 and summary['shards'] == 4
+
+    destination = str(tmp_path / f'resumed.{extension}')
+    interrupted = _rescorer(source, destination, model_path, scaler_path)
+    interrupted.log = _interrupt_after(2)
+    with pytest.raises(KeyboardInterrupt):
+        interrupted.rescore()
+    assert not os.path.exists(destination)
+
+    resumed = _rescorer(source, destination, model_path, scaler_path, workers=2).rescore()
+
+    assert resumed['resumed_shards'] == 2
+    assert resumed['rows'] == 30_000
+    if extension == 'csv':
+        with open(expected, 'rb') as a, open(destination, 'rb') as b:
+            assert a.read() == b.read()
+    else:
+        assert pq.read_table(destination).equals(pq.read_table(expected))
+    assert not os.path.exists(destination + '.shards')
+
+
+def test_changed_configuration_is_not_resumed(tmp_path, source, model_path, scaler_path):
+    destination = str(tmp_path / 'out.csv')
+    interrupted = _rescorer(source, destination, model_path, scaler_path)
+    interrupted.log = _interrupt_after(1)
+    with pytest.raises(KeyboardInterrupt):
+        interrupted.rescore()
+
+    with pytest.raises(ValueError):
+        _rescorer(source, destination, model_path, scaler_path, threshold=0.7).prepare()
+    # --restart membuang checkpoint lama
+    summary = _rescorer(source, destination, model_path, scaler_path, threshold=0.7).rescore(restart=True)
+    assert summary['resumed_shards'] == 0
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import rules
+import scoring
+
+TRANSACTIONS = [
+    {'step': 1, 'type': 'PAYMENT', 'amount': 9839.64, 'oldbalanceOrg': 170136.0, 'newbalanceOrig': 160296.36,
+     'oldbalanceDest': 0.0, 'newbalanceDest': 0.0},
+    {'step': 1, 'type': 'TRANSFER', 'amount': 181.0, 'oldbalanceOrg': 181.0, 'newbalanceOrig': 0.0,
+     'oldbalanceDest': 0.0, 'newbalanceDest': 0.0},
+    {'step': 1, 'type': 'CASH-IN', 'amount': 143236.26, 'oldbalanceOrg': 0.0, 'newbalanceOrig': 0.0,
+     'oldbalanceDest': 608932.17, 'newbalanceDest': 97263.78},
+]
+
+
+def test_decided_rows_do_not_reach_model(model_and_scaler):
+    engine = rules.RuleEngine()
+    seen = []
+
+    def score_fn(X, threshold):
+        seen.append(X)
+        return scoring.score_batch(*model_and_scaler, X, threshold=threshold)
+
+    result = engine.score(score_fn, TRANSACTIONS)
+
+    assert len(seen) == 1 and len(seen[0]) == 1
+    np.testing.assert_array_equal(result['prediction'], [0, 1, 0])
+    assert list(result['decided_by']) == ['non_fraud_type', '', 'non_fraud_type']
+    assert engine.stats()['decided'] == 2
+
+
+def test_model_is_skipped_when_every_row_is_decided():
+    def score_fn(X, threshold):
+        raise AssertionError("Model tidak boleh dipanggil")
+
+    result = rules.RuleEngine().score(score_fn, [TRANSACTIONS[0], TRANSACTIONS[2]])
+
+    np.testing.assert_array_equal(result['fraud_prob'], [0.0, 0.0])
+
+
+def test_first_matching_rule_decides():
+    engine = rules.RuleEngine([
+        {'name': 'big', 'when': [('amount', '>', 100_000)], 'action': rules.ACTION_FRAUD},
+        {'name': 'cash_in', 'when': [('type', 'in', ['CASH-IN'])], 'action': rules.ACTION_SAFE},
+    ])
+    decision, decided_by = engine.decide(engine.evaluate(scoring.encode_transactions(TRANSACTIONS)))
+
+    np.testing.assert_array_equal(decision, [-1, -1, 1])
+    np.testing.assert_array_equal(decided_by, [-1, -1, 0])
+
+
+def test_explain_lists_flag_rules():
+    labels = rules.RuleEngine().explain(TRANSACTIONS)
+
+    assert any('TRANSFER' in label for label in labels[1])
+    assert all('TRANSFER' not in label for label in labels[0])
+
+
+def test_unknown_action_is_rejected():
+    with pytest.raises(ValueError):
+        rules.RuleEngine([{'name': 'x', 'when': [('amount', '>', 0)], 'action': 'block'}])
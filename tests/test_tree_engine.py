@@ -0,0 +1,80 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+import model_artifacts
+import scoring
+import tree_engine
+
+
+@pytest.fixture(scope='module')
+def engine(model_and_scaler):
+    return tree_engine.compile_xgboost(*model_and_scaler)
+
+
+def test_compiled_xgboost_matches_xgboost(model_and_scaler, engine, transactions):
+    expected = scoring.score_batch(*model_and_scaler, transactions)
+    result = engine.score(transactions)
+
+    assert np.abs(result['fraud_prob'] - expected['fraud_prob']).max() < 1e-6
+    np.testing.assert_array_equal(result['prediction'], expected['prediction'])
+
+
+def test_compiled_xgboost_small_batches_match_large_batch(engine, transactions):
+    # Batch kecil memakai jalur evaluasi per baris, batch besar jalur blok
+    batch = transactions.iloc[:tree_engine.SMALL_BATCH_SIZE * 4]
+    expected = engine.score(batch)['fraud_prob']
+    small = np.concatenate([
+        engine.score(batch.iloc[start:start + 3])['fraud_prob'] for start in range(0, len(batch), 3)
+    ])
+
+    np.testing.assert_allclose(small, expected, rtol=0, atol=1e-12)
+
+
+def test_truncated_compiled_xgboost_matches_iteration_range(model_and_scaler, engine, transactions):
+    model, scaler = model_and_scaler
+    X = scoring.encode_transactions(transactions.iloc[:2000])
+    expected = model.predict_proba(scoring.scale_features(scaler, X), iteration_range=(0, 10))[:, 1]
+
+    assert np.abs(engine.predict_proba(X, n_trees=10)[:, 1] - expected).max() < 1e-6
+
+
+def test_compiled_forest_matches_sklearn(model_and_scaler, model_path, transactions):
+    _, scaler = model_and_scaler
+    forest = joblib.load(os.path.join(os.path.dirname(model_path), 'rf_model.pkl'))
+    X = scoring.encode_transactions(transactions.iloc[:5000])
+    expected = forest.predict_proba(scoring.scale_features(scaler, X))[:, 1]
+
+    compiled = tree_engine.compile_sklearn_forest(forest, scaler)
+
+    assert np.abs(compiled.predict_proba(X)[:, 1] - expected).max() < 1e-6
+
+
+def test_unsupported_scaler_is_rejected(model_and_scaler):
+    model, _ = model_and_scaler
+
+    with pytest.raises(ValueError):
+        tree_engine.compile_xgboost(model, scoring.MockScaler())
+
+
+def test_artifacts_round_trip(tmp_path, model_path, scaler_path, engine, transactions):
+    manifest = model_artifacts.export_artifacts(str(tmp_path), model_path, scaler_path, rf_path=None)
+    artifacts = model_artifacts.load_artifacts(str(tmp_path))
+
+    assert artifacts['version'] == manifest['version']
+    np.testing.assert_array_equal(artifacts['models']['xgb'].score(transactions)['fraud_prob'],
+                                  engine.score(transactions)['fraud_prob'])
+
+
+def test_corrupted_artifacts_are_rejected(tmp_path, model_path, scaler_path):
+    model_artifacts.export_artifacts(str(tmp_path), model_path, scaler_path, rf_path=None)
+    with open(tmp_path / model_artifacts.DATA_FILE, 'r+b') as handle:
+        handle.seek(100)
+        byte = handle.read(1)
+        handle.seek(100)
+        handle.write(bytes([byte[0] ^ 0xFF]))
+
+    with pytest.raises(ValueError):
+        model_artifacts.load_artifacts(str(tmp_path))
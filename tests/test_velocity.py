@@ -0,0 +1,75 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import batching
+import model_manager
+import velocity
+
+
+def _transaction(step, name_dest='M1', amount=100.0, type_name='TRANSFER'):
+    return {'step': step, 'type': type_name, 'amount': amount, 'nameOrig': 'C1', 'oldbalanceOrg': amount,
+            'newbalanceOrig': 0.0, 'nameDest': name_dest, 'oldbalanceDest': 0.0, 'newbalanceDest': 0.0}
+
+
+def test_features_aggregate_window_before_batch():
+    tracker = velocity.VelocityTracker(capacity=100)
+    tracker.observe([_transaction(1, 'M1', 10.0), _transaction(2, 'M2', 20.0)])
+
+    features = tracker.features([_transaction(3), _transaction(40)])
+
+    np.testing.assert_array_equal(features['orig_tx_count'], [2, 0])
+    np.testing.assert_array_equal(features['orig_amount_sum'], [30.0, 0.0])
+    np.testing.assert_array_equal(features['orig_distinct_dest'], [2, 0])
+    np.testing.assert_array_equal(features['orig_steps_since_last'], [1.0, 38.0])
+    np.testing.assert_array_equal(features['dest_tx_count'], [1, 0])
+
+
+def test_unknown_account_has_no_history():
+    features = velocity.VelocityTracker(capacity=100).features([_transaction(1)])
+
+    assert features['orig_tx_count'][0] == 0
+    assert np.isnan(features['orig_steps_since_last'][0])
+
+
+def test_transactions_without_accounts_have_no_features():
+    transaction = _transaction(1)
+    del transaction['nameOrig']
+
+    assert velocity.VelocityTracker(capacity=100).features([transaction]) is None
+
+
+def test_failed_batch_is_not_counted(model_and_scaler):
+    manager = model_manager.ModelManager.from_models(*model_and_scaler, 'test',
+                                                     velocity=velocity.VelocityTracker(capacity=100))
+
+    with pytest.raises(ValueError):
+        manager.score([_transaction(1), _transaction(1, type_name='WIRE')])
+
+    assert manager.score([_transaction(1)])['orig_tx_count'][0] == 0
+    assert manager.score([_transaction(2)])['orig_tx_count'][0] == 1
+
+
+def test_batch_retried_per_transaction_is_counted_once(model_and_scaler):
+    manager = model_manager.ModelManager.from_models(*model_and_scaler, 'test',
+                                                     velocity=velocity.VelocityTracker(capacity=100))
+
+    async def run():
+        batcher = batching.MicroBatcher(manager.score, max_batch_size=8)
+        await batcher.start()
+        try:
+            # Transaksi WIRE tidak valid: batch gagal lalu di-score ulang satu per satu
+            results = await asyncio.gather(
+                batcher.submit(_transaction(1)), batcher.submit(_transaction(1, type_name='WIRE')),
+                batcher.submit(_transaction(2)), return_exceptions=True,
+            )
+            return results, await batcher.submit(_transaction(3))
+        finally:
+            await batcher.stop()
+
+    results, last = asyncio.run(run())
+
+    assert isinstance(results[1], ValueError)
+    assert [results[0]['orig_tx_count'], results[2]['orig_tx_count']] == [0, 1]
+    assert last['orig_tx_count'] == 2
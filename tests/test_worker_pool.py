@@ -0,0 +1,96 @@
+import os
+import signal
+import time
+
+import joblib
+import numpy as np
+import pytest
+
+import scoring
+import worker_pool
+
+
+# Model yang lambat, agar tugas pasti masih dipegang worker saat worker dimatikan
+class SlowModel:
+    def __init__(self, model, delay):
+        self.model = model
+        self.delay = delay
+
+    def predict_proba(self, X):
+        time.sleep(self.delay)
+        return self.model.predict_proba(X)
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Kondisi tidak tercapai sebelum timeout")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def slow_pool(model_path, scaler_path):
+    model = worker_pool.pin_model_threads(joblib.load(model_path))
+    pool = worker_pool.WorkerPool(SlowModel(model, 0.3), joblib.load(scaler_path), workers=2, pin=False).start()
+    yield pool
+    pool.close()
+
+
+def test_pool_matches_in_process_scoring(model_path, scaler_path, transactions):
+    pool = worker_pool.WorkerPool.from_files(model_path, scaler_path, workers=2, pin=False, task_rows=1000).start()
+    try:
+        result = pool.score(transactions.iloc[:5000])
+    finally:
+        pool.close()
+    expected = scoring.score_batch(*scoring.load_model_and_scaler(model_path, scaler_path), transactions.iloc[:5000])
+
+    np.testing.assert_array_equal(result['fraud_prob'], expected['fraud_prob'])
+
+
+def test_worker_death_fails_only_its_task(slow_pool, transactions):
+    batch = transactions.iloc[:100]
+    futures = [future for _ in range(4) for future in slow_pool.submit(batch)]
+    _wait_for(lambda: slow_pool._current[0] is not None)
+    os.kill(slow_pool._workers[0][0], signal.SIGKILL)
+
+    outcomes = []
+    for future in futures:
+        try:
+            future.result(timeout=30)
+            outcomes.append('ok')
+        except RuntimeError:
+            outcomes.append('failed')
+
+    assert outcomes.count('failed') == 1
+    _wait_for(lambda: slow_pool.stats()['restarts'] == 1)
+    assert slow_pool.stats()['alive'] == 2
+    # Worker pengganti di-fork oleh fork-server, bukan oleh parent yang multi-thread
+    with open(f"/proc/{slow_pool._workers[0][0]}/stat") as handle:
+        assert int(handle.read().rsplit(')', 1)[1].split()[1]) == slow_pool._fork_server.pid
+    # Worker pengganti menerima tugas baru
+    assert len(slow_pool.score(transactions.iloc[:10])['fraud_prob']) == 10
+
+
+def test_wrong_model_is_rejected_and_workers_stopped():
+    pool = worker_pool.WorkerPool(scoring.MockModel(), scoring.MockScaler(), workers=2, pin=False)
+
+    with pytest.raises(ValueError):
+        pool.start()
+
+    assert pool.stats()['alive'] == 0
+    assert not pool._fork_server.is_alive()
+
+
+def test_invalid_transaction_is_rejected_before_dispatch(slow_pool, transactions):
+    with pytest.raises(ValueError):
+        slow_pool.submit(transactions.iloc[:2].assign(type='WIRE'))
+
+    assert slow_pool.stats()['pending_tasks'] == 0
+
+
+def test_closed_pool_rejects_tasks(slow_pool, transactions):
+    slow_pool.close()
+
+    with pytest.raises(RuntimeError):
+        slow_pool.submit(transactions.iloc[:2])
@@ -0,0 +1,274 @@
+import json
+
+import numpy as np
+
+import scoring
+
+# Jumlah baris per blok evaluasi agar array indeks node tetap kecil dan muat di cache
+BLOCK_SIZE = 2048
+
+# Batas jumlah baris untuk jalur evaluasi semua node sekaligus
+SMALL_BATCH_SIZE = 16
+
+
+# Cara menggabungkan nilai daun menjadi probabilitas penipuan
+OUTPUT_LOGISTIC = 'logistic'  # boosting: sigmoid(jumlah nilai daun + base_margin)
+OUTPUT_MEAN = 'mean'  # random forest: rata-rata probabilitas kelas 1 pada daun
+
+
+# Ensemble pohon yang sudah diratakan menjadi array node NumPy yang kontigu.
+# Semua pohon digabung dalam satu ruang indeks node; node daun menunjuk ke dirinya sendiri,
+# sehingga evaluasi cukup dilakukan sebanyak max_depth langkah tanpa percabangan Python.
+class CompiledTreeEnsemble:
+    # children berisi anak kiri/kanan yang disusun berdampingan: anak = children[2 * node + ke_kanan].
+    # Array yang sudah bertipe dan kontigu dipakai apa adanya (misalnya view dari file memory-map).
+    def __init__(self, feature, threshold, children, default_left, value, roots, max_depth,
+                 base_margin=0.0, n_features=len(scoring.FEATURE_COLUMNS), output=OUTPUT_LOGISTIC):
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.children = np.ascontiguousarray(children, dtype=np.intp)
+        self.default_left = np.ascontiguousarray(default_left, dtype=np.bool_)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+        self.base_margin = float(base_margin)
+        self.n_features = int(n_features)
+        self.output = output
+
+        self._child_base = 2 * np.arange(len(self.feature), dtype=np.intp)
+
+    @property
+    def left(self):
+        return self.children[0::2]
+
+    @property
+    def right(self):
+        return self.children[1::2]
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    # Fungsi untuk menghitung indeks daun (N x n_trees) untuk matriks fitur mentah
+    def apply(self, X, n_trees=None):
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        roots = self.roots if n_trees is None else self.roots[:n_trees]
+        has_missing = np.isnan(X).any()
+
+        if len(X) <= BLOCK_SIZE:
+            return self._apply_block(X, roots, has_missing)
+
+        leaves = np.empty((len(X), len(roots)), dtype=np.intp)
+        for start in range(0, len(X), BLOCK_SIZE):
+            leaves[start:start + BLOCK_SIZE] = self._apply_block(X[start:start + BLOCK_SIZE], roots, has_missing)
+        return leaves
+
+    def _apply_block(self, block, roots, has_missing):
+        if len(block) <= SMALL_BATCH_SIZE:
+            return self._apply_small(block, roots, has_missing)
+
+        flat = block.ravel()
+        row_base = np.arange(0, flat.size, self.n_features, dtype=np.intp)[:, None]
+
+        node = np.repeat(roots[None, :], len(block), axis=0)
+        for _ in range(self.max_depth):
+            x = flat[row_base + self.feature[node]]
+            go_right = x >= self.threshold[node]
+            if has_missing:
+                missing = np.isnan(x)
+                go_right[missing] = ~self.default_left[node[missing]]
+            node = self.children[2 * node + go_right]
+        return node
+
+    # Untuk batch kecil (misalnya satu transaksi) semua node dievaluasi sekaligus dalam satu
+    # perbandingan vektor, sehingga penelusuran pohon hanya berupa satu lookup indeks per level
+    def _apply_small(self, block, roots, has_missing):
+        x = block[:, self.feature]
+        go_right = x >= self.threshold
+        if has_missing:
+            missing = np.isnan(x)
+            go_right[missing] = np.broadcast_to(~self.default_left, x.shape)[missing]
+
+        # Node berikutnya untuk setiap node, diratakan per baris
+        row_offset = np.arange(0, go_right.size, len(self.feature), dtype=np.intp)[:, None]
+        next_node = (self.children[self._child_base + go_right] + row_offset).ravel()
+
+        node = roots + row_offset
+        for _ in range(self.max_depth):
+            node = next_node[node]
+        return node - row_offset
+
+    # Fungsi untuk menghitung margin (log-odds) seperti output_margin pada XGBoost
+    def predict_margin(self, X, n_trees=None):
+        return self.value[self.apply(X, n_trees)].sum(axis=1) + self.base_margin
+
+    # Interface seperti sklearn: kolom 0 = aman, kolom 1 = penipuan
+    def predict_proba(self, X, n_trees=None):
+        if self.output == OUTPUT_MEAN:
+            fraud_prob = self.value[self.apply(X, n_trees)].mean(axis=1)
+        else:
+            fraud_prob = 1.0 / (1.0 + np.exp(-self.predict_margin(X, n_trees)))
+        return np.column_stack([1.0 - fraud_prob, fraud_prob])
+
+    def predict(self, X, n_trees=None):
+        return (self.predict_proba(X, n_trees)[:, 1] > scoring.DEFAULT_THRESHOLD).astype(np.int64)
+
+    # Fungsi untuk scoring transaksi mentah; scaling sudah dilebur ke dalam threshold
+    def score(self, transactions, threshold=scoring.DEFAULT_THRESHOLD):
+        X = scoring.encode_transactions(transactions)
+        fraud_prob = self.predict_proba(X)[:, 1]
+        return {
+            'fraud_prob': fraud_prob,
+            'safe_prob': 1.0 - fraud_prob,
+            'prediction': (fraud_prob > threshold).astype(np.int64),
+        }
+
+
+# Fungsi untuk membaca parameter affine scaler (center dan scale) per fitur
+def scaler_params(scaler, n_features):
+    params = scoring.affine_params(scaler)
+    if params is None:
+        raise ValueError(f"Scaler {type(scaler).__name__} tidak bisa dilebur ke threshold "
+                         "(hanya RobustScaler dan StandardScaler)")
+    center, scale = params
+    center = np.zeros(n_features) if center is None else np.asarray(center, dtype=np.float64)
+    scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+    if (scale <= 0).any():
+        raise ValueError("Scale pada scaler harus positif agar bisa dilebur ke threshold")
+    return center, scale
+
+
+# Fungsi untuk memindahkan batas split dari ruang ter-scale ke ruang fitur mentah.
+# Hasil perkalian dibulatkan, jadi batas digeser per ulp sampai tepat memisahkan nilai mentah
+# yang (x - center) / scale-nya berada di bawah dan di atas batas aslinya.
+def _fold_thresholds(cutoff, feature, center, scale):
+    center, scale = center[feature], scale[feature]
+    folded = cutoff * scale + center
+    for _ in range(4):
+        too_low = (folded - center) / scale < cutoff
+        folded = np.where(too_low, np.nextafter(folded, np.inf), folded)
+        below = np.nextafter(folded, -np.inf)
+        too_high = (below - center) / scale >= cutoff
+        folded = np.where(too_high, below, folded)
+    return folded
+
+
+# Fungsi untuk meratakan booster XGBoost (binary:logistic) menjadi CompiledTreeEnsemble.
+# Split pohon invarian terhadap transformasi affine positif:
+#   (x - center) / scale < t  <=>  x < t * scale + center
+# sehingga scaler dilebur ke threshold dan tidak perlu dipanggil saat inferensi.
+def compile_xgboost(model, scaler=None):
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    learner = json.loads(booster.save_raw('json'))['learner']
+
+    objective = learner['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"Objective tidak didukung: {objective}")
+
+    trees = learner['gradient_booster']['model']['trees']
+    n_features = int(learner['learner_model_param']['num_feature'])
+    center, scale = scaler_params(scaler, n_features) if scaler is not None else (
+        np.zeros(n_features), np.ones(n_features))
+
+    feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+    max_depth = 0
+    offset = 0
+    for tree in trees:
+        if any(tree['split_type']):
+            raise ValueError("Split kategorikal belum didukung")
+
+        tree_left = np.asarray(tree['left_children'], dtype=np.int64)
+        tree_right = np.asarray(tree['right_children'], dtype=np.int64)
+        tree_feature = np.asarray(tree['split_indices'], dtype=np.int64)
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        # XGBoost membulatkan nilai fitur ke float32 sebelum dibandingkan:
+        #   float32(v) < t  <=>  v < titik tengah antara t dan float32 sebelumnya
+        cutoff = (conditions.astype(np.float64)
+                  + np.nextafter(conditions, np.float32(-np.inf)).astype(np.float64)) / 2
+        is_leaf = tree_left == -1
+        node_ids = np.arange(len(tree_left))
+
+        feature.append(np.where(is_leaf, 0, tree_feature))
+        threshold.append(np.where(is_leaf, np.inf, _fold_thresholds(cutoff, tree_feature, center, scale)))
+        left.append(np.where(is_leaf, node_ids, tree_left) + offset)
+        right.append(np.where(is_leaf, node_ids, tree_right) + offset)
+        default_left.append(np.asarray(tree['default_left'], dtype=bool))
+        value.append(np.where(is_leaf, conditions.astype(np.float64), 0.0))
+        roots.append(offset)
+
+        max_depth = max(max_depth, _tree_depth(tree_left, tree_right))
+        offset += len(tree_left)
+
+    # base_score disimpan dalam ruang probabilitas untuk binary:logistic
+    base_score = float(learner['learner_model_param']['base_score'])
+    base_margin = np.log(base_score / (1.0 - base_score))
+
+    return CompiledTreeEnsemble(
+        np.concatenate(feature), np.concatenate(threshold),
+        np.column_stack([np.concatenate(left), np.concatenate(right)]).ravel(),
+        np.concatenate(default_left), np.concatenate(value), roots, max_depth, base_margin, n_features
+    )
+
+
+# Fungsi untuk meratakan RandomForestClassifier sklearn (biner) menjadi CompiledTreeEnsemble.
+# sklearn membulatkan input ke float32 dan ke kiri jika x <= threshold; keduanya dikonversi
+# ke bentuk x >= batas (ke kanan) lalu scaler dilebur seperti pada compile_xgboost.
+def compile_sklearn_forest(forest, scaler=None):
+    n_features = int(forest.n_features_in_)
+    if list(forest.classes_) != [0, 1]:
+        raise ValueError("Hanya klasifikasi biner (kelas 0 dan 1) yang didukung")
+    center, scale = scaler_params(scaler, n_features) if scaler is not None else (
+        np.zeros(n_features), np.ones(n_features))
+
+    feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+    max_depth = 0
+    offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        node_ids = np.arange(tree.node_count)
+        tree_feature = np.where(is_leaf, 0, tree.feature)
+
+        # float32 terbesar yang <= threshold, lalu titik tengah ke float32 berikutnya
+        below = tree.threshold.astype(np.float32)
+        below = np.where(below > tree.threshold, np.nextafter(below, np.float32(-np.inf)), below)
+        cutoff = (below.astype(np.float64) + np.nextafter(below, np.float32(np.inf)).astype(np.float64)) / 2
+
+        counts = tree.value[:, 0, :]
+        missing_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=np.uint8))
+
+        feature.append(tree_feature)
+        threshold.append(np.where(is_leaf, np.inf, _fold_thresholds(cutoff, tree_feature, center, scale)))
+        left.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        right.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+        default_left.append(np.asarray(missing_left, dtype=bool))
+        value.append(np.where(is_leaf, counts[:, 1] / counts.sum(axis=1), 0.0))
+        roots.append(offset)
+
+        max_depth = max(max_depth, int(tree.max_depth))
+        offset += tree.node_count
+
+    return CompiledTreeEnsemble(
+        np.concatenate(feature), np.concatenate(threshold),
+        np.column_stack([np.concatenate(left), np.concatenate(right)]).ravel(),
+        np.concatenate(default_left), np.concatenate(value), roots, max_depth, 0.0, n_features, OUTPUT_MEAN
+    )
+
+
+def _tree_depth(left, right):
+    max_depth = 0
+    stack = [(0, 0)]
+    while stack:
+        node, depth = stack.pop()
+        if left[node] == -1:
+            max_depth = max(max_depth, depth)
+        else:
+            stack.append((left[node], depth + 1))
+            stack.append((right[node], depth + 1))
+    return max_depth
+
+
+# Fungsi untuk membuat evaluator dari file artefak (xgb_model.pkl dan scaler.pkl)
+def load_compiled_model(model_path='xgb_model.pkl', scaler_path='scaler.pkl'):
+    model, scaler = scoring.load_model_and_scaler(model_path, scaler_path)
+    return compile_xgboost(model, scaler)
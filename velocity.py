@@ -0,0 +1,239 @@
+import threading
+
+import numpy as np
+
+# Kolom identitas akun pada data PaySim
+ORIGIN_COLUMN = 'nameOrig'
+DESTINATION_COLUMN = 'nameDest'
+
+# Panjang jendela agregasi dalam step (1 step = 1 jam)
+DEFAULT_WINDOW = 24
+
+# Jumlah transaksi terakhir yang disimpan per akun (ukuran ring buffer); agregat count
+# dan sum jenuh di nilai ini untuk akun yang sangat aktif
+DEFAULT_HISTORY = 8
+
+# Jumlah akun aktif maksimum per store; memori dialokasikan sekali di awal
+# (sekitar 50 MB per store dengan nilai default)
+DEFAULT_CAPACITY = 250_000
+
+# Akun tanpa transaksi selama ini (step) dianggap idle dan dikeluarkan dari store
+DEFAULT_IDLE_STEPS = 72
+
+# Pembersihan akun idle dijalankan setiap sekian update
+EVICT_EVERY = 50_000
+
+VELOCITY_COLUMNS = [
+    'orig_tx_count', 'orig_amount_sum', 'orig_distinct_dest', 'orig_steps_since_last',
+    'dest_tx_count', 'dest_amount_sum', 'dest_distinct_orig', 'dest_steps_since_last',
+]
+
+# Penanda slot ring buffer yang kosong
+_EMPTY_STEP = -np.inf
+_NO_COUNTERPARTY = np.iinfo(np.int64).min
+
+
+# State per akun dalam array NumPy berukuran tetap: setiap akun mendapat satu baris berisi
+# ring buffer (step, amount, counterparty) sepanjang `history`. Update O(1) per event,
+# lookup berupa gather baris + agregasi vektor atas jendela step.
+class AccountRingStore:
+    def __init__(self, capacity=DEFAULT_CAPACITY, history=DEFAULT_HISTORY, window=DEFAULT_WINDOW,
+                 idle_steps=DEFAULT_IDLE_STEPS):
+        self.capacity = capacity
+        self.history = history
+        self.window = window
+        self.idle_steps = idle_steps
+
+        # Baris terakhir (indeks `capacity`) selalu kosong, dipakai untuk akun yang belum dikenal
+        self.steps = np.full((capacity + 1, history), _EMPTY_STEP)
+        self.amounts = np.zeros((capacity + 1, history))
+        self.counterparties = np.full((capacity + 1, history), _NO_COUNTERPARTY, dtype=np.int64)
+        self.head = np.zeros(capacity + 1, dtype=np.int32)
+        self.last_step = np.full(capacity + 1, _EMPTY_STEP)
+
+        self.now = _EMPTY_STEP
+        self.updates = 0
+        self.evictions = 0
+
+        self._index = {}
+        self._keys = [None] * capacity
+        self._free = list(range(capacity - 1, -1, -1))
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._index)
+
+    def _allocate(self, key, step):
+        if not self._free:
+            self._evict_idle()
+        if not self._free:
+            # Store penuh oleh akun aktif: keluarkan 1% akun yang paling lama tidak bertransaksi
+            count = max(1, self.capacity // 100)
+            self._evict(np.argpartition(self.last_step[:self.capacity], count - 1)[:count])
+        # Isi ring buffer slot baru dikosongkan oleh pemanggil (sekaligus untuk satu batch)
+        slot = self._free.pop()
+        self._index[key] = slot
+        self._keys[slot] = key
+        self.last_step[slot] = step
+        return slot
+
+    def _evict(self, slots):
+        for slot in slots.tolist():
+            key = self._keys[slot]
+            if key is None:
+                continue
+            del self._index[key]
+            self._keys[slot] = None
+            self._free.append(slot)
+            self.evictions += 1
+        self.last_step[slots] = _EMPTY_STEP
+
+    def _evict_idle(self):
+        idle = np.flatnonzero(self.last_step[:self.capacity] < self.now - self.idle_steps)
+        # Slot kosong juga bernilai -inf; _evict melewati slot tanpa akun
+        self._evict(idle)
+
+    def update(self, key, step, amount, counterparty):
+        self.update_batch([key], [step], [amount], [counterparty])
+
+    # Fungsi untuk mencatat banyak event sekaligus: pencarian slot per akun lewat dict,
+    # penulisan ring buffer dalam satu operasi vektor
+    def update_batch(self, keys, steps, amounts, counterparties):
+        steps = np.asarray(steps, dtype=np.float64)
+        with self._lock:
+            slots = np.empty(len(steps), dtype=np.int64)
+            new_slots = []
+            last_step = self.last_step
+            for i, (key, step) in enumerate(zip(keys, steps.tolist())):
+                slot = self._index.get(key)
+                if slot is None:
+                    slot = self._allocate(key, step)
+                    new_slots.append(slot)
+                elif step > last_step[slot]:
+                    # Diperbarui segera agar akun di batch ini tidak dipilih saat store penuh
+                    last_step[slot] = step
+                slots[i] = slot
+            if new_slots:
+                self.steps[new_slots] = _EMPTY_STEP
+                self.counterparties[new_slots] = _NO_COUNTERPARTY
+                self.head[new_slots] = 0
+            if len(steps) and steps.max() > self.now:
+                self.now = steps.max()
+
+            # Akun yang muncul beberapa kali dalam batch menempati posisi ring berurutan
+            order = np.argsort(slots, kind='stable')
+            sorted_slots = slots[order]
+            starts = np.flatnonzero(np.r_[True, sorted_slots[1:] != sorted_slots[:-1]])
+            group_sizes = np.diff(np.r_[starts, len(slots)])
+            rank = np.arange(len(slots)) - np.repeat(starts, group_sizes)
+            positions = np.empty(len(slots), dtype=np.int64)
+            positions[order] = (self.head[sorted_slots] + rank) % self.history
+
+            self.steps[slots, positions] = steps
+            self.amounts[slots, positions] = amounts
+            self.counterparties[slots, positions] = counterparties
+            group_slots = sorted_slots[starts]
+            self.head[group_slots] = (self.head[group_slots] + group_sizes) % self.history
+
+            previous = self.updates
+            self.updates += len(slots)
+            if self.updates // EVICT_EVERY != previous // EVICT_EVERY:
+                self._evict_idle()
+
+    # Fungsi untuk menghitung agregat jendela [step - window, step] untuk banyak akun sekaligus;
+    # akun yang belum dikenal menghasilkan count 0 dan steps_since_last NaN
+    def lookup(self, keys, steps):
+        steps = np.asarray(steps, dtype=np.float64)
+        with self._lock:
+            slots = np.fromiter((self._index.get(key, self.capacity) for key in keys), dtype=np.int64,
+                                count=len(steps))
+            history_steps = self.steps[slots]
+            amounts = self.amounts[slots]
+            counterparties = self.counterparties[slots]
+
+        past = history_steps <= steps[:, None]
+        in_window = past & (history_steps > (steps - self.window)[:, None])
+
+        count = in_window.sum(axis=1)
+        amount_sum = np.where(in_window, amounts, 0.0).sum(axis=1)
+
+        # Counterparty unik: urutkan per baris, hitung pergantian nilai di antara entri yang valid
+        ordered = np.sort(np.where(in_window, counterparties, _NO_COUNTERPARTY), axis=1)
+        changed = np.ones(ordered.shape, dtype=bool)
+        changed[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+        distinct = np.count_nonzero(changed & (ordered != _NO_COUNTERPARTY), axis=1)
+
+        last = np.where(past, history_steps, _EMPTY_STEP).max(axis=1)
+        with np.errstate(invalid='ignore'):
+            since_last = np.where(np.isfinite(last), steps - last, np.nan)
+        return count, amount_sum, distinct, since_last
+
+    def stats(self):
+        return {
+            'accounts': len(self._index),
+            'capacity': self.capacity,
+            'updates': self.updates,
+            'evictions': self.evictions,
+            'memory_bytes': self.steps.nbytes + self.amounts.nbytes + self.counterparties.nbytes
+                            + self.head.nbytes + self.last_step.nbytes,
+        }
+
+
+# Fungsi untuk mengambil kolom akun, step dan amount dari dict, list of dict atau DataFrame;
+# None jika transaksi tidak membawa identitas akun
+def _account_columns(transactions):
+    if isinstance(transactions, dict):
+        transactions = [transactions]
+    if isinstance(transactions, (list, tuple)):
+        if not transactions or any(
+            ORIGIN_COLUMN not in row or DESTINATION_COLUMN not in row for row in transactions
+        ):
+            return None
+        return (
+            [row[ORIGIN_COLUMN] for row in transactions],
+            [row[DESTINATION_COLUMN] for row in transactions],
+            np.array([row['step'] for row in transactions], dtype=np.float64),
+            np.array([row['amount'] for row in transactions], dtype=np.float64),
+        )
+    if isinstance(transactions, np.ndarray) and transactions.dtype.names is None:
+        return None
+    names = getattr(transactions, 'columns', None)
+    if names is None:
+        names = transactions.dtype.names
+    if ORIGIN_COLUMN not in names or DESTINATION_COLUMN not in names:
+        return None
+    return (
+        list(transactions[ORIGIN_COLUMN]),
+        list(transactions[DESTINATION_COLUMN]),
+        np.asarray(transactions['step'], dtype=np.float64),
+        np.asarray(transactions['amount'], dtype=np.float64),
+    )
+
+
+# Fitur velocity per transaksi dari dua store: akun pengirim dan akun penerima.
+# Fitur dihitung dari riwayat sebelum batch, lalu transaksi batch dicatat ke store.
+class VelocityTracker:
+    def __init__(self, capacity=DEFAULT_CAPACITY, history=DEFAULT_HISTORY, window=DEFAULT_WINDOW,
+                 idle_steps=DEFAULT_IDLE_STEPS):
+        self.origins = AccountRingStore(capacity, history, window, idle_steps)
+        self.destinations = AccountRingStore(capacity, history, window, idle_steps)
+
+    def features(self, transactions):
+        columns = _account_columns(transactions)
+        if columns is None:
+            return None
+        origins, destinations, steps, _ = columns
+        values = self.origins.lookup(origins, steps) + self.destinations.lookup(destinations, steps)
+        return dict(zip(VELOCITY_COLUMNS, values))
+
+    def observe(self, transactions):
+        columns = _account_columns(transactions)
+        if columns is None:
+            return
+        origins, destinations, steps, amounts = columns
+        # Counterparty disimpan sebagai hash agar ring buffer tetap berupa array int64
+        self.origins.update_batch(origins, steps, amounts, [hash(name) for name in destinations])
+        self.destinations.update_batch(destinations, steps, amounts, [hash(name) for name in origins])
+
+    def stats(self):
+        return {'origin': self.origins.stats(), 'destination': self.destinations.stats()}
@@ -0,0 +1,465 @@
+import argparse
+import collections
+import itertools
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+import metrics
+import model_manager
+import scoring
+
+# Jumlah baris maksimum per tugas; batch yang lebih besar dipecah agar dikerjakan beberapa worker sekaligus
+DEFAULT_TASK_ROWS = 4096
+
+# Batas waktu collector menunggu hasil sebelum memeriksa ulang daftar worker (detik)
+LIVENESS_INTERVAL = 1.0
+
+# Batas waktu menunggu worker berhenti saat pool ditutup sebelum dihentikan paksa (detik)
+SHUTDOWN_TIMEOUT = 5.0
+
+
+# Fungsi untuk daftar CPU yang boleh dipakai proses ini (menghormati taskset/cgroup)
+def available_cpus():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+# Fungsi untuk membatasi model ke satu thread; paralelisme datang dari jumlah proses worker
+def pin_model_threads(model):
+    if hasattr(model, 'get_params') and 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=1)
+    if hasattr(model, 'get_booster'):
+        model.get_booster().set_param({'nthread': 1})
+    return model
+
+
+# Loop utama proses worker (di-fork oleh fork-server): model dan scaler diwarisi tanpa pickle.
+# Setiap worker punya pipe sendiri, sehingga worker yang mati tidak bisa mengunci antrean bersama.
+def _worker_main(index, cpu, model, scaler, connection, inherited):
+    # Ujung pipe lain yang ikut terwarisi fork ditutup, agar recv() mendapat EOF (dan worker
+    # berhenti) jika parent mati
+    for other in inherited:
+        other.close()
+    # Lock registri metrik bisa saja sedang dipegang thread lain saat fork; worker memakai registri sendiri
+    metrics.REGISTRY = metrics.MetricsRegistry()
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        task_id, X, threshold = task
+        try:
+            result = scoring.score_batch(model, scaler, X, threshold=threshold)
+            connection.send((task_id, result, None))
+        except (KeyError, TypeError, ValueError) as e:
+            connection.send((task_id, None, e))
+        except Exception as e:
+            connection.send((task_id, None, RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+# Fungsi untuk menunggu worker selesai lalu mengambil exit code-nya; dihentikan paksa setelah timeout
+def _reap(pid, timeout, exitcodes):
+    deadline = time.monotonic() + timeout
+    while _poll(pid, exitcodes) is None:
+        if time.monotonic() >= deadline:
+            os.kill(pid, signal.SIGKILL)
+            exitcodes[pid] = os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])
+            break
+        time.sleep(0.01)
+    return exitcodes.pop(pid)
+
+
+# Fungsi untuk exit code worker yang sudah berhenti (None jika masih berjalan)
+def _poll(pid, exitcodes):
+    if pid not in exitcodes:
+        finished, status = os.waitpid(pid, os.WNOHANG)
+        if finished:
+            exitcodes[pid] = os.waitstatus_to_exitcode(status)
+    return exitcodes.get(pid)
+
+
+# Loop proses fork-server: di-fork sekali saat start() dan hanya punya satu thread, sehingga setiap
+# worker (termasuk pengganti worker yang mati) di-fork dari proses tanpa thread lain, tanpa lock yang
+# sedang dipegang dan tanpa runtime OpenMP yang sudah aktif. Permintaan dari parent:
+# ('spawn', index, cpu) diikuti ujung pipe worker (file descriptor), dijawab (pid, exit code worker
+# lama di slot itu); ('alive',) dijawab jumlah worker yang masih berjalan; None menghentikan server.
+def _fork_server_main(model, scaler, control, inherited):
+    from multiprocessing import reduction
+    from multiprocessing.connection import Connection
+
+    for other in inherited:
+        other.close()
+    workers = {}
+    exitcodes = {}
+    while True:
+        try:
+            request = control.recv()
+        except EOFError:
+            request = None
+        if request is None:
+            break
+        if request[0] == 'alive':
+            control.send(sum(_poll(pid, exitcodes) is None for pid in workers.values()))
+            continue
+
+        _, index, cpu = request
+        connection = Connection(reduction.recv_handle(control))
+        exitcode = _reap(workers.pop(index), SHUTDOWN_TIMEOUT, exitcodes) if index in workers else None
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _worker_main(index, cpu, model, scaler, connection, [control])
+            except BaseException:
+                code = 1
+            os._exit(code)
+        connection.close()
+        workers[index] = pid
+        control.send((pid, exitcode))
+
+    # Pool ditutup (atau parent mati): worker diberi waktu menyelesaikan tugasnya
+    deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+    for pid in workers.values():
+        _reap(pid, max(0.0, deadline - time.monotonic()), exitcodes)
+
+
+# Pool proses scoring pre-fork: model dan scaler dimuat sekali di parent, lalu N worker di-fork
+# (lewat fork-server) dan berbagi memori model secara copy-on-write. Setiap worker dipin ke satu
+# core dengan nthread=1. Parent membagikan tugas ke worker yang sedang menganggur, sehingga selalu
+# diketahui tugas mana yang dipegang setiap worker: jika worker mati, hanya Future tugas itu yang
+# gagal dan worker pengganti di-fork di slot yang sama.
+# Antarmuka score() sama dengan evaluator pohon, sehingga pool bisa dipakai sebagai engine ModelManager.
+class WorkerPool:
+    def __init__(self, model, scaler, workers=None, pin=True, task_rows=DEFAULT_TASK_ROWS, version=None):
+        cpus = available_cpus()
+        self.model = pin_model_threads(model)
+        self.scaler = scaler
+        self.workers = workers or len(cpus)
+        if self.workers < 1:
+            raise ValueError("Jumlah worker minimal 1")
+        self.cpus = [cpus[i % len(cpus)] for i in range(self.workers)] if pin and hasattr(os, 'sched_setaffinity') \
+            else [None] * self.workers
+        self.task_rows = task_rows
+        self.version = version
+
+        self.tasks_done = 0
+        self.rows = 0
+        self.errors = 0
+        self.restarts = 0
+        self.rows_per_worker = [0] * self.workers
+        self.last_error = None
+
+        # Per slot: (pid, pipe) dan id tugas yang sedang dikerjakan (None jika menganggur).
+        # Slot bernilai None selama worker penggantinya sedang di-fork.
+        self._workers = []
+        self._current = [None] * self.workers
+        self._backlog = collections.deque()
+        self._pending = {}
+        self._task_ids = itertools.count()
+        self._context = None
+        self._fork_server = None
+        self._control = None
+        self._control_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._collector = None
+        self._closed = False
+
+    # Fungsi untuk membuat pool langsung dari file artefak
+    @classmethod
+    def from_files(cls, model_path='xgb_model.pkl', scaler_path='scaler.pkl', **kwargs):
+        model, scaler = scoring.load_model_and_scaler(model_path, scaler_path)
+        kwargs.setdefault('version', model_manager.artifact_version((model_path, scaler_path)))
+        return cls(model, scaler, **kwargs)
+
+    # Pool harus dijalankan sebelum parent sendiri melakukan prediksi multi-thread: runtime OpenMP
+    # yang sudah membuat thread tidak aman diwarisi lewat fork. Hanya fork-server yang di-fork dari
+    # parent; worker di-fork dari fork-server, juga saat mengganti worker yang mati.
+    def start(self):
+        if self._workers:
+            return self
+        import multiprocessing
+
+        self._context = multiprocessing.get_context('fork')
+        self._control, server_end = self._context.Pipe()
+        self._fork_server = self._context.Process(
+            target=_fork_server_main, args=(self.model, self.scaler, server_end, [self._control]),
+            name='scoring-fork-server', daemon=True,
+        )
+        self._fork_server.start()
+        server_end.close()
+
+        self._workers = [None] * self.workers
+        for index in range(self.workers):
+            self._workers[index] = self._spawn(index)[:2]
+        self._collector = threading.Thread(target=self._collect, name='worker-pool-collector', daemon=True)
+        self._collector.start()
+
+        # Pemanasan dan validasi di dalam worker: golden set harus diputuskan dengan benar
+        try:
+            model_manager.validate_candidate(None, None, self)
+        except BaseException:
+            self.close()
+            raise
+        return self
+
+    # Fungsi untuk meminta fork-server membuat worker di slot index; hasil (pid, pipe, exit code
+    # worker lama di slot itu). Tidak dipanggil dengan lock pool.
+    def _spawn(self, index):
+        from multiprocessing import reduction
+
+        parent_end, child_end = self._context.Pipe()
+        try:
+            with self._control_lock:
+                self._control.send(('spawn', index, self.cpus[index]))
+                reduction.send_handle(self._control, child_end.fileno(), self._fork_server.pid)
+                pid, exitcode = self._control.recv()
+        except BaseException:
+            parent_end.close()
+            raise
+        finally:
+            child_end.close()
+        return pid, parent_end, exitcode
+
+    # Fungsi untuk mengirim tugas berikutnya ke setiap worker yang menganggur (dipanggil dengan lock)
+    def _dispatch(self):
+        for index, worker in enumerate(self._workers):
+            if not self._backlog:
+                return
+            if worker is None or self._current[index] is not None:
+                continue
+            task = self._backlog.popleft()
+            try:
+                worker[1].send(task)
+            except OSError:
+                # Worker sudah mati; tugas belum dikerjakan dan dikembalikan ke antrean
+                self._backlog.appendleft(task)
+                continue
+            self._current[index] = task[0]
+
+    # Collector menunggu hasil dari semua pipe worker sekaligus. Worker yang mati terdeteksi dari EOF
+    # pada pipe-nya, yang baru terbaca setelah semua hasil yang sempat dikirim worker itu.
+    def _collect(self):
+        from multiprocessing.connection import wait
+
+        while not self._closed:
+            with self._lock:
+                workers = {worker[1]: (index, worker[0]) for index, worker in enumerate(self._workers)
+                           if worker is not None}
+            for connection in wait(list(workers), timeout=LIVENESS_INTERVAL):
+                index, pid = workers[connection]
+                self._receive(index, pid, connection)
+
+    # Fungsi untuk membaca satu hasil dari worker; False jika ternyata worker sudah mati
+    def _receive(self, index, pid, connection):
+        try:
+            task_id, result, error = connection.recv()
+        except (EOFError, OSError):
+            self._restart(index, pid)
+            return False
+
+        with self._lock:
+            future, n_rows = self._pending.pop(task_id)
+            self._current[index] = None
+            self.tasks_done += 1
+            if error is None:
+                self.rows += n_rows
+                self.rows_per_worker[index] += n_rows
+            else:
+                self.errors += 1
+                self.last_error = str(error)
+            self._dispatch()
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+        return True
+
+    # Fungsi untuk mengganti worker yang mati: hanya tugas yang sedang dipegangnya yang gagal.
+    # Pencatatan dilakukan dengan lock; fork worker pengganti dikerjakan fork-server setelah lock dilepas.
+    def _restart(self, index, pid):
+        with self._lock:
+            worker = self._workers[index]
+            if self._closed or worker is None or worker[0] != pid:
+                return
+            self._workers[index] = None
+            task_id, self._current[index] = self._current[index], None
+            lost = self._pending.pop(task_id, None) if task_id is not None else None
+            self.restarts += 1
+            if lost is not None:
+                self.errors += 1
+        worker[1].close()
+
+        try:
+            pid, connection, exitcode = self._spawn(index)
+            error = RuntimeError(f"Worker scoring scoring-worker-{index} berhenti (exit code {exitcode})")
+        except (EOFError, OSError) as e:
+            # Fork-server tidak bisa dihubungi; slot dibiarkan kosong
+            connection = None
+            error = RuntimeError(f"Worker scoring scoring-worker-{index} berhenti dan tidak dapat diganti: {e}")
+        with self._lock:
+            self.last_error = str(error)
+            if connection is not None and self._closed:
+                # Pool ditutup selama fork: worker baru berhenti karena pipe-nya ditutup
+                connection.close()
+            elif connection is not None:
+                self._workers[index] = (pid, connection)
+                self._dispatch()
+        if lost is not None:
+            lost[0].set_exception(error)
+
+    # Fungsi untuk mengirim satu matriks fitur ter-encode sebagai satu tugas; hasilnya Future
+    def _submit(self, X, threshold):
+        future = Future()
+        with self._lock:
+            if self._closed or not self._workers:
+                raise RuntimeError("Worker pool belum berjalan atau sudah ditutup")
+            task_id = next(self._task_ids)
+            self._pending[task_id] = (future, len(X))
+            self._backlog.append((task_id, X, threshold))
+            self._dispatch()
+        return future
+
+    # Fungsi untuk mengirim transaksi tanpa menunggu; batch besar dipecah menjadi beberapa tugas.
+    # Encoding dilakukan di parent sehingga transaksi tidak valid langsung ditolak dan yang
+    # dikirim ke worker hanya matriks float64 yang murah di-pickle.
+    def submit(self, transactions, threshold=scoring.DEFAULT_THRESHOLD):
+        X = scoring.encode_transactions(transactions)
+        return [self._submit(X[start:start + self.task_rows], threshold)
+                for start in range(0, len(X), self.task_rows)] or [self._submit(X, threshold)]
+
+    # Fungsi untuk scoring N transaksi; hasil sama dengan scoring.score_batch
+    def score(self, transactions, threshold=scoring.DEFAULT_THRESHOLD):
+        results = [future.result() for future in self.submit(transactions, threshold)]
+        if len(results) == 1:
+            return results[0]
+        return {key: np.concatenate([result[key] for result in results]) for key in results[0]}
+
+    # Fungsi untuk menghentikan semua worker; tugas yang sudah dikirim ke worker tetap diselesaikan
+    def close(self):
+        if self._closed or not self._workers:
+            return
+        with self._lock:
+            self._closed = True
+            backlog, self._backlog = self._backlog, collections.deque()
+        self._collector.join()
+
+        # Hasil tugas yang masih dikerjakan dibaca langsung, lalu worker diminta berhenti
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+        workers = [(index, worker) for index, worker in enumerate(self._workers) if worker is not None]
+        for index, (pid, connection) in workers:
+            while self._current[index] is not None and connection.poll(max(0.0, deadline - time.monotonic())):
+                if not self._receive(index, pid, connection):
+                    break
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+
+        # Fork-server menunggu worker berhenti (dan menghentikan paksa yang melewati batas waktu)
+        with self._control_lock:
+            try:
+                self._control.send(None)
+            except OSError:
+                pass
+            self._fork_server.join(2 * SHUTDOWN_TIMEOUT)
+            if self._fork_server.is_alive():
+                self._fork_server.terminate()
+                self._fork_server.join()
+            self._control.close()
+        for _, (pid, connection) in workers:
+            connection.close()
+
+        error = RuntimeError("Worker pool sudah ditutup")
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future, _ in pending.values():
+            future.set_exception(error)
+
+    # Fungsi untuk jumlah worker yang masih berjalan, ditanyakan ke fork-server
+    def _alive(self):
+        with self._control_lock:
+            if self._control is None or self._control.closed:
+                return 0
+            try:
+                self._control.send(('alive',))
+                return self._control.recv()
+            except (EOFError, OSError):
+                return 0
+
+    def stats(self):
+        alive = self._alive()
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'alive': alive,
+                'cpus': self.cpus,
+                'pending_tasks': len(self._pending),
+                'queued_tasks': len(self._backlog),
+                'tasks': self.tasks_done,
+                'rows': self.rows,
+                'rows_per_worker': list(self.rows_per_worker),
+                'errors': self.errors,
+                'restarts': self.restarts,
+                'last_error': self.last_error,
+            }
+
+
+# Fungsi untuk mengukur throughput pool pada beberapa jumlah worker (skala terhadap jumlah core)
+def measure_scaling(model_path, scaler_path, worker_counts, n_rows, batch_size, seed=0):
+    import paysim_generator
+
+    X = scoring.encode_transactions(next(paysim_generator.iter_transactions(n_rows, chunksize=n_rows, seed=seed)))
+    batches = [X[start:start + batch_size] for start in range(0, n_rows, batch_size)]
+    rows = []
+    for workers in worker_counts:
+        pool = WorkerPool.from_files(model_path, scaler_path, workers=workers, task_rows=batch_size).start()
+        try:
+            start = time.perf_counter()
+            # Semua batch dikirim sekaligus sehingga setiap worker selalu punya tugas berikutnya
+            futures = [future for batch in batches for future in pool.submit(batch)]
+            for future in futures:
+                future.result()
+            seconds = time.perf_counter() - start
+        finally:
+            pool.close()
+        rows.append({'workers': workers, 'seconds': seconds, 'rows_per_second': n_rows / seconds})
+    base = rows[0]['rows_per_second'] / rows[0]['workers']
+    for row in rows:
+        row['efficiency'] = row['rows_per_second'] / (base * row['workers'])
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ukur skala throughput worker pool scoring terhadap jumlah core')
+    parser.add_argument('--model', default='xgb_model.pkl', help='Path model XGBoost')
+    parser.add_argument('--scaler', default='scaler.pkl', help='Path scaler')
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help='Jumlah worker yang diukur (default: 1 sampai jumlah core, kelipatan 2)')
+    parser.add_argument('--rows', type=int, default=500_000, help='Jumlah transaksi sintetis')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_TASK_ROWS, help='Jumlah baris per tugas')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    worker_counts = args.workers
+    if worker_counts is None:
+        n_cpus = len(available_cpus())
+        worker_counts = sorted({min(2 ** i, n_cpus) for i in range(n_cpus.bit_length() + 1)})
+
+    print(f"{'worker':>6} {'detik':>8} {'baris/detik':>14} {'efisiensi':>10}")
+    for row in measure_scaling(args.model, args.scaler, worker_counts, args.rows, args.batch_size, args.seed):
+        print(f"{row['workers']:>6} {row['seconds']:>8.2f} {row['rows_per_second']:>14,.0f} {row['efficiency']:>10.0%}")
+
+
+if __name__ == '__main__':
+    main()